@@ -0,0 +1,230 @@
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, unquote
+
+import fitz
+
+RECEIVING_ID = 117
+SENDING_IDS = (113, 110, 111)
+ACADEMIC_YEARS = {"2022-2023": 73, "2023-2024": 74, "2024-2025": 75}
+MAJORS = {
+    "Computer Science, B.S.": "Major/cs",
+    "Mathematics, B.S.": "Major/math",
+    "Economics, B.A.": "Major/econ",
+}
+AGREEMENT_ROWS = [
+    ("COM SCI 31 - Introduction to Computer Science I (4.00)", ["CIS 22A - Beginning Programming (4.50)"]),
+    ("MATH 31A - Differential Calculus (4.00)", ["MATH 1A - Calculus (5.00)", "AND", "MATH 1B - Calculus (5.00)"]),
+    ("MATH 33A - Linear Algebra (4.00)", ["MATH 2B - Linear Algebra (5.00)"]),
+    ("COM SCI 35L - Software Construction (4.00)", ["No Course Articulated"]),
+]
+
+
+def make_agreement_pdf(title, pages=2):
+    doc = fitz.open()
+    for page_number in range(pages):
+        page = doc.new_page()
+        page.insert_text((40, 40), f"{title} (page {page_number + 1})", fontsize=11)
+        page.insert_text((40, 60), "LOWER DIVISION MAJOR REQUIREMENTS - COMPLETE ALL COURSES LISTED BELOW", fontsize=10)
+        y = 84
+        for receiving, sending_lines in AGREEMENT_ROWS:
+            page.insert_text((40, y), receiving, fontsize=9)
+            for line in sending_lines:
+                page.insert_text((330, y), line, fontsize=9)
+                y += 14
+            y += 8
+    # Uncompressed streams and an ASCII-only header comment survive the JSON string round trip
+    # that AssistApiClient performs on agreement content byte-for-byte.
+    pdf_bytes = doc.tobytes(expand=255, no_new_id=True)
+    doc.close()
+    return bytes(byte if byte < 128 else ord("?") for byte in pdf_bytes)
+
+
+class FakeUpstream(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, name, latency=0.0, jitter=0.0):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name=f"fake-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def delay(self):
+        with self._lock:
+            self.requests += 1
+        seconds = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def handle_get(self, path, query):
+        return 404, {"error": f"{self.name} has no GET {path}"}
+
+    def handle_post(self, path, body):
+        return 404, {"error": f"{self.name} has no POST {path}"}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self.server.delay()
+        parsed = urlparse(self.path)
+        self._send_json(*self.server.handle_get(unquote(parsed.path), parsed.query))
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.delay()
+        result = self.server.handle_post(urlparse(self.path).path, json.loads(body or b"{}"))
+        if callable(result):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            result(self.wfile)
+            self.close_connection = True
+        else:
+            self._send_json(*result)
+
+
+class FakeAssist(FakeUpstream):
+    AGREEMENT_CONTENT = re.compile(r"^/agreements/(?P<key>.+)/content$")
+
+    def __init__(self, latency=0.0, jitter=0.0, pages=2):
+        super().__init__("assist", latency, jitter)
+        self.pages = pages
+        self._pdfs = {}
+
+    def agreement_content(self, key):
+        if key not in self._pdfs:
+            self._pdfs[key] = make_agreement_pdf(f"Articulation agreement {key}", self.pages).decode("ascii")
+        return self._pdfs[key]
+
+    def handle_get(self, path, query):
+        if path == "/institutions":
+            return 200, [{"id": institution_id, "name": f"Institution {institution_id}"}
+                         for institution_id in SENDING_IDS + (RECEIVING_ID,)]
+        match = re.match(r"^/institutions/(\d+)(/academic-years)?$", path)
+        if match:
+            return 200, ACADEMIC_YEARS if match.group(2) else {"id": int(match.group(1)), "name": f"Institution {match.group(1)}"}
+        if path == "/agreements":
+            return 200, {"reports": [{"label": label, "key": key} for label, key in MAJORS.items()]}
+        match = self.AGREEMENT_CONTENT.match(path)
+        if match:
+            return 200, self.agreement_content(match.group("key"))
+        return super().handle_get(path, query)
+
+
+class FakeGemini(FakeUpstream):
+    REPLY = "Complete CIS 22A and the MATH 1A/1B sequence before transferring; COM SCI 35L has no articulated course."
+
+    def __init__(self, latency=0.0, jitter=0.0, chunks=4, chunk_delay=0.0):
+        super().__init__("gemini", latency, jitter)
+        self.chunks = chunks
+        self.chunk_delay = chunk_delay
+
+    @staticmethod
+    def _candidate(parts):
+        return {
+            "candidates": [{"content": {"role": "model", "parts": parts}, "finishReason": "STOP", "index": 0}],
+            "usageMetadata": {"promptTokenCount": 1, "candidatesTokenCount": 1, "totalTokenCount": 2}
+        }
+
+    def _reply_parts(self, body):
+        last_parts = (body.get("contents") or [{}])[-1].get("parts", [])
+        asks_prerequisites = any("prerequisite" in part.get("text", "").lower() for part in last_parts)
+        if asks_prerequisites and "search_web" in json.dumps(body.get("tools", [])):
+            return [{"functionCall": {"name": "search_web", "args": {"query": "prerequisites for COM SCI 31 at UCLA"}}}]
+        return [{"text": self.REPLY}]
+
+    def handle_post(self, path, body):
+        parts = self._reply_parts(body)
+        if path.endswith(":generateContent"):
+            return 200, self._candidate(parts)
+        if not path.endswith(":streamGenerateContent"):
+            return super().handle_post(path, body)
+
+        if "text" in parts[0]:
+            words = parts[0]["text"].split(" ")
+            size = max(1, -(-len(words) // self.chunks))
+            parts = [[{"text": " ".join(words[i:i + size]) + (" " if i + size < len(words) else "")}]
+                     for i in range(0, len(words), size)]
+        else:
+            parts = [parts]
+
+        def stream(wfile):
+            wfile.write(b"[")
+            for index, chunk_parts in enumerate(parts):
+                if index:
+                    if self.chunk_delay:
+                        time.sleep(self.chunk_delay)
+                    wfile.write(b",")
+                wfile.write(json.dumps(self._candidate(chunk_parts)).encode("utf-8"))
+                wfile.flush()
+            wfile.write(b"]")
+        return stream
+
+
+class FakePerplexity(FakeUpstream):
+    def __init__(self, latency=0.0, jitter=0.0):
+        super().__init__("perplexity", latency, jitter)
+
+    def handle_post(self, path, body):
+        if path != "/chat/completions":
+            return super().handle_post(path, body)
+        query = body["messages"][-1]["content"]
+        return 200, {"choices": [{"message": {"role": "assistant", "content": f"Prerequisites found for: {query}. MATH 31A is required."}}]}
+
+
+def start_fake_upstreams(assist_latency=0.0, gemini_latency=0.0, perplexity_latency=0.0, jitter=0.0, chunk_delay=0.0):
+    return {
+        "assist": FakeAssist(assist_latency, jitter).start(),
+        "gemini": FakeGemini(gemini_latency, jitter, chunk_delay=chunk_delay).start(),
+        "perplexity": FakePerplexity(perplexity_latency, jitter).start(),
+    }
+
+
+def upstream_env(upstreams):
+    return {
+        "ASSIST_API_KEY": "offline-assist-key",
+        "ASSIST_BASE_URL": upstreams["assist"].url,
+        "GOOGLE_API_KEY": "offline-gemini-key",
+        "GEMINI_API_ENDPOINT": upstreams["gemini"].url,
+        "PERPLEXITY_API_KEY": "offline-perplexity-key",
+        "PERPLEXITY_API_URL": f"{upstreams['perplexity'].url}/chat/completions",
+    }
+
+
+def stop_fake_upstreams(upstreams):
+    for upstream in upstreams.values():
+        upstream.stop()
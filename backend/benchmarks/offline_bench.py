@@ -0,0 +1,210 @@
+import sys
+import os
+import json
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import requests
+
+from benchmarks.fake_upstreams import RECEIVING_ID, SENDING_IDS, MAJORS, start_fake_upstreams, stop_fake_upstreams, upstream_env
+
+IN_MEMORY_MONGO_URI = 'mongodb://localhost/college_transfer_ai_bench'
+CLIENT_ID = 'offline-bench-client'
+YEAR_ID = 75
+
+Scenario = namedtuple('Scenario', ['name', 'method', 'path', 'body', 'auth'])
+
+
+def _ms(name, default):
+    return float(os.getenv(name, default)) / 1000
+
+
+def bench_environment(upstreams, mongo_uri):
+    env = upstream_env(upstreams)
+    env.update({
+        "FLASK_ENV": "offline-bench",
+        "MONGO_URI": mongo_uri,
+        "GEMINI_API_KEY": env["GOOGLE_API_KEY"],
+        "FRONTEND_URL": "*",
+        "STRIPE_SECRET_KEY": "sk_test_offline",
+        "GOOGLE_CLIENT_ID": CLIENT_ID,
+    })
+    return env
+
+
+def install_in_memory_mongo():
+    import mongomock
+    from mongomock.gridfs import enable_gridfs_integration
+    from college_transfer_ai import database
+
+    enable_gridfs_integration()
+    database.client = mongomock.MongoClient()
+    return database.client
+
+
+def seed_users(app, count, tier='premium'):
+    from college_transfer_ai.database import get_users_collection
+    from college_transfer_ai.utils import token_cache, USER_DEFAULT_FIELDS
+
+    tokens = []
+    expires = time.time() + 24 * 60 * 60
+    with app.app_context():
+        users = get_users_collection()
+        for i in range(count):
+            token = f"offline-bench-token-{i}"
+            idinfo = {"sub": f"bench-user-{i}", "email": f"bench-{i}@example.com", "name": f"Bench {i}",
+                      "iss": "accounts.google.com", "aud": CLIENT_ID, "exp": expires}
+            token_cache.put(token, CLIENT_ID, idinfo)
+            users.update_one({"google_user_id": idinfo["sub"]},
+                             {"$set": dict(USER_DEFAULT_FIELDS, tier=tier, email=idinfo["email"])}, upsert=True)
+            tokens.append(token)
+    return tokens
+
+
+def serve(app, threads):
+    try:
+        from waitress.server import create_server
+        server = create_server(app, host='127.0.0.1', port=0, threads=threads)
+        port = server.effective_port
+        stop = server.close
+    except ImportError:
+        import logging
+        from werkzeug.serving import make_server
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        port = server.server_port
+        stop = server.shutdown
+    threading.Thread(target=server.run if hasattr(server, 'run') else server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{port}", stop
+
+
+class LoadDriver:
+    def __init__(self, base_url, tokens, concurrency):
+        self.base_url = base_url
+        self.tokens = tokens
+        self.concurrency = concurrency
+        self._local = threading.local()
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _next_token(self):
+        with self._lock:
+            self._counter += 1
+            return self.tokens[self._counter % len(self.tokens)]
+
+    def request(self, scenario):
+        headers = {"Authorization": f"Bearer {self._next_token()}"} if scenario.auth else {}
+        response = self._session().request(scenario.method, self.base_url + scenario.path, json=scenario.body,
+                                           headers=headers, timeout=120)
+        response.content
+        return response
+
+    def _timed(self, scenario):
+        started = time.perf_counter()
+        try:
+            ok = self.request(scenario).status_code < 400
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    def run(self, scenario, count):
+        from college_transfer_ai.latency import LatencyTracker
+
+        latency = LatencyTracker(window=count)
+        errors = 0
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for seconds, ok in executor.map(lambda _: self._timed(scenario), range(count)):
+                latency.record(scenario.name, seconds)
+                errors += 0 if ok else 1
+        elapsed = time.perf_counter() - started
+
+        result = latency.percentiles()[scenario.name]
+        result.update({"scenario": scenario.name, "errors": errors, "throughput_rps": count / elapsed})
+        return result
+
+
+def build_scenarios(driver):
+    sending = ",".join(str(sending_id) for sending_id in SENDING_IDS)
+    major_key = f"{YEAR_ID}/{SENDING_IDS[0]}/to/{RECEIVING_ID}/{MAJORS['Computer Science, B.S.']}"
+    agreements = Scenario('articulation_agreements', 'POST', '/api/articulation-agreements',
+                          {"sending_ids": list(SENDING_IDS), "receiving_id": RECEIVING_ID, "year_id": YEAR_ID, "major_key": major_key}, False)
+
+    warm_up = driver.request(agreements).json()
+    pdf_filename = warm_up["agreements"][0]["pdfFilename"]
+    images = driver.request(Scenario('pdf_images', 'GET', f'/api/pdf-images/{pdf_filename}', None, False)).json()
+    image_filename = images["image_filenames"][0]
+
+    return [
+        Scenario('institutions', 'GET', '/api/institutions', None, False),
+        Scenario('academic_years', 'GET', f'/api/academic-years?sendingId={sending}&receivingId={RECEIVING_ID}', None, False),
+        Scenario('majors', 'GET', f'/api/majors?sendingId={sending}&receivingId={RECEIVING_ID}&yearId={YEAR_ID}', None, False),
+        agreements,
+        Scenario('pdf_images', 'GET', f'/api/pdf-images/{pdf_filename}', None, False),
+        Scenario('image', 'GET', f'/api/image/{image_filename}', None, False),
+        Scenario('equivalencies', 'GET', f'/api/equivalencies?receivingId={RECEIVING_ID}&course=COM%20SCI%2031', None, False),
+        Scenario('user_status', 'GET', '/api/user-status', None, True),
+        Scenario('chat', 'POST', '/api/chat', {"new_message": "Which courses should I take for this major?"}, True),
+        Scenario('chat_stream', 'POST', '/api/chat/stream', {"new_message": "Summarize the agreement for me."}, True),
+        Scenario('chat_with_search', 'POST', '/api/chat', {"new_message": "What are the prerequisites for COM SCI 31?"}, True),
+    ]
+
+
+def print_report(results, config):
+    print(f"concurrency={config['concurrency']} requests/scenario={config['requests']} mongo={config['mongo']} "
+          f"latency_ms(assist/gemini/perplexity)={config['latency_ms']}")
+    print(f"{'scenario':<24} {'requests':>8} {'errors':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for result in results:
+        print(f"{result['scenario']:<24} {result['count']:>8} {result['errors']:>6} {result['throughput_rps']:>9.1f} "
+              f"{result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['max_ms']:>9.1f}")
+    print("upstream requests: " + ", ".join(f"{name}={count}" for name, count in config['upstream_requests'].items()))
+
+
+def main():
+    concurrency = int(os.getenv('BENCH_CONCURRENCY', '16'))
+    request_count = int(os.getenv('BENCH_REQUESTS', '200'))
+    mongo_uri = os.getenv('BENCH_MONGO_URI')
+    only = {name for name in os.getenv('BENCH_SCENARIOS', '').split(',') if name}
+    latencies = (_ms('BENCH_ASSIST_LATENCY_MS', '50'), _ms('BENCH_GEMINI_LATENCY_MS', '300'), _ms('BENCH_PERPLEXITY_LATENCY_MS', '500'))
+
+    upstreams = start_fake_upstreams(*latencies, jitter=_ms('BENCH_JITTER_MS', '0'), chunk_delay=_ms('BENCH_STREAM_CHUNK_MS', '20'))
+    os.environ.update(bench_environment(upstreams, mongo_uri or IN_MEMORY_MONGO_URI))
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if not mongo_uri:
+        install_in_memory_mongo()
+
+    from college_transfer_ai import create_app
+    app = create_app()
+    tokens = seed_users(app, int(os.getenv('BENCH_USERS', '200')))
+    base_url, stop_server = serve(app, threads=int(os.getenv('WAITRESS_THREADS', str(concurrency))))
+
+    try:
+        driver = LoadDriver(base_url, tokens, concurrency)
+        scenarios = [scenario for scenario in build_scenarios(driver) if not only or scenario.name in only]
+        results = [driver.run(scenario, request_count) for scenario in scenarios]
+    finally:
+        stop_server()
+        stop_fake_upstreams(upstreams)
+
+    config = {"concurrency": concurrency, "requests": request_count, "mongo": "mongod" if mongo_uri else "mongomock",
+              "latency_ms": "/".join(f"{seconds * 1000:g}" for seconds in latencies),
+              "upstream_requests": {name: upstream.requests for name, upstream in upstreams.items()}}
+    print_report(results, config)
+    report_path = os.getenv('BENCH_REPORT')
+    if report_path:
+        with open(report_path, 'w') as f:
+            json.dump({"config": config, "results": results}, f, indent=2)
+        print(f"Report written to {report_path}")
+
+
+if __name__ == '__main__':
+    main()
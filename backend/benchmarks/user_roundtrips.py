@@ -0,0 +1,70 @@
+import sys
+import os
+from datetime import datetime, timezone
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import mongomock
+
+from college_transfer_ai import utils
+
+ROUND_TRIP_METHODS = {'find_one', 'find', 'insert_one', 'update_one', 'find_one_and_update'}
+
+
+class RoundTripCounter:
+    def __init__(self, collection):
+        self._collection = collection
+        self.round_trips = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name in ROUND_TRIP_METHODS:
+            def counted(*args, **kwargs):
+                self.round_trips += 1
+                return attr(*args, **kwargs)
+            return counted
+        return attr
+
+
+def legacy_get_or_create_user(users_collection, idinfo):
+    google_user_id = idinfo['sub']
+    user = users_collection.find_one({'google_user_id': google_user_id})
+    now = datetime.now(timezone.utc)
+    if not user:
+        new_user_data = {'google_user_id': google_user_id, 'email': idinfo.get('email'), 'name': idinfo.get('name'),
+                         'period_start_date': now, 'created_at': now, 'last_login': now}
+        new_user_data.update(utils.USER_DEFAULT_FIELDS)
+        insert_result = users_collection.insert_one(new_user_data)
+        return users_collection.find_one({'_id': insert_result.inserted_id})
+
+    missing = {field: default for field, default in utils.USER_DEFAULT_FIELDS.items() if field not in user}
+    users_collection.update_one({'google_user_id': google_user_id}, {'$set': dict(missing, last_login=now)})
+    if missing:
+        user = users_collection.find_one({'google_user_id': google_user_id})
+    return user
+
+
+def run_scenario(label, get_user, users, requests_per_user):
+    counter = RoundTripCounter(mongomock.MongoClient().bench.users)
+    counter._collection.insert_one({'google_user_id': 'legacy-user', 'email': 'legacy@example.com'})
+    utils.get_users_collection = lambda: counter
+
+    identities = [{'sub': 'legacy-user'}] + [{'sub': f'user-{i}', 'email': f'user-{i}@example.com'} for i in range(users - 1)]
+    calls = 0
+    for _ in range(requests_per_user):
+        for idinfo in identities:
+            get_user(counter, idinfo)
+            calls += 1
+
+    print(f"{label:<10} requests={calls:<6} round_trips={counter.round_trips:<6} "
+          f"round_trips/request={counter.round_trips / calls:.2f}")
+
+
+def main():
+    users = int(os.getenv('BENCH_USERS', '50'))
+    requests_per_user = int(os.getenv('BENCH_REQUESTS_PER_USER', '20'))
+    run_scenario('before', legacy_get_or_create_user, users, requests_per_user)
+    run_scenario('after', lambda collection, idinfo: utils.get_or_create_user(idinfo), users, requests_per_user)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+import logging
+import re
+from datetime import datetime, timezone
+
+import fitz
+
+logger = logging.getLogger(__name__)
+
+TEXTS_COLLECTION = 'agreement_texts'
+COURSES_COLLECTION = 'agreement_courses'
+
+COURSE_PATTERN = re.compile(
+    r"^(?P<code>[A-Z][A-Z&/]*(?: [A-Z&/]+)*\s+\d{1,3}[A-Z]{0,3}(?:\.\d+)?)\b"
+    r"(?:\s*[-–]\s*(?P<title>.*?))?\s*(?:\((?P<units>\d+(?:\.\d+)?)\))?\s*$"
+)
+NO_ARTICULATION_PATTERN = re.compile(r"no course articulated|not articulated", re.IGNORECASE)
+CONJUNCTIONS = {"AND", "OR"}
+ROW_TOLERANCE = 3.0
+
+
+def normalize_course_code(code):
+    return re.sub(r"\s+", " ", code.strip().upper())
+
+
+def _parse_course(text):
+    match = COURSE_PATTERN.match(text.strip())
+    if not match:
+        return None
+    units = match.group("units")
+    return {
+        "code": normalize_course_code(match.group("code")),
+        "title": (match.group("title") or "").strip() or None,
+        "units": float(units) if units else None
+    }
+
+
+def _page_lines(page):
+    lines = []
+    for block in page.get_text("dict")["blocks"]:
+        for line in block.get("lines", []):
+            text = " ".join(span["text"] for span in line["spans"]).strip()
+            if text:
+                x0, y0, x1, _ = line["bbox"]
+                lines.append((round(y0 / ROW_TOLERANCE), x0, x1, text))
+    lines.sort(key=lambda line: (line[0], line[1]))
+    return lines
+
+
+def extract_agreement_structure(pdf_bytes):
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    pages_text = []
+    rows = []
+    current_group = None
+    current_row = None
+
+    try:
+        for page_number, page in enumerate(doc):
+            pages_text.append(page.get_text("text"))
+            midpoint = page.rect.width / 2
+
+            for _, x0, x1, text in _page_lines(page):
+                course = _parse_course(text)
+                is_left = x0 < midpoint
+
+                if is_left and course:
+                    current_row = {
+                        "requirement_group": current_group,
+                        "receiving_course": course,
+                        "sending_courses": [],
+                        "conjunction": None,
+                        "articulated": False,
+                        "page": page_number
+                    }
+                    rows.append(current_row)
+                elif not is_left and current_row is not None:
+                    if course:
+                        current_row["sending_courses"].append(course)
+                        current_row["articulated"] = True
+                    elif text.upper() in CONJUNCTIONS:
+                        current_row["conjunction"] = current_row["conjunction"] or text.upper()
+                    elif NO_ARTICULATION_PATTERN.search(text):
+                        current_row["articulated"] = False
+                elif is_left and x1 > midpoint and not course:
+                    current_group = text
+                    current_row = None
+    finally:
+        doc.close()
+
+    return {"pages": pages_text, "rows": rows}
+
+
+def store_agreement_index(db, pdf_filename, structure, context=None, on_indexed=None):
+    context = context or {}
+    now = datetime.now(timezone.utc)
+
+    db[TEXTS_COLLECTION].replace_one(
+        {"_id": pdf_filename},
+        {"pages": structure["pages"], "page_count": len(structure["pages"]), "extracted_at": now, **context},
+        upsert=True
+    )
+
+    courses = db[COURSES_COLLECTION]
+    courses.delete_many({"pdf_filename": pdf_filename})
+    course_docs = [dict(row, pdf_filename=pdf_filename, indexed_at=now, **context) for row in structure["rows"]]
+    if course_docs:
+        courses.insert_many(course_docs)
+        if on_indexed is not None:
+            on_indexed(db, pdf_filename, course_docs)
+    return len(course_docs)
+
+
+def parse_pdf_filename(pdf_filename):
+    parts = pdf_filename[:-len(".pdf")].split("_", 4) if pdf_filename.endswith(".pdf") else []
+    try:
+        if len(parts) >= 4 and parts[0] == "agreement":
+            return {"kind": "agreement", "year_id": int(parts[1]), "sending_id": int(parts[2]), "receiving_id": int(parts[3])}
+        if len(parts) == 3 and parts[0] == "igetc":
+            return {"kind": "igetc", "year_id": int(parts[1]), "sending_id": int(parts[2])}
+    except ValueError:
+        pass
+    return {}
+
+
+def pdf_filename_for_image(image_filename):
+    pdf_name, separator, _ = image_filename.partition(".pdf_")
+    return pdf_name + ".pdf" if separator else None
+
+
+def index_agreement_pdf(db, pdf_filename, pdf_bytes, context=None, on_indexed=None):
+    structure = extract_agreement_structure(pdf_bytes)
+    row_count = store_agreement_index(db, pdf_filename, structure, dict(parse_pdf_filename(pdf_filename), **(context or {})), on_indexed)
+    logger.info("Indexed %s course rows from %s", row_count, pdf_filename)
+    return row_count
+
+
+def get_agreement_text(db, pdf_filename):
+    return db[TEXTS_COLLECTION].find_one({"_id": pdf_filename})
+
+
+def format_agreement_context(db, pdf_filename):
+    rows = list(db[COURSES_COLLECTION].find({"pdf_filename": pdf_filename}).sort([("page", 1), ("_id", 1)]))
+    if rows:
+        lines = []
+        current_group = object()
+        for row in rows:
+            if row.get("requirement_group") != current_group:
+                current_group = row.get("requirement_group")
+                if current_group:
+                    lines.append(f"## {current_group}")
+            receiving = row["receiving_course"]
+            if row.get("articulated") and row.get("sending_courses"):
+                joiner = f" {row.get('conjunction') or 'AND'} "
+                sending = joiner.join(course["code"] for course in row["sending_courses"])
+            else:
+                sending = "No Course Articulated"
+            title = f" ({receiving['title']})" if receiving.get("title") else ""
+            lines.append(f"{receiving['code']}{title} <- {sending}")
+        return "\n".join(lines)
+
+    text_doc = get_agreement_text(db, pdf_filename)
+    if text_doc:
+        return "\n".join(text_doc.get("pages", []))
+    return None
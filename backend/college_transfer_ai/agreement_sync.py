@@ -0,0 +1,220 @@
+import logging
+import json
+import time
+import hashlib
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import click
+from flask.cli import with_appcontext
+
+from .agreement_index import TEXTS_COLLECTION, parse_pdf_filename
+from .concurrency import fan_out
+from .rasterizer import DEFAULT_RENDER_PROFILE
+
+logger = logging.getLogger(__name__)
+
+SYNC_STATE_COLLECTION = 'agreement_sync_state'
+
+
+def content_hash(pdf_bytes):
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+def listing_fingerprint(report):
+    return hashlib.sha256(json.dumps(report, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def content_key(state):
+    if state.get("kind") == "igetc":
+        return f"igetc/{state['year_id']}/{state['sending_id']}"
+    return state.get("major_key")
+
+
+def record_pdf_version(db, pdf_filename, pdf_bytes, context=None, listing_fp=None):
+    now = datetime.now(timezone.utc)
+    fields = dict(parse_pdf_filename(pdf_filename), **(context or {}))
+    fields.update(content_hash=content_hash(pdf_bytes), checked_at=now, changed_at=now)
+    if listing_fp is not None:
+        fields["listing_fingerprint"] = listing_fp
+    db[SYNC_STATE_COLLECTION].update_one({"_id": pdf_filename}, {"$set": fields}, upsert=True)
+
+
+def seed_sync_state(db, fs):
+    tracked = {doc["_id"] for doc in db[SYNC_STATE_COLLECTION].find({}, {"_id": 1})}
+    seeded = untracked = 0
+    for grid_out in fs.find({"contentType": "application/pdf"}):
+        if grid_out.filename in tracked:
+            continue
+        context = parse_pdf_filename(grid_out.filename)
+        if context.get("kind") == "agreement":
+            text_doc = db[TEXTS_COLLECTION].find_one({"_id": grid_out.filename}, {"major_key": 1})
+            if not text_doc or not text_doc.get("major_key"):
+                untracked += 1
+                continue
+            context["major_key"] = text_doc["major_key"]
+        elif not context:
+            untracked += 1
+            continue
+        record_pdf_version(db, grid_out.filename, grid_out.read(), context)
+        tracked.add(grid_out.filename)
+        seeded += 1
+    return seeded, untracked
+
+
+class SyncReport:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"checked": 0, "unchanged": 0, "changed": 0, "failed": 0,
+                       "listing_calls": 0, "downloads": 0, "profiles_invalidated": 0, "rerendered": 0}
+        self.changed = []
+        self.failures = []
+
+    def add(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                self.counts[name] += value
+
+    def change(self, pdf_filename, profiles_invalidated):
+        with self._lock:
+            self.counts["changed"] += 1
+            self.counts["profiles_invalidated"] += profiles_invalidated
+            self.changed.append(pdf_filename)
+
+    def fail(self, pdf_filename, error):
+        with self._lock:
+            self.counts["failed"] += 1
+            self.failures.append({"pdf_filename": pdf_filename, "error": str(error)})
+
+    def to_dict(self):
+        with self._lock:
+            return dict(self.counts, changed_files=list(self.changed), failures=list(self.failures))
+
+
+class AgreementSync:
+    def __init__(self, pdf_service, assist_client, rasterizer=None, render_timeout=300):
+        self.pdf_service = pdf_service
+        self.assist_client = assist_client
+        self.rasterizer = rasterizer
+        self.render_timeout = render_timeout
+        self.db = pdf_service.db
+        self.fs = pdf_service.fs
+        self.state = self.db[SYNC_STATE_COLLECTION]
+
+    def _mark_unchanged(self, state, listing_fp=None):
+        fields = {"checked_at": datetime.now(timezone.utc)}
+        if listing_fp is not None:
+            fields["listing_fingerprint"] = listing_fp
+        self.state.update_one({"_id": state["_id"]}, {"$set": fields})
+
+    def _rerender(self, pdf_filename, profiles, report):
+        if self.rasterizer is None:
+            return
+        for profile_name in {profile or DEFAULT_RENDER_PROFILE for profile in profiles}:
+            job = self.rasterizer.start(self.fs, pdf_filename, profile_name)
+            if job.wait(timeout=self.render_timeout) and job.status == "complete":
+                report.add(rerendered=1)
+            else:
+                raise RuntimeError(f"Re-rendering '{profile_name}' images for {pdf_filename} did not complete: {job.error}")
+
+    def check(self, state, report, listing_fp=None):
+        pdf_filename = state["_id"]
+        report.add(checked=1)
+        if listing_fp is not None and listing_fp == state.get("listing_fingerprint"):
+            report.add(unchanged=1)
+            self._mark_unchanged(state)
+            return False
+
+        key = content_key(state)
+        if not key:
+            raise ValueError(f"No Assist.org content key recorded for {pdf_filename}.")
+        pdf_bytes = self.pdf_service.fetch_pdf_bytes(
+            pdf_filename, lambda: self.assist_client.get_agreement_details(key, refresh=True)
+        )
+        report.add(downloads=1)
+        if pdf_bytes is None:
+            raise RuntimeError("Assist.org returned no content.")
+
+        if content_hash(pdf_bytes) == state.get("content_hash"):
+            report.add(unchanged=1)
+            self._mark_unchanged(state, listing_fp)
+            return False
+
+        context = {field: state[field] for field in ("kind", "year_id", "sending_id", "receiving_id", "major_key") if state.get(field) is not None}
+        if self.rasterizer is not None:
+            self.rasterizer.invalidate(pdf_filename)
+        stale_profiles = self.pdf_service.replace_pdf(pdf_filename, pdf_bytes, context)
+        if stale_profiles is None:
+            raise RuntimeError("Assist.org returned an invalid PDF.")
+        if listing_fp is not None:
+            self.state.update_one({"_id": pdf_filename}, {"$set": {"listing_fingerprint": listing_fp}})
+
+        report.change(pdf_filename, len(stale_profiles))
+        self._rerender(pdf_filename, stale_profiles, report)
+        return True
+
+    def _sync_group(self, group, report):
+        kind, year_id, sending_id, receiving_id = group["key"]
+        fingerprints = {}
+        if kind == "agreement":
+            listing = self.assist_client.get_agreements(receiving_id, sending_id, year_id, refresh=True)
+            report.add(listing_calls=1)
+            fingerprints = {r.get("key"): listing_fingerprint(r) for r in (listing or {}).get("reports", [])}
+
+        for state in group["states"]:
+            try:
+                self.check(state, report, fingerprints.get(state.get("major_key")))
+            except Exception as e:
+                logger.error("Sync failed for %s: %s", state['_id'], e)
+                report.fail(state["_id"], e)
+
+    def run(self, year_ids=None, progress=print):
+        started = time.perf_counter()
+        query = {"year_id": {"$in": list(year_ids)}} if year_ids else {}
+        groups = defaultdict(list)
+        for state in self.state.find(query):
+            groups[(state.get("kind"), state.get("year_id"), state.get("sending_id"), state.get("receiving_id"))].append(state)
+
+        report = SyncReport()
+        work = [{"key": key, "states": states} for key, states in sorted(groups.items(), key=lambda item: str(item[0]))]
+        for group, _, error in fan_out(lambda group: self._sync_group(group, report), work):
+            if error is not None:
+                logger.error("Sync failed for group %s: %s", group['key'], error, exc_info=error)
+                for state in group["states"]:
+                    report.fail(state["_id"], error)
+            progress(f"Synced {group['key'][0]} year {group['key'][1]} {group['key'][2]} -> {group['key'][3]} ({len(group['states'])} PDFs)")
+
+        result = report.to_dict()
+        result["elapsed_seconds"] = time.perf_counter() - started
+        return result
+
+
+@click.command('sync-agreements')
+@click.option('--year', 'years', type=int, multiple=True, help="Academic year id to sync (repeatable). Defaults to all stored years.")
+@click.option('--no-render', is_flag=True, help="Invalidate stale images without re-rendering them.")
+@with_appcontext
+def sync_agreements_command(years, no_render):
+    from .database import get_db, get_gridfs
+    from .pdf_service import PdfService
+    from .assist_api_client import assist_client
+    from .rasterizer import rasterizer
+
+    seeded, untracked = seed_sync_state(get_db(), get_gridfs())
+    if seeded or untracked:
+        click.echo(f"Started tracking {seeded} stored PDFs; {untracked} could not be matched to an Assist.org key.")
+
+    sync = AgreementSync(PdfService(assist_client).bind_storage(), assist_client, rasterizer=None if no_render else rasterizer)
+    try:
+        report = sync.run(years or None, progress=click.echo)
+    except Exception:
+        logger.exception("Agreement sync aborted")
+        raise click.ClickException("Agreement sync aborted.")
+
+    click.echo(
+        f"Done in {report['elapsed_seconds']:.1f}s: {report['checked']} checked, {report['unchanged']} unchanged, "
+        f"{report['changed']} changed, {report['failed']} failed ({report['listing_calls']} listing calls, "
+        f"{report['downloads']} downloads, {report['rerendered']} profiles re-rendered)"
+    )
+    for failure in report['failures']:
+        click.echo(f"  FAILED {failure['pdf_filename']}: {failure['error']}")
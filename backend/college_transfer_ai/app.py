@@ -0,0 +1,104 @@
+import logging
+import os
+from flask import Flask
+from flask_cors import CORS
+
+from college_transfer_ai.config import load_configuration
+from college_transfer_ai.logging_config import configure_logging, init_request_logging
+from college_transfer_ai.metrics import init_request_metrics
+from college_transfer_ai.database import init_db, get_db
+from college_transfer_ai.assist_api_client import assist_client
+from college_transfer_ai.response_cache import MongoCacheBackend
+from college_transfer_ai.prewarm import prewarm_command
+from college_transfer_ai.pdf_service import index_agreements_command
+from college_transfer_ai.agreement_sync import sync_agreements_command
+from college_transfer_ai.equivalency_index import build_equivalencies_command
+from college_transfer_ai.indexes import ensure_indexes, ensure_indexes_command
+from college_transfer_ai.routes.stripe_routes import stripe_bp
+from college_transfer_ai.routes.agreement_pdf_routes import agreement_pdf_bp
+from college_transfer_ai.routes.chat_routes import chat_bp, init_chat_routes
+from college_transfer_ai.routes.course_map_routes import course_map_bp
+from college_transfer_ai.routes.user_routes import user_bp
+from college_transfer_ai.routes.api_info_routes import api_info_bp
+from college_transfer_ai.routes.igetc_routes import igetc_bp
+from college_transfer_ai.routes.equivalency_routes import equivalency_bp
+from college_transfer_ai.routes.metrics_routes import metrics_bp
+
+logger = logging.getLogger(__name__)
+
+def create_app():
+    configure_logging()
+    app = Flask(__name__)
+    init_request_logging(app)
+    init_request_metrics(app)
+
+    logger.info("Creating Flask App")
+
+    try:
+        config = load_configuration()
+        app.config['APP_CONFIG'] = config
+    except Exception as config_err:
+        logger.critical("Failed to load configuration: %s", config_err, exc_info=True)
+        exit(1)
+
+    cors_origins = config.get("FRONTEND_URL", "*")
+    CORS(app, resources={r"/*": {"origins": cors_origins}})
+    logger.info("CORS Initialized (Origins: %s)", cors_origins)
+
+    try:
+        init_db(app, config.get('MONGO_URI'))
+    except (ConnectionError, ValueError, Exception) as db_err:
+        logger.critical("Database initialization failed: %s", db_err, exc_info=not isinstance(db_err, (ConnectionError, ValueError)))
+        exit(1)
+
+    try:
+        with app.app_context():
+            assist_client.response_cache.attach_backend(MongoCacheBackend(get_db()['assist_api_cache']))
+        logger.info("Assist.org persistent response cache attached")
+    except Exception as cache_err:
+        logger.warning("Failed to attach persistent Assist.org cache, using in-memory only: %s", cache_err)
+
+    try:
+        with app.app_context():
+            created, failures = ensure_indexes(get_db())
+        logger.log(logging.WARNING if failures else logging.INFO, "MongoDB indexes ensured (%s ok, %s failed)", len(created), len(failures))
+    except Exception as index_err:
+        logger.warning("Failed to ensure MongoDB indexes: %s", index_err)
+        failures = []
+
+    unique_failures = [failure for failure in failures if failure.get("unique")]
+    if unique_failures:
+        # Duplicate-user and session lookups rely on these; running without them silently corrupts data.
+        for failure in unique_failures:
+            logger.critical("Required unique index %s.%s could not be built: %s", failure['collection'], failure['index'], failure['error'])
+        exit(1)
+
+    try:
+        init_chat_routes(app)
+    except Exception as gemini_err:
+        logger.warning("Failed to initialize Gemini/Chat: %s", gemini_err)
+
+    api_prefix = '/api'
+    app.register_blueprint(stripe_bp, url_prefix=api_prefix)
+    app.register_blueprint(agreement_pdf_bp, url_prefix=api_prefix)
+    app.register_blueprint(chat_bp, url_prefix=api_prefix)
+    app.register_blueprint(course_map_bp, url_prefix=api_prefix)
+    app.register_blueprint(user_bp, url_prefix=api_prefix)
+    app.register_blueprint(api_info_bp, url_prefix=api_prefix)
+    app.register_blueprint(igetc_bp, url_prefix=api_prefix)
+    app.register_blueprint(equivalency_bp, url_prefix=api_prefix)
+    app.register_blueprint(metrics_bp)
+    logger.info("Blueprints Registered (Prefix: %s)", api_prefix)
+
+    @app.route('/')
+    def index():
+        return "College Transfer AI Backend is running."
+
+    app.cli.add_command(prewarm_command)
+    app.cli.add_command(index_agreements_command)
+    app.cli.add_command(build_equivalencies_command)
+    app.cli.add_command(sync_agreements_command)
+    app.cli.add_command(ensure_indexes_command)
+
+    logger.info("Flask App Creation Complete")
+    return app
\ No newline at end of file
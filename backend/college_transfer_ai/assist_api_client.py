@@ -1,78 +1,189 @@
+import logging
 import requests
+import random
+import threading
 import time
 import os
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlencode
+from requests.adapters import HTTPAdapter
+
+from .response_cache import TieredCache, MemoryLRUCache
+from .latency import LatencyTracker
+from .singleflight import SingleFlight
+from .metrics import observe_upstream, upstream_in_flight
+
+logger = logging.getLogger(__name__)
+
+DAY = 24 * 60 * 60
 
 class AssistApiClient:
     BASE_URL = "https://assist.org/api"
+    CACHE_TTLS = {
+        "institutions": 7 * DAY,
+        "institution": 7 * DAY,
+        "academic_years": 7 * DAY,
+        "agreements": DAY,
+        "default": 60 * 60
+    }
+    RETRY_STATUS_CODES = {429, 502, 503, 504}
 
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, response_cache=None):
         self.api_key = api_key or os.getenv("ASSIST_API_KEY")
         if not self.api_key:
             raise ValueError("ASSIST_API_KEY not found in environment variables.")
         self.headers = {"Authorization": f"Bearer {self.api_key}"}
-        self.institution_cache = {}
-        self.agreement_cache = {}
-
-    def _make_request(self, endpoint, params=None, use_cache=True, cache_key=None, cache_type=None):
-        if use_cache and cache_key:
-            if cache_type == 'institution' and cache_key in self.institution_cache:
-                print(f"Cache hit for institution: {cache_key}")
-                return self.institution_cache[cache_key]
-            elif cache_type == 'agreement' and cache_key in self.agreement_cache:
-                print(f"Cache hit for agreement: {cache_key}")
-                return self.agreement_cache[cache_key]
-
-        url = f"{self.BASE_URL}/{endpoint}"
-        max_retries = 3
-        for attempt in range(max_retries):
+        self.base_url = os.getenv("ASSIST_BASE_URL", self.BASE_URL).rstrip("/")
+        self.timeout = (
+            float(os.getenv("ASSIST_CONNECT_TIMEOUT", "3.05")),
+            float(os.getenv("ASSIST_READ_TIMEOUT", "20"))
+        )
+        self.max_retries = int(os.getenv("ASSIST_MAX_RETRIES", "3"))
+        self.backoff_base = float(os.getenv("ASSIST_BACKOFF_BASE", "0.5"))
+        self.backoff_max = float(os.getenv("ASSIST_BACKOFF_MAX", "10"))
+        self.pool_size = int(os.getenv("ASSIST_POOL_SIZE", "20"))
+        self.session = self._build_session(self.pool_size)
+        self.max_concurrency = int(os.getenv("ASSIST_MAX_CONCURRENCY", "8"))
+        self._concurrency_limit = threading.BoundedSemaphore(self.max_concurrency)
+        self.latency = LatencyTracker()
+        self.in_flight = SingleFlight()
+        self.response_cache = response_cache or TieredCache(
+            memory=MemoryLRUCache(max_entries=int(os.getenv("ASSIST_CACHE_MAX_ENTRIES", "2048")))
+        )
+        self.cache_ttls = dict(self.CACHE_TTLS)
+        for namespace in self.CACHE_TTLS:
+            override = os.getenv(f"ASSIST_CACHE_TTL_{namespace.upper()}")
+            if override:
+                self.cache_ttls[namespace] = int(override)
+
+    def _build_session(self, pool_size):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(self.headers)
+        return session
+
+    def _retry_delay(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
             try:
-                response = requests.get(url, headers=self.headers, params=params)
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                try:
+                    retry_at = parsedate_to_datetime(retry_after)
+                    return min(max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0), self.backoff_max)
+                except (TypeError, ValueError):
+                    pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    @staticmethod
+    def _cache_namespace(endpoint):
+        parts = endpoint.strip("/").split("/")
+        if parts == ["institutions"]:
+            return "institutions"
+        if parts[0] == "institutions" and len(parts) == 2:
+            return "institution"
+        if parts[0] == "institutions" and parts[-1] == "academic-years":
+            return "academic_years"
+        if parts == ["agreements"]:
+            return "agreements"
+        if parts[0] == "agreements" and parts[-1] == "content":
+            return "agreement_content"
+        return "default"
+
+    @staticmethod
+    def _cache_key(endpoint, params):
+        query = urlencode(sorted((k, v) for k, v in (params or {}).items() if v is not None))
+        return f"assist:{endpoint}?{query}" if query else f"assist:{endpoint}"
+
+    def _make_request(self, endpoint, params=None, use_cache=True, refresh=False):
+        namespace = self._cache_namespace(endpoint)
+        ttl = self.cache_ttls.get(namespace, self.cache_ttls["default"])
+        cache_key = self._cache_key(endpoint, params)
+        if use_cache and not refresh:
+            cached = self.response_cache.get(cache_key, namespace=namespace, ttl=ttl)
+            if cached is not None:
+                logger.debug("Assist.org cache hit for %s", cache_key, extra={"sample_rate": 100})
+                return cached
+
+        # A refresh must not join a plain read that may finish with data fetched before the refresh began.
+        flight_key = f"{cache_key}:refresh" if refresh else cache_key
+        data = self.in_flight.do(flight_key, self._fetch, endpoint, params, namespace)
+        if use_cache and data is not None:
+            self.response_cache.set(cache_key, data, namespace=namespace, ttl=ttl)
+        return data
+
+    def _fetch(self, endpoint, params, namespace):
+        url = f"{self.base_url}/{endpoint}"
+        for attempt in range(self.max_retries):
+            started = time.perf_counter()
+            try:
+                with self._concurrency_limit, upstream_in_flight.labels("assist").track():
+                    response = self.session.get(url, params=params, timeout=self.timeout)
+                self.latency.record(namespace, time.perf_counter() - started)
+                observe_upstream("assist", namespace, time.perf_counter() - started,
+                                 f"http_{response.status_code}" if response.status_code >= 400 else None)
+                if response.status_code in self.RETRY_STATUS_CODES and attempt < self.max_retries - 1:
+                    delay = self._retry_delay(attempt, response)
+                    logger.warning("Assist.org returned %s for %s. Retrying in %.2f seconds...", response.status_code, url, delay)
+                    time.sleep(delay)
+                    continue
                 response.raise_for_status()
-                data = response.json()
-                if use_cache and cache_key:
-                    if cache_type == 'institution':
-                        self.institution_cache[cache_key] = data
-                    elif cache_type == 'agreement':
-                        self.agreement_cache[cache_key] = data
-                return data
+                return response.json()
             except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 429:
-                    print(f"Rate limit exceeded. Retrying in {2 ** attempt} seconds...")
-                    time.sleep(2 ** attempt)
-                else:
-                    print(f"HTTP error: {e} for URL: {url} with params: {params}")
-                    return None
+                logger.error("HTTP error: %s for URL: %s with params: %s", e, url, params)
+                return None
+            except requests.exceptions.ConnectionError as e:
+                self.latency.record(namespace, time.perf_counter() - started)
+                observe_upstream("assist", namespace, time.perf_counter() - started, "connection")
+                if attempt < self.max_retries - 1:
+                    delay = self._retry_delay(attempt)
+                    logger.warning("Connection to Assist.org failed: %s. Retrying in %.2f seconds...", e, delay)
+                    time.sleep(delay)
+                    continue
+                logger.error("Request failed: %s for URL: %s with params: %s", e, url, params)
+                return None
             except requests.exceptions.RequestException as e:
-                print(f"Request failed: {e} for URL: {url} with params: {params}")
+                self.latency.record(namespace, time.perf_counter() - started)
+                observe_upstream("assist", namespace, time.perf_counter() - started, type(e).__name__)
+                logger.error("Request failed: %s for URL: %s with params: %s", e, url, params)
                 return None
         return None
 
+    def get_latency_stats(self):
+        return {
+            "pool_size": self.pool_size,
+            "max_concurrency": self.max_concurrency,
+            "timeout": {"connect": self.timeout[0], "read": self.timeout[1]},
+            "endpoints": self.latency.percentiles()
+        }
+
+    def get_cache_stats(self):
+        return dict(self.response_cache.stats(), coalescing=self.in_flight.stats())
+
     def get_institutions(self):
         return self._make_request("institutions")
 
     def get_institution_name(self, institution_id):
-        cache_key = str(institution_id)
-        if cache_key in self.institution_cache and 'name' in self.institution_cache[cache_key]:
-            print(f"Cache hit for institution name: {institution_id}")
-            return self.institution_cache[cache_key]['name']
-
-        data = self._make_request(f"institutions/{institution_id}", use_cache=True, cache_key=cache_key, cache_type='institution')
+        data = self._make_request(f"institutions/{institution_id}")
         return data.get('name') if data else None
 
     def get_academic_years(self, institution_id):
         return self._make_request(f"institutions/{institution_id}/academic-years")
 
-    def get_agreements(self, receiving_institution_id, sending_institution_id, academic_year_id, category_code=None):
-        cache_key = f"{receiving_institution_id}_{sending_institution_id}_{academic_year_id}_{category_code or 'all'}"
+    def get_agreements(self, receiving_institution_id, sending_institution_id, academic_year_id, category_code=None, refresh=False):
         params = {
             "receivingInstitutionId": receiving_institution_id,
             "sendingInstitutionId": sending_institution_id,
             "academicYearId": academic_year_id,
             "categoryCode": category_code
         }
-        return self._make_request("agreements", params=params, use_cache=True, cache_key=cache_key, cache_type='agreement')
+        return self._make_request("agreements", params=params, refresh=refresh)
 
-    def get_agreement_details(self, agreement_key):
-        return self._make_request(f"agreements/{agreement_key}/content")
+    def get_agreement_details(self, agreement_key, refresh=False):
+        # Agreement PDFs are persisted in GridFS by PdfService; keep them out of the response cache.
+        return self._make_request(f"agreements/{agreement_key}/content", use_cache=False, refresh=refresh)
 
 assist_client = AssistApiClient()
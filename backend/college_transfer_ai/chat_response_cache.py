@@ -0,0 +1,51 @@
+import logging
+import os
+import re
+import json
+import hashlib
+
+from .response_cache import TieredCache, MemoryLRUCache
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAMESPACE = "chat_responses"
+CACHE_HIT_USAGE_POLICIES = ("count", "free")
+MAX_STORED_RESPONSES = int(os.getenv("CHAT_CACHE_MAX_STORED", "20000"))
+
+
+def cache_hit_usage_policy(value):
+    policy = (value or "count").lower()
+    if policy not in CACHE_HIT_USAGE_POLICIES:
+        logger.warning("Unknown CHAT_CACHE_HIT_USAGE '%s', counting cache hits against usage.", value)
+        return "count"
+    return policy
+
+
+def normalize_prompt(text):
+    return re.sub(r"\s+", " ", text.lower()).strip().rstrip("?!. ")
+
+
+def _part_digest(part):
+    if isinstance(part, dict) and "data" in part:
+        return "image:" + hashlib.sha256(part["data"]).hexdigest()
+    return "text:" + hashlib.sha256(str(part).encode("utf-8")).hexdigest()
+
+
+def chat_cache_key(model_name, history, prompt_parts):
+    *context_parts, new_message = prompt_parts
+    digest = hashlib.sha256()
+    digest.update(model_name.encode("utf-8"))
+    history_digests = [
+        {"role": msg["role"], "parts": [_part_digest(part) for part in msg["parts"]]}
+        for msg in history
+    ]
+    digest.update(json.dumps(history_digests).encode("utf-8"))
+    digest.update(json.dumps([_part_digest(part) for part in context_parts]).encode("utf-8"))
+    digest.update(normalize_prompt(str(new_message)).encode("utf-8"))
+    return f"chat:{digest.hexdigest()}"
+
+
+chat_response_cache = TieredCache(
+    memory=MemoryLRUCache(max_entries=int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "1024"))),
+    default_ttl=int(os.getenv("CHAT_CACHE_TTL", str(24 * 60 * 60)))
+)
@@ -0,0 +1,85 @@
+import os
+import uuid
+from datetime import datetime, timezone
+
+CHAT_SESSIONS_COLLECTION = 'chat_sessions'
+HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "8000"))
+MAX_STORED_MESSAGES = int(os.getenv("CHAT_SESSION_MAX_MESSAGES", "200"))
+SESSION_TTL_SECONDS = int(os.getenv("CHAT_SESSION_TTL_DAYS", "30")) * 24 * 60 * 60
+
+
+def ensure_session_indexes(collection):
+    collection.create_index("updated_at", expireAfterSeconds=SESSION_TTL_SECONDS)
+    collection.create_index([("google_user_id", 1), ("updated_at", -1)])
+
+
+def estimate_tokens(text):
+    return len(text or "") // 4 + 1
+
+
+def _message(role, content, now):
+    return {"role": role, "content": content, "tokens": estimate_tokens(content), "at": now}
+
+
+def new_session(google_user_id, attachments=None, history=None):
+    now = datetime.now(timezone.utc)
+    messages = []
+    for msg in history or []:
+        role = 'model' if msg.get('role') == 'assistant' else msg.get('role')
+        if role in ('user', 'model') and msg.get('content'):
+            messages.append(_message(role, msg['content'], now))
+
+    return {
+        "_id": str(uuid.uuid4()),
+        "google_user_id": google_user_id,
+        "attachments": attachments or [],
+        "messages": messages[-MAX_STORED_MESSAGES:],
+        "created_at": now,
+        "updated_at": now
+    }
+
+
+def get_session(collection, session_id, google_user_id):
+    return collection.find_one({"_id": session_id, "google_user_id": google_user_id})
+
+
+def unseen_attachments(session, attachments):
+    known = {attachment.get("source") for attachment in session.get("attachments", [])}
+    return [attachment for attachment in attachments if attachment.get("source") not in known]
+
+
+def push_attachments(collection, session_id, attachments):
+    collection.update_one(
+        {"_id": session_id},
+        {"$push": {"attachments": {"$each": attachments}}, "$set": {"updated_at": datetime.now(timezone.utc)}}
+    )
+
+
+def append_turn(collection, session_id, user_text, model_text):
+    now = datetime.now(timezone.utc)
+    collection.update_one(
+        {"_id": session_id},
+        {
+            "$push": {"messages": {"$each": [_message("user", user_text, now), _message("model", model_text, now)], "$slice": -MAX_STORED_MESSAGES}},
+            "$set": {"updated_at": now}
+        }
+    )
+
+
+def history_window(messages, token_budget=HISTORY_TOKEN_BUDGET):
+    kept = []
+    used = 0
+    for msg in reversed(messages):
+        tokens = msg.get("tokens") or estimate_tokens(msg.get("content"))
+        if kept and used + tokens > token_budget:
+            break
+        kept.append(msg)
+        used += tokens
+    kept.reverse()
+    while kept and kept[0]["role"] != "user":
+        kept.pop(0)
+    return kept, len(messages) - len(kept)
+
+
+def delete_session(collection, session_id, google_user_id):
+    return collection.delete_one({"_id": session_id, "google_user_id": google_user_id}).deleted_count
@@ -0,0 +1,73 @@
+import logging
+import os
+import threading
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+logger = logging.getLogger(__name__)
+
+FANOUT_MAX_WORKERS = int(os.getenv("FANOUT_MAX_WORKERS", "16"))
+BACKGROUND_MAX_WORKERS = int(os.getenv("BACKGROUND_MAX_WORKERS", "4"))
+BACKGROUND_MAX_PENDING = int(os.getenv("BACKGROUND_MAX_PENDING", "1000"))
+
+_executor = None
+_executor_lock = threading.Lock()
+_background_executor = None
+_background_slots = threading.BoundedSemaphore(BACKGROUND_MAX_PENDING)
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=FANOUT_MAX_WORKERS, thread_name_prefix="fanout")
+    return _executor
+
+def get_background_executor():
+    global _background_executor
+    if _background_executor is None:
+        with _executor_lock:
+            if _background_executor is None:
+                _background_executor = ThreadPoolExecutor(max_workers=BACKGROUND_MAX_WORKERS, thread_name_prefix="background")
+    return _background_executor
+
+def submit_background(func, *args):
+    # Background work gets its own bounded pool so it never delays request-path fan_out calls.
+    if not _background_slots.acquire(blocking=False):
+        logger.warning("Background queue full (%s pending); dropping %s.", BACKGROUND_MAX_PENDING, getattr(func, "__name__", func))
+        return None
+    try:
+        future = get_background_executor().submit(contextvars.copy_context().run, func, *args)
+    except Exception:
+        _background_slots.release()
+        raise
+    future.add_done_callback(lambda _: _background_slots.release())
+    return future
+
+def fan_out(func, items, timeout=None):
+    items = list(items)
+    if len(items) <= 1:
+        results = []
+        for item in items:
+            try:
+                results.append((item, func(item), None))
+            except Exception as e:
+                results.append((item, None, e))
+        return results
+
+    executor = get_executor()
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    futures = [executor.submit(contextvars.copy_context().run, func, item) for item in items]
+
+    results = []
+    for item, future in zip(items, futures):
+        remaining = max(deadline - time.monotonic(), 0) if deadline is not None else None
+        try:
+            results.append((item, future.result(timeout=remaining), None))
+        except FutureTimeoutError:
+            future.cancel()
+            results.append((item, None, TimeoutError(f"Timed out after {timeout} seconds")))
+        except Exception as e:
+            results.append((item, None, e))
+    return results
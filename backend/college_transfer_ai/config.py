@@ -1,22 +1,23 @@
+import logging
 import os
 import json
-import traceback
+
+logger = logging.getLogger(__name__)
 
 def load_configuration():
     env = os.getenv('FLASK_ENV', 'development')
     config_filename = f"config.{env}.json"
-    print(f"--- Loading configuration for environment: {env} from {config_filename} ---")
+    logger.info("Loading configuration for environment: %s from %s", env, config_filename)
 
     config = {}
     try:
         with open(config_filename, 'r') as f:
             config = json.load(f)
-        print("--- Configuration loaded successfully from JSON file ---")
+        logger.info("Configuration loaded successfully from JSON file")
     except FileNotFoundError:
-        print(f"!!! WARNING: {config_filename} not found. Attempting to load from environment variables.")
+        logger.warning("%s not found. Attempting to load from environment variables.", config_filename)
     except json.JSONDecodeError as e:
-        print(f"!!! ERROR: Failed to parse {config_filename}: {e}. Attempting to load from environment variables.")
-        traceback.print_exc()
+        logger.exception("Failed to parse %s: %s. Attempting to load from environment variables.", config_filename, e)
 
     env_vars = {
         "MONGO_URI": os.getenv("MONGO_URI"),
@@ -26,7 +27,13 @@ def load_configuration():
         "STRIPE_SECRET_KEY": os.getenv("STRIPE_SECRET_KEY"),
         "STRIPE_PUBLISHABLE_KEY": os.getenv("STRIPE_PUBLISHABLE_KEY"),
         "STRIPE_WEBHOOK_SECRET": os.getenv("STRIPE_WEBHOOK_SECRET"),
-        "GOOGLE_CLIENT_ID": os.getenv("GOOGLE_CLIENT_ID")
+        "GOOGLE_CLIENT_ID": os.getenv("GOOGLE_CLIENT_ID"),
+        "GOOGLE_API_KEY": os.getenv("GOOGLE_API_KEY"),
+        "PERPLEXITY_API_KEY": os.getenv("PERPLEXITY_API_KEY"),
+        "GEMINI_API_ENDPOINT": os.getenv("GEMINI_API_ENDPOINT"),
+        "CHAT_AGREEMENT_CONTEXT": os.getenv("CHAT_AGREEMENT_CONTEXT"),
+        "CHAT_RESPONSE_CACHE": os.getenv("CHAT_RESPONSE_CACHE"),
+        "CHAT_CACHE_HIT_USAGE": os.getenv("CHAT_CACHE_HIT_USAGE")
     }
 
     loaded_from_env = False
@@ -34,17 +41,17 @@ def load_configuration():
         if value is not None:
             config[key] = value
             if not loaded_from_env:
-                print("--- Loading/Overriding configuration from environment variables ---")
+                logger.info("Loading/Overriding configuration from environment variables")
                 loaded_from_env = True
-            print(f"    Loaded {key} from environment.")
+            logger.info("Loaded %s from environment.", key)
 
     required_keys = ["MONGO_URI", "ASSIST_API_KEY", "GEMINI_API_KEY", "FRONTEND_URL", "STRIPE_SECRET_KEY", "GOOGLE_CLIENT_ID"]
     missing_keys = [key for key in required_keys if not config.get(key)]
 
     if missing_keys:
         error_message = f"Missing required configuration keys: {', '.join(missing_keys)}"
-        print(f"!!! CRITICAL: {error_message}")
+        logger.critical("%s", error_message)
         raise ValueError(error_message)
 
-    print("--- Final configuration loaded ---")
+    logger.info("Final configuration loaded")
     return config
@@ -1,105 +1,232 @@
-from flask import current_app, g 
+import logging
+from flask import current_app
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure
+from pymongo.monitoring import ConnectionPoolListener
+from pymongo.read_preferences import read_pref_mode_from_name, make_read_preference
 import gridfs
 import os
+import threading
 from urllib.parse import urlparse
-import traceback
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_NAME = 'college_transfer_ai_db'
 
 client = None
+client_uri = None
 db = None
+read_db = None
 fs = None
+read_fs = None
 users_collection = None
 course_maps_collection = None
+_client_lock = threading.Lock()
+
+
+class PoolMetrics(ConnectionPoolListener):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open_connections = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.pool_clears = 0
+        self.max_pool_size = None
+        self.min_pool_size = None
+
+    def configure(self, options):
+        self.max_pool_size = options["maxPoolSize"]
+        self.min_pool_size = options["minPoolSize"]
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.checked_out += 1
+            self.checkouts += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def stats(self):
+        with self._lock:
+            max_pool_size = self.max_pool_size
+            return {
+                "max_pool_size": max_pool_size,
+                "min_pool_size": self.min_pool_size,
+                "open_connections": self.open_connections,
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "utilization": self.checked_out / max_pool_size if max_pool_size else 0.0,
+                "waiting": self.waiting,
+                "max_waiting": self.max_waiting,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "pool_clears": self.pool_clears
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+def _setting(settings, key, default):
+    value = (settings or {}).get(key) or os.getenv(key)
+    return int(value) if value not in (None, "") else default
+
+
+def client_options(settings=None):
+    return {
+        "maxPoolSize": _setting(settings, "MONGO_MAX_POOL_SIZE", 50),
+        "minPoolSize": _setting(settings, "MONGO_MIN_POOL_SIZE", 0),
+        "maxIdleTimeMS": _setting(settings, "MONGO_MAX_IDLE_TIME_MS", 5 * 60 * 1000),
+        "waitQueueTimeoutMS": _setting(settings, "MONGO_WAIT_QUEUE_TIMEOUT_MS", 10000),
+        "serverSelectionTimeoutMS": _setting(settings, "MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+        "connectTimeoutMS": _setting(settings, "MONGO_CONNECT_TIMEOUT_MS", 10000),
+        "socketTimeoutMS": _setting(settings, "MONGO_SOCKET_TIMEOUT_MS", 30000),
+        "event_listeners": [pool_metrics]
+    }
+
+
+def read_preference(settings=None):
+    name = (settings or {}).get("MONGO_READ_PREFERENCE") or os.getenv("MONGO_READ_PREFERENCE") or "primaryPreferred"
+    return make_read_preference(read_pref_mode_from_name(name), None)
+
+
+def get_shared_client(mongo_uri=None, settings=None):
+    global client, client_uri
+    with _client_lock:
+        if client is None:
+            if not mongo_uri:
+                raise ValueError("MONGO_URI is required for database initialization.")
+            options = client_options(settings)
+            client = MongoClient(mongo_uri, **options)
+            client_uri = mongo_uri
+            pool_metrics.configure(options)
+        return client
+
 
 def init_db(app, mongo_uri):
-    global client, db, fs, users_collection, course_maps_collection
+    global client, db, read_db, fs, read_fs, users_collection, course_maps_collection
 
-    if client: 
-        print("--- Database already initialized ---")
+    if db is not None:
+        logger.info("Database already initialized")
         return
 
     if not mongo_uri:
-        print("!!! CRITICAL: MONGO_URI not set in configuration.")
+        logger.critical("MONGO_URI not set in configuration.")
         raise ValueError("MONGO_URI is required for database initialization.")
 
+    settings = app.config.get('APP_CONFIG', {})
     try:
-        print(f"--- Attempting MongoDB Connection to URI specified ---") 
-        client = MongoClient(mongo_uri)
-        client.admin.command('ismaster') 
+        logger.info("Attempting MongoDB Connection to URI specified")
+        get_shared_client(mongo_uri, settings).admin.command('ping')
         db_name = urlparse(mongo_uri).path.lstrip('/')
         if not db_name:
-            db_name = 'college_transfer_ai_db' 
-            print(f"Warning: Database name not found in MONGO_URI path, defaulting to '{db_name}'.")
-        db = client[db_name] 
-        fs = gridfs.GridFS(db) 
+            db_name = DEFAULT_DB_NAME
+            logger.warning("Database name not found in MONGO_URI path, defaulting to '%s'.", db_name)
+        db = client[db_name]
+        read_db = client.get_database(db_name, read_preference=read_preference(settings))
+        fs = gridfs.GridFS(db)
+        read_fs = gridfs.GridFS(read_db)
 
-        users_collection = db['users'] 
-        course_maps_collection = db['course_maps'] 
+        users_collection = db['users']
+        course_maps_collection = db['course_maps']
 
-        print(f"--- MongoDB Connected & GridFS Initialized (DB: {db_name}) ---")
-        print(f"--- Collections Initialized: {users_collection.name}, {course_maps_collection.name} ---")
+        logger.info("MongoDB Connected & GridFS Initialized (DB: %s, pool %s-%s, reads: %s)", db_name, pool_metrics.min_pool_size, pool_metrics.max_pool_size, read_db.read_preference.name)
+        logger.info("Collections Initialized: %s, %s", users_collection.name, course_maps_collection.name)
 
     except ConnectionFailure as e:
-        print(f"!!! CRITICAL: MongoDB Server not available. Error: {e}")
-        client = None; db = None; fs = None; users_collection = None; course_maps_collection = None
+        logger.critical("MongoDB Server not available. Error: %s", e)
+        _reset()
         raise ConnectionError(f"Failed to connect to MongoDB: {e}") from e
     except Exception as e:
-        print(f"!!! CRITICAL: An unexpected error occurred during MongoDB initialization: {e}")
-        traceback.print_exc()
-        client = None; db = None; fs = None; users_collection = None; course_maps_collection = None
+        logger.critical("An unexpected error occurred during MongoDB initialization: %s", e, exc_info=True)
+        _reset()
         raise
 
 
+def _reset():
+    global client, client_uri, db, read_db, fs, read_fs, users_collection, course_maps_collection
+    if client is not None:
+        client.close()
+    client = None; client_uri = None; db = None; read_db = None; fs = None; read_fs = None; users_collection = None; course_maps_collection = None
+
+
+def _require(value, name):
+    if value is None:
+        raise Exception(f"Global {name} not initialized. Ensure init_db() was called successfully at app startup.")
+    return value
+
+
 def get_db():
-    if 'db' not in g:
-        if db is None: 
-             raise Exception("Global database not initialized. Ensure init_db() was called successfully at app startup.")
-        g.db = db 
-        print("--- Attaching global DB to request context 'g' ---")
-    return g.db
+    return _require(db, "database")
+
+def get_read_db():
+    return _require(read_db, "database")
 
 def get_gridfs():
-    if 'fs' not in g:
-        if fs is None: 
-             raise Exception("Global GridFS not initialized. Ensure init_db() was called successfully at app startup.")
-        g.fs = fs 
-        print("--- Attaching global GridFS to request context 'g' ---")
-    return g.fs
+    return _require(fs, "GridFS")
+
+def get_read_gridfs():
+    return _require(read_fs, "GridFS")
 
 def get_users_collection():
-    if 'users_collection' not in g:
-        if users_collection is None:
-            raise Exception("Global Users collection not initialized. Ensure init_db() was called successfully.")
-        g.users_collection = users_collection
-        print("--- Attaching global Users Collection to request context 'g' ---")
-    return g.users_collection
+    return _require(users_collection, "Users collection")
 
 def get_course_maps_collection():
-    if 'course_maps_collection' not in g:
-        if course_maps_collection is None:
-             raise Exception("Global Course maps collection not initialized. Ensure init_db() was called successfully.")
-        g.course_maps_collection = course_maps_collection
-        print("--- Attaching global Course Maps Collection to request context 'g' ---")
-    return g.course_maps_collection
-
+    return _require(course_maps_collection, "Course maps collection")
 
-def close_db(e=None):
-    db_instance = g.pop('db', None)
-    fs_instance = g.pop('fs', None)
 
-    if db_instance is not None or fs_instance is not None:
-         print("--- Cleaning up DB/GridFS references from request context 'g' ---")
+def get_pool_stats():
+    return pool_metrics.stats()
 
 
 def get_mongo_client():
     MONGO_URI = os.getenv("MONGO_URI")
-    if not MONGO_URI:
+    if client is None and not MONGO_URI:
          try:
              MONGO_URI = current_app.config['APP_CONFIG'].get("MONGO_URI")
              if not MONGO_URI:
                  raise ValueError("MONGO_URI environment variable not set and not found in app config.")
          except (RuntimeError, KeyError):
              raise ValueError("MONGO_URI environment variable not set and no Flask app context available.")
-    print("--- Creating new standalone MongoDB client connection (caller must close) ---")
-    return MongoClient(MONGO_URI)
\ No newline at end of file
+    return get_shared_client(MONGO_URI)
@@ -0,0 +1,160 @@
+from datetime import datetime, timezone
+
+import click
+from flask.cli import with_appcontext
+from pymongo import ASCENDING, DESCENDING
+
+from .agreement_index import COURSES_COLLECTION, normalize_course_code
+
+EQUIVALENCIES_COLLECTION = 'course_equivalencies'
+MAX_BATCH_QUERIES = 200
+
+EQUIVALENCY_PROJECTION = {
+    "_id": 0,
+    "year_id": 1,
+    "sending_id": 1,
+    "receiving_id": 1,
+    "receiving_code": 1,
+    "receiving_course": 1,
+    "sending_courses": 1,
+    "conjunction": 1,
+    "articulated": 1,
+    "major_key": 1,
+    "pdf_filename": 1
+}
+
+
+def ensure_equivalency_indexes(collection):
+    collection.create_index(
+        [("receiving_id", ASCENDING), ("receiving_code", ASCENDING), ("sending_id", ASCENDING), ("year_id", DESCENDING)],
+        name="receiving_course_lookup"
+    )
+    collection.create_index(
+        [("sending_id", ASCENDING), ("sending_codes", ASCENDING), ("receiving_id", ASCENDING), ("year_id", DESCENDING)],
+        name="sending_course_lookup"
+    )
+    collection.create_index("pdf_filename")
+
+
+def _equivalency_doc(row, now):
+    sending_courses = row.get("sending_courses", [])
+    return {
+        "receiving_id": row["receiving_id"],
+        "receiving_code": row["receiving_course"]["code"],
+        "sending_id": row["sending_id"],
+        "year_id": row["year_id"],
+        "receiving_course": row["receiving_course"],
+        "sending_courses": sending_courses,
+        "sending_codes": [course["code"] for course in sending_courses],
+        "conjunction": row.get("conjunction"),
+        "articulated": bool(row.get("articulated")),
+        "major_key": row.get("major_key"),
+        "pdf_filename": row["pdf_filename"],
+        "updated_at": now
+    }
+
+
+def update_equivalencies(db, pdf_filename, rows):
+    collection = db[EQUIVALENCIES_COLLECTION]
+    now = datetime.now(timezone.utc)
+    docs = [
+        _equivalency_doc(row, now) for row in rows
+        if row.get("receiving_id") is not None and row.get("sending_id") is not None and row.get("year_id") is not None
+    ]
+    collection.delete_many({"pdf_filename": pdf_filename})
+    if docs:
+        collection.insert_many(docs)
+    return len(docs)
+
+
+def index_agreement_equivalencies(db, pdf_filename, rows):
+    if rows and rows[0].get("kind") == "agreement":
+        update_equivalencies(db, pdf_filename, rows)
+
+
+def rebuild_equivalencies(db, batch_size=1000):
+    collection = db[EQUIVALENCIES_COLLECTION]
+    collection.delete_many({})
+    ensure_equivalency_indexes(collection)
+
+    now = datetime.now(timezone.utc)
+    written = 0
+    batch = []
+    for row in db[COURSES_COLLECTION].find({"kind": "agreement", "receiving_id": {"$ne": None}}):
+        batch.append(_equivalency_doc(row, now))
+        if len(batch) >= batch_size:
+            collection.insert_many(batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch)
+        written += len(batch)
+    return written
+
+
+def _query_filter(query):
+    clause = {
+        "receiving_id": int(query["receiving_id"]),
+        "receiving_code": normalize_course_code(query["course"])
+    }
+    sending_ids = query.get("sending_ids")
+    if sending_ids:
+        clause["sending_id"] = {"$in": [int(sending_id) for sending_id in sending_ids]}
+    if query.get("year_id") is not None:
+        clause["year_id"] = int(query["year_id"])
+    return clause
+
+
+def _merge_majors(docs, latest_only):
+    merged = {}
+    for doc in sorted(docs, key=lambda doc: (doc["sending_id"], -doc["year_id"])):
+        key = doc["sending_id"] if latest_only else (doc["sending_id"], doc["year_id"])
+        entry = merged.get(key)
+        if entry is None:
+            entry = merged[key] = {field: value for field, value in doc.items() if field not in ("major_key", "pdf_filename")}
+            entry["major_keys"] = []
+            entry["pdf_filenames"] = []
+        elif entry["year_id"] != doc["year_id"]:
+            continue
+        if doc.get("major_key") and doc["major_key"] not in entry["major_keys"]:
+            entry["major_keys"].append(doc["major_key"])
+        entry["pdf_filenames"].append(doc["pdf_filename"])
+    return list(merged.values())
+
+
+def find_equivalencies(db, queries):
+    filters = [_query_filter(query) for query in queries]
+    if not filters:
+        return []
+
+    docs = list(db[EQUIVALENCIES_COLLECTION].find(
+        filters[0] if len(filters) == 1 else {"$or": filters},
+        EQUIVALENCY_PROJECTION
+    ))
+
+    results = []
+    for query, clause in zip(queries, filters):
+        allowed_sending = set(clause["sending_id"]["$in"]) if "sending_id" in clause else None
+        matches = [
+            doc for doc in docs
+            if doc["receiving_id"] == clause["receiving_id"]
+            and doc["receiving_code"] == clause["receiving_code"]
+            and (allowed_sending is None or doc["sending_id"] in allowed_sending)
+            and ("year_id" not in clause or doc["year_id"] == clause["year_id"])
+        ]
+        results.append({
+            "receiving_id": clause["receiving_id"],
+            "course": clause["receiving_code"],
+            "year_id": clause.get("year_id"),
+            "equivalencies": _merge_majors(matches, latest_only="year_id" not in clause)
+        })
+    return results
+
+
+@click.command('build-equivalencies')
+@with_appcontext
+def build_equivalencies_command():
+    from .database import get_db
+
+    written = rebuild_equivalencies(get_db())
+    click.echo(f"Rebuilt course equivalency index with {written} entries.")
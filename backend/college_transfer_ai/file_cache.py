@@ -0,0 +1,123 @@
+import logging
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+from .concurrency import fan_out
+from .metrics import gridfs_operation_duration
+
+logger = logging.getLogger(__name__)
+
+CachedFile = namedtuple('CachedFile', ['filename', 'upload_id', 'data', 'content_type', 'upload_date', 'metadata'])
+
+
+class GridFSFileCache:
+    def __init__(self, max_bytes=256 * 1024 * 1024, max_file_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.uncacheable = 0
+
+    @staticmethod
+    def _key(grid_out):
+        return (grid_out.filename, grid_out._id)
+
+    def cacheable(self, grid_out):
+        return grid_out.length <= min(self.max_file_bytes, self.max_bytes)
+
+    def get(self, grid_out):
+        with self._lock:
+            cached = self._entries.get(self._key(grid_out))
+            if cached is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(self._key(grid_out))
+            self.hits += 1
+            return cached
+
+    def put(self, grid_out, data):
+        cached = CachedFile(grid_out.filename, grid_out._id, data, getattr(grid_out, "contentType", None), grid_out.upload_date, getattr(grid_out, "metadata", None) or {})
+        if len(data) > min(self.max_file_bytes, self.max_bytes):
+            with self._lock:
+                self.uncacheable += 1
+            return cached
+
+        key = self._key(grid_out)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= len(previous.data)
+            self._entries[key] = cached
+            self.current_bytes += len(data)
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted.data)
+                self.evictions += 1
+        return cached
+
+    def _read_and_put(self, grid_out):
+        with gridfs_operation_duration.labels("read").time():
+            data = grid_out.read()
+        return self.put(grid_out, data)
+
+    def read(self, grid_out):
+        cached = self.get(grid_out)
+        if cached is not None:
+            return cached
+        return self._read_and_put(grid_out)
+
+    def read_many(self, fs, filenames):
+        latest = {}
+        with gridfs_operation_duration.labels("find").time():
+            found = list(fs.find({"filename": {"$in": list(set(filenames))}}))
+        for grid_out in found:
+            current = latest.get(grid_out.filename)
+            if current is None or (grid_out.upload_date and current.upload_date and grid_out.upload_date > current.upload_date):
+                latest[grid_out.filename] = grid_out
+
+        files = {}
+        missing = []
+        for filename, grid_out in latest.items():
+            cached = self.get(grid_out)
+            if cached is not None:
+                files[filename] = cached
+            else:
+                missing.append(grid_out)
+
+        for grid_out, cached, error in fan_out(self._read_and_put, missing):
+            if error is not None:
+                logger.error("Error reading '%s' from GridFS: %s", grid_out.filename, error)
+            else:
+                files[grid_out.filename] = cached
+        return files
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "max_file_bytes": self.max_file_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "uncacheable": self.uncacheable
+            }
+
+
+file_cache = GridFSFileCache(
+    max_bytes=int(os.getenv("GRIDFS_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+    max_file_bytes=int(os.getenv("GRIDFS_CACHE_MAX_FILE_BYTES", str(16 * 1024 * 1024)))
+)
@@ -1,8 +1,15 @@
-from pymongo import MongoClient
+from urllib.parse import urlparse
+from .. import database
 
-def get_mongo_client(uri):
-    return MongoClient(uri)
+def _hosts(uri):
+    parsed = urlparse(uri)
+    return parsed.scheme, sorted(host.lower() for host in parsed.netloc.rpartition('@')[2].split(','))
 
-def close_mongo_client(client):
-    if client:
-        client.close()
+def get_mongo_client(uri):
+    client = database.get_shared_client(uri)
+    if database.client_uri and _hosts(uri) != _hosts(database.client_uri):
+        raise ValueError(
+            f"Requested MongoDB hosts {','.join(_hosts(uri)[1])} differ from the shared client's "
+            f"{','.join(_hosts(database.client_uri)[1])}; only one MongoClient is kept per process."
+        )
+    return client
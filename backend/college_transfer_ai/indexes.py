@@ -0,0 +1,142 @@
+import logging
+from collections import namedtuple
+
+import click
+from flask.cli import with_appcontext
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import PyMongoError
+
+from .agreement_index import TEXTS_COLLECTION, COURSES_COLLECTION
+from .chat_sessions import CHAT_SESSIONS_COLLECTION, ensure_session_indexes
+from .equivalency_index import EQUIVALENCIES_COLLECTION, ensure_equivalency_indexes
+from .prewarm import REQUEST_LOG_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+IndexSpec = namedtuple('IndexSpec', ['collection', 'keys', 'options'])
+HotQuery = namedtuple('HotQuery', ['name', 'collection', 'filter', 'sort'])
+
+REQUIRED_INDEXES = [
+    IndexSpec('users', [("google_user_id", ASCENDING)], {"name": "google_user_id", "unique": True}),
+    # Users are created with explicit None Stripe ids, which a sparse index would still include.
+    IndexSpec('users', [("stripe_customer_id", ASCENDING)],
+              {"name": "stripe_customer_id", "partialFilterExpression": {"stripe_customer_id": {"$type": "string"}}}),
+    IndexSpec('users', [("stripe_subscription_id", ASCENDING)],
+              {"name": "stripe_subscription_id", "partialFilterExpression": {"stripe_subscription_id": {"$type": "string"}}}),
+    IndexSpec('course_maps', [("google_user_id", ASCENDING), ("updated_at", DESCENDING)], {"name": "user_maps_by_updated"}),
+    IndexSpec('fs.files', [("filename", ASCENDING), ("uploadDate", ASCENDING)], {"name": "filename_1_uploadDate_1"}),
+    IndexSpec('fs.files', [("metadata.original_pdf", ASCENDING), ("metadata.profile", ASCENDING), ("metadata.page_number", ASCENDING)],
+              {"name": "pdf_page_images"}),
+    IndexSpec(COURSES_COLLECTION, [("pdf_filename", ASCENDING), ("page", ASCENDING)], {"name": "pdf_rows"}),
+    IndexSpec(REQUEST_LOG_COLLECTION, [("count", DESCENDING)], {"name": "most_requested"}),
+]
+
+HOT_QUERIES = [
+    HotQuery("user by google id", 'users', {"google_user_id": "sample"}, None),
+    HotQuery("user by stripe customer", 'users', {"stripe_customer_id": "cus_sample"}, None),
+    HotQuery("user by stripe subscription", 'users', {"stripe_subscription_id": "sub_sample"}, None),
+    HotQuery("course maps for user", 'course_maps', {"google_user_id": "sample"}, [("updated_at", DESCENDING)]),
+    HotQuery("gridfs file by name", 'fs.files', {"filename": "sample.pdf"}, None),
+    HotQuery("page images for pdf", 'fs.files', {"metadata.original_pdf": "sample.pdf", "metadata.profile": "web"},
+             [("metadata.page_number", ASCENDING)]),
+    HotQuery("page image by number", 'fs.files',
+             {"metadata.original_pdf": "sample.pdf", "metadata.page_number": 0, "metadata.profile": "llm"}, None),
+    HotQuery("images for pdf", 'fs.files', {"metadata.original_pdf": "sample.pdf"}, None),
+    HotQuery("agreement text", TEXTS_COLLECTION, {"_id": "sample.pdf"}, None),
+    HotQuery("agreement rows", COURSES_COLLECTION, {"pdf_filename": "sample.pdf"}, [("page", ASCENDING), ("_id", ASCENDING)]),
+    HotQuery("equivalencies by receiving course", EQUIVALENCIES_COLLECTION, {"receiving_id": 1, "receiving_code": "SAMPLE 1"}, None),
+    HotQuery("chat sessions for user", CHAT_SESSIONS_COLLECTION, {"_id": "sample", "google_user_id": "sample"}, None),
+    HotQuery("most requested agreements", REQUEST_LOG_COLLECTION, {}, [("count", DESCENDING)]),
+]
+
+
+def ensure_indexes(db):
+    created = []
+    failures = []
+    for spec in REQUIRED_INDEXES:
+        try:
+            created.append(f"{spec.collection}.{db[spec.collection].create_index(spec.keys, **spec.options)}")
+        except PyMongoError as e:
+            logger.warning("Failed to create index %s on %s: %s", spec.options.get('name'), spec.collection, e)
+            failures.append({"collection": spec.collection, "index": spec.options.get("name"), "error": str(e),
+                             "unique": bool(spec.options.get("unique"))})
+
+    for collection_name, ensure in ((EQUIVALENCIES_COLLECTION, ensure_equivalency_indexes), (CHAT_SESSIONS_COLLECTION, ensure_session_indexes)):
+        try:
+            ensure(db[collection_name])
+            created.append(f"{collection_name}.*")
+        except PyMongoError as e:
+            logger.warning("Failed to create indexes on %s: %s", collection_name, e)
+            failures.append({"collection": collection_name, "index": "*", "error": str(e), "unique": False})
+    return created, failures
+
+
+def plan_stages(plan):
+    stages = [plan.get("stage")]
+    for child_key in ("inputStage", "queryPlan"):
+        if child_key in plan:
+            stages.extend(plan_stages(plan[child_key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(plan_stages(child))
+    return [stage for stage in stages if stage]
+
+
+def query_plan(db, hot_query):
+    cursor = db[hot_query.collection].find(hot_query.filter)
+    if hot_query.sort:
+        cursor = cursor.sort(hot_query.sort)
+    explain = cursor.explain()
+    stages = plan_stages(explain["queryPlanner"]["winningPlan"])
+    return {"name": hot_query.name, "collection": hot_query.collection, "stages": stages, "collscan": "COLLSCAN" in stages}
+
+
+def verify_query_plans(db, hot_queries=HOT_QUERIES):
+    return [query_plan(db, hot_query) for hot_query in hot_queries]
+
+
+def index_covers(index, hot_query):
+    keys = [key for key, _ in index["key"]]
+    fields = set(hot_query.filter)
+    prefix = 0
+    while prefix < len(keys) and keys[prefix] in fields:
+        prefix += 1
+    if prefix and prefix == len(keys) and index.get("unique", False):
+        return True
+    if prefix != len(fields):
+        return False
+    if hot_query.sort:
+        return prefix < len(keys) and keys[prefix] == hot_query.sort[0][0]
+    return prefix > 0
+
+
+def uncovered_hot_queries(db, hot_queries=HOT_QUERIES):
+    uncovered = []
+    for hot_query in hot_queries:
+        # Every collection has a unique _id index, even before its first insert.
+        indexes = dict(db[hot_query.collection].index_information(), _id_={"key": [("_id", 1)], "unique": True})
+        if not any(index_covers(index, hot_query) for index in indexes.values()):
+            uncovered.append(hot_query.name)
+    return uncovered
+
+
+@click.command('ensure-indexes')
+@click.option('--verify', is_flag=True, help="Explain each hot-path query and fail if any plan is a collection scan.")
+@with_appcontext
+def ensure_indexes_command(verify):
+    from .database import get_db
+
+    db = get_db()
+    created, failures = ensure_indexes(db)
+    click.echo(f"Ensured {len(created)} indexes ({len(failures)} failed).")
+    for failure in failures:
+        click.echo(f"  FAILED {failure['collection']}.{failure['index']}: {failure['error']}")
+
+    if verify:
+        plans = verify_query_plans(db)
+        for plan in plans:
+            click.echo(f"  {'COLLSCAN' if plan['collscan'] else 'ok':8} {plan['name']}: {' <- '.join(plan['stages'])}")
+        if any(plan['collscan'] for plan in plans):
+            raise click.ClickException("One or more hot-path queries use a collection scan.")
+
+    if failures:
+        raise click.ClickException("Index creation failed.")
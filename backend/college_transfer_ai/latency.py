@@ -0,0 +1,41 @@
+import threading
+from collections import deque
+
+
+class LatencyTracker:
+    def __init__(self, window=1024):
+        self.window = window
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(seconds)
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    @staticmethod
+    def _percentile(sorted_samples, percentile):
+        index = min(len(sorted_samples) - 1, int(round(percentile / 100 * (len(sorted_samples) - 1))))
+        return sorted_samples[index]
+
+    def percentiles(self):
+        with self._lock:
+            snapshot = {name: sorted(samples) for name, samples in self._samples.items()}
+            counts = dict(self._counts)
+
+        result = {}
+        for name, samples in snapshot.items():
+            if not samples:
+                continue
+            result[name] = {
+                "count": counts.get(name, 0),
+                "p50_ms": self._percentile(samples, 50) * 1000,
+                "p95_ms": self._percentile(samples, 95) * 1000,
+                "p99_ms": self._percentile(samples, 99) * 1000,
+                "max_ms": samples[-1] * 1000
+            }
+        return result
@@ -0,0 +1,137 @@
+import os
+import json
+import uuid
+import atexit
+import queue
+import logging
+import threading
+import contextvars
+from logging.handlers import QueueHandler, QueueListener
+
+ROOT_LOGGER = "college_transfer_ai"
+REQUEST_ID_HEADER = "X-Request-ID"
+STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id", "sample_rate", "taskName"}
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+_listener = None
+_configure_lock = threading.Lock()
+
+
+def current_request_id():
+    return request_id_var.get()
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get() or "-"
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, enabled=True):
+        super().__init__()
+        self.enabled = enabled
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        rate = getattr(record, "sample_rate", None)
+        if not self.enabled or not rate or rate <= 1 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, record.msg)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        if count % rate:
+            return False
+        record.sampled = f"1/{rate}"
+        return True
+
+
+class StructuredQueueHandler(QueueHandler):
+    def prepare(self, record):
+        record = logging.makeLogRecord(vars(record))
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.request_id != "-":
+            entry["request_id"] = record.request_id
+        entry.update({key: value for key, value in vars(record).items() if key not in STANDARD_ATTRS})
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record):
+        message = super().format(record)
+        extras = {key: value for key, value in vars(record).items() if key not in STANDARD_ATTRS}
+        if extras:
+            message += " " + " ".join(f"{key}={value}" for key, value in extras.items())
+        return message
+
+
+def configure_logging(level=None, fmt=None, sampling=None):
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+
+        level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+        fmt = fmt or os.getenv("LOG_FORMAT", "text")
+        if sampling is None:
+            sampling = os.getenv("LOG_SAMPLING", "on").lower() not in ("0", "off", "false")
+
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+        queue_handler = StructuredQueueHandler(queue.SimpleQueue())
+        queue_handler.addFilter(RequestIdFilter())
+        queue_handler.addFilter(SamplingFilter(sampling))
+
+        logger = logging.getLogger(ROOT_LOGGER)
+        logger.setLevel(level)
+        logger.handlers = [queue_handler]
+        logger.propagate = False
+
+        _listener = QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def init_request_logging(app):
+    from flask import request
+
+    @app.before_request
+    def assign_request_id():
+        request_id_var.set(request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex)
+
+    @app.after_request
+    def echo_request_id(response):
+        request_id = request_id_var.get()
+        if request_id:
+            response.headers[REQUEST_ID_HEADER] = request_id
+        return response
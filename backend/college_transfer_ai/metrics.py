@@ -0,0 +1,262 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames) if labels else tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in children:
+            for suffix, extra, value in child.samples():
+                lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self):
+        return [("", (), self.value)]
+
+
+class Counter(_Metric):
+    kind = "counter"
+    _new_child = _CounterChild
+
+    def __init__(self, name, documentation, labelnames=()):
+        # HELP, TYPE and samples must all use the exposed _total name.
+        super().__init__(name if name.endswith("_total") else f"{name}_total", documentation, labelnames)
+
+
+class _GaugeChild:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set(self, value):
+        self.value = value
+
+    @contextmanager
+    def track(self):
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+    def samples(self):
+        return [("", (), self.value)]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+    _new_child = _GaugeChild
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += seconds
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def samples(self):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            samples.append(("_bucket", (("le", _format_value(bound)),), cumulative))
+        samples.append(("_sum", (), total))
+        samples.append(("_count", (), cumulative))
+        return samples
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector in collectors:
+            for metric in collector():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Time to produce a response, by route.", ("method", "route", "status"))
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "Requests currently being handled, by route.", ("method", "route"))
+upstream_request_duration = registry.histogram(
+    "upstream_request_duration_seconds", "Latency of calls to external services.", ("upstream", "operation"))
+upstream_in_flight = registry.gauge(
+    "upstream_requests_in_flight", "Calls to external services currently outstanding.", ("upstream",))
+upstream_errors = registry.counter(
+    "upstream_errors", "Failed calls to external services.", ("upstream", "reason"))
+gridfs_operation_duration = registry.histogram(
+    "gridfs_operation_duration_seconds", "Latency of GridFS reads and writes.", ("operation",))
+
+
+@contextmanager
+def track_upstream(upstream, operation):
+    in_flight = upstream_in_flight.labels(upstream)
+    in_flight.inc()
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        upstream_errors.labels(upstream, type(e).__name__).inc()
+        raise
+    finally:
+        in_flight.dec()
+        upstream_request_duration.labels(upstream, operation).observe(time.perf_counter() - started)
+
+
+def observe_upstream(upstream, operation, seconds, error=None):
+    upstream_request_duration.labels(upstream, operation).observe(seconds)
+    if error is not None:
+        upstream_errors.labels(upstream, error).inc()
+
+
+def snapshot(metric_class, name, documentation, labelnames, rows):
+    metric = metric_class(name, documentation, labelnames)
+    for labels, value in rows:
+        metric.labels(*labels).value = value
+    return metric
+
+
+def init_request_metrics(app):
+    from flask import request, g
+
+    def route_name():
+        return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+        g.metrics_route = route_name()
+        http_requests_in_flight.labels(request.method, g.metrics_route).inc()
+
+    @app.teardown_request
+    def finish_request_timer(error=None):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return
+        route = g.pop("metrics_route")
+        http_requests_in_flight.labels(request.method, route).dec()
+        status = g.pop("metrics_status", 500 if error is not None else 200)
+        http_request_duration.labels(request.method, route, status).observe(time.perf_counter() - started)
+
+    @app.after_request
+    def record_status(response):
+        g.metrics_status = response.status_code
+        return response
@@ -0,0 +1,67 @@
+import os
+import json
+
+import fitz
+
+try:
+    import PIL
+except ImportError:
+    PIL = None
+
+IMAGE_FORMATS = {
+    "png": ("png", "image/png"),
+    "jpeg": ("jpg", "image/jpeg"),
+    "webp": ("webp", "image/webp")
+}
+
+
+def validate_render_profiles(profiles):
+    if not isinstance(profiles, dict):
+        raise ValueError("RENDER_PROFILES must be a JSON object mapping profile names to settings.")
+    for name, profile in profiles.items():
+        if not isinstance(profile, dict):
+            raise ValueError(f"Render profile '{name}' must be a JSON object.")
+        dpi = profile.get("dpi")
+        if isinstance(dpi, bool) or not isinstance(dpi, int) or dpi <= 0:
+            raise ValueError(f"Render profile '{name}' needs a positive integer 'dpi'.")
+        if profile.get("format") not in IMAGE_FORMATS:
+            raise ValueError(f"Render profile '{name}' needs a 'format' of {', '.join(IMAGE_FORMATS)}.")
+        quality = profile.get("quality")
+        if quality is not None and (isinstance(quality, bool) or not isinstance(quality, int) or not 1 <= quality <= 100):
+            raise ValueError(f"Render profile '{name}' has an invalid 'quality'; use 1-100.")
+    return profiles
+
+
+DEFAULT_RENDER_PROFILE = "screen"
+RENDER_PROFILES = {
+    "thumbnail": {"dpi": 36, "format": "webp", "quality": 60, "grayscale": False},
+    "screen": {"dpi": 144, "format": "webp", "quality": 80, "grayscale": False},
+    "llm": {"dpi": 100, "format": "png", "grayscale": True}
+}
+RENDER_PROFILES.update(validate_render_profiles(json.loads(os.getenv("RENDER_PROFILES", "{}"))))
+
+
+def resolve_format(image_format):
+    if image_format == "webp" and PIL is None:
+        return "jpeg"
+    return image_format
+
+
+def render_page(pdf_path, page_number, profile):
+    image_format = resolve_format(profile["format"])
+    doc = fitz.open(pdf_path, filetype="pdf")
+    try:
+        pix = doc[page_number].get_pixmap(
+            dpi=profile["dpi"],
+            colorspace=fitz.csGRAY if profile.get("grayscale") else fitz.csRGB,
+            alpha=False
+        )
+        if image_format == "webp":
+            img_bytes = pix.pil_tobytes(format="WEBP", quality=profile.get("quality", 80))
+        elif image_format == "jpeg":
+            img_bytes = pix.tobytes("jpeg", jpg_quality=profile.get("quality", 80))
+        else:
+            img_bytes = pix.tobytes("png")
+        return page_number, img_bytes
+    finally:
+        doc.close()
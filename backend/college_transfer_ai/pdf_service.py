@@ -1,17 +1,39 @@
+import logging
 import os
 import fitz 
 import io
-import traceback
-from .database import get_gridfs
+import click
+from flask.cli import with_appcontext
+from .database import get_gridfs, get_db
 from .assist_api_client import AssistApiClient
+from .singleflight import SingleFlight
+from .concurrency import submit_background
+from .metrics import gridfs_operation_duration
+from .agreement_index import TEXTS_COLLECTION, index_agreement_pdf
+from .agreement_sync import record_pdf_version
+from .equivalency_index import index_agreement_equivalencies
+
+logger = logging.getLogger(__name__)
+
+pdf_fetches = SingleFlight()
 
 class PdfService:
-    def __init__(self, assist_client: AssistApiClient):
+    def __init__(self, assist_client: AssistApiClient, fs=None, db=None):
         self.assist_client = assist_client
-        self.fs = get_gridfs()
-        if self.fs is None:
-            print("!!! CRITICAL: GridFS not available at PdfService initialization.")
-            raise ConnectionError("GridFS is not initialized. Cannot proceed with PdfService.")
+        self._fs = fs
+        self._db = db
+
+    @property
+    def fs(self):
+        return self._fs if self._fs is not None else get_gridfs()
+
+    @property
+    def db(self):
+        return self._db if self._db is not None else get_db()
+
+    def bind_storage(self):
+        # Worker threads have no app context, so resolve storage on the calling thread.
+        return PdfService(self.assist_client, fs=self.fs, db=self.db)
 
     def _generate_pdf_filename(self, type_prefix, year_id, sending_id, receiving_id=None, major_key=None):
         parts = [type_prefix, str(year_id), str(sending_id)]
@@ -22,56 +44,97 @@ class PdfService:
             parts.append(safe_major_key)
         return "_".join(parts) + ".pdf"
 
-    def _fetch_and_store_pdf(self, filename, api_call_func, *args):
-        if self.fs.exists({"filename": filename}):
-            print(f"PDF {filename} already exists in GridFS.")
-            return filename
+    def _index_pdf(self, filename, pdf_content, context):
+        try:
+            record_pdf_version(self.db, filename, pdf_content, context)
+            index_agreement_pdf(self.db, filename, pdf_content, context, on_indexed=index_agreement_equivalencies)
+        except Exception as e:
+            logger.exception("Error indexing text/courses for %s: %s", filename, e)
+
+    def _to_pdf_bytes(self, filename, pdf_content_response):
+        if isinstance(pdf_content_response, bytes):
+            return pdf_content_response
 
-        print(f"Fetching PDF content for {filename} from Assist.org...")
+        logger.debug("API response for %s is not bytes, attempting to encode.", filename)
+        try:
+            if hasattr(pdf_content_response, 'text'): 
+                return pdf_content_response.text.encode('utf-8')
+            elif isinstance(pdf_content_response, str):
+                return pdf_content_response.encode('utf-8')
+            else:
+                raise TypeError("Unsupported response type for PDF content.")
+        except Exception as e:
+            logger.error("Error encoding PDF content for %s: %s", filename, e)
+            return None
+
+    def fetch_pdf_bytes(self, filename, api_call_func, *args):
+        logger.info("Fetching PDF content for %s from Assist.org...", filename)
         pdf_content_response = api_call_func(*args)
 
         if pdf_content_response is None:
-            print(f"Failed to fetch PDF content for {filename} (API returned None).")
+            logger.error("Failed to fetch PDF content for %s (API returned None).", filename)
             return None
-        
-        if not isinstance(pdf_content_response, bytes):
-            print(f"API response for {filename} is not bytes, attempting to encode.")
-            try:
-                if hasattr(pdf_content_response, 'text'): 
-                    pdf_content_response = pdf_content_response.text.encode('utf-8')
-                elif isinstance(pdf_content_response, str):
-                    pdf_content_response = pdf_content_response.encode('utf-8')
-                else:
-                    raise TypeError("Unsupported response type for PDF content.")
-            except Exception as e:
-                print(f"Error encoding PDF content for {filename}: {e}")
-                return None
+        return self._to_pdf_bytes(filename, pdf_content_response)
 
+    def _is_valid_pdf(self, filename, pdf_bytes):
         try:
-            with io.BytesIO(pdf_content_response) as pdf_stream:
+            with io.BytesIO(pdf_bytes) as pdf_stream:
                 doc = fitz.open(stream=pdf_stream, filetype="pdf") 
-                if not doc.is_pdf or doc.page_count == 0:
-                    print(f"Invalid or empty PDF received for {filename}. Content starts with: {pdf_content_response[:100]}")
-                    return None 
+                valid = doc.is_pdf and doc.page_count > 0
                 doc.close()
+            if not valid:
+                logger.warning("Invalid or empty PDF received for %s. Content starts with: %s", filename, pdf_bytes[:100])
+            return valid
+        except fitz.errors.FitzError as fe:
+            logger.warning("FitzError validating PDF %s: %s. Content starts with: %s", filename, fe, pdf_bytes[:200])
+            return False
 
-            self.fs.put(pdf_content_response, filename=filename, contentType="application/pdf")
-            print(f"Stored PDF {filename} in GridFS.")
+    def _fetch_and_store_pdf(self, filename, api_call_func, *args, index_context=None):
+        return pdf_fetches.do(filename, self._fetch_and_store_pdf_once, filename, api_call_func, *args, index_context=index_context)
+
+    def _fetch_and_store_pdf_once(self, filename, api_call_func, *args, index_context=None):
+        if self.fs.exists({"filename": filename}):
+            logger.debug("PDF %s already exists in GridFS.", filename, extra={"sample_rate": 100})
             return filename
-        except fitz.errors.FitzError as fe:
-            print(f"FitzError validating PDF {filename}: {fe}. Content starts with: {pdf_content_response[:200]}")
+
+        pdf_content_response = self.fetch_pdf_bytes(filename, api_call_func, *args)
+        if pdf_content_response is None or not self._is_valid_pdf(filename, pdf_content_response):
             return None
+
+        try:
+            with gridfs_operation_duration.labels("put_pdf").time():
+                self.fs.put(pdf_content_response, filename=filename, contentType="application/pdf")
+            logger.info("Stored PDF %s in GridFS.", filename)
+            submit_background(self._index_pdf, filename, pdf_content_response, index_context)
+            return filename
         except Exception as e:
-            print(f"Error storing PDF {filename} in GridFS: {e}")
-            traceback.print_exc()
+            logger.exception("Error storing PDF %s in GridFS: %s", filename, e)
             return None
 
+    def replace_pdf(self, filename, pdf_bytes, index_context=None):
+        if not self._is_valid_pdf(filename, pdf_bytes):
+            return None
+
+        old_pdf_ids = [old_pdf._id for old_pdf in self.fs.find({"filename": filename})]
+        self.fs.put(pdf_bytes, filename=filename, contentType="application/pdf")
+        for old_pdf_id in old_pdf_ids:
+            self.fs.delete(old_pdf_id)
+
+        stale_profiles = set()
+        for image in self.fs.find({"metadata.original_pdf": filename}):
+            stale_profiles.add((image.metadata or {}).get("profile"))
+            self.fs.delete(image._id)
+        logger.info("Replaced PDF %s in GridFS and invalidated images for profiles: %s", filename, sorted(p for p in stale_profiles if p))
+        self._index_pdf(filename, pdf_bytes, index_context)
+        return stale_profiles
+
     def get_articulation_agreement(self, year_id, sending_id, receiving_id, major_key):
         filename = self._generate_pdf_filename("agreement", year_id, sending_id, receiving_id, major_key)
         return self._fetch_and_store_pdf(
             filename,
             self.assist_client.get_agreement_details,
-            major_key
+            major_key,
+            index_context={"major_key": major_key}
         )
 
     def get_igetc_courses(self, year_id, sending_institution_id):
@@ -81,3 +144,23 @@ class PdfService:
             self.assist_client.get_agreement_details, 
             f"igetc/{year_id}/{sending_institution_id}" 
         )
+
+
+@click.command('index-agreements')
+@click.option('--force', is_flag=True, help="Re-index PDFs that already have an index.")
+@with_appcontext
+def index_agreements_command(force):
+    db = get_db()
+    fs = get_gridfs()
+    indexed = skipped = failed = 0
+    for grid_out in fs.find({"contentType": "application/pdf"}):
+        if not force and db[TEXTS_COLLECTION].count_documents({"_id": grid_out.filename}, limit=1):
+            skipped += 1
+            continue
+        try:
+            index_agreement_pdf(db, grid_out.filename, grid_out.read(), on_indexed=index_agreement_equivalencies)
+            indexed += 1
+        except Exception as e:
+            failed += 1
+            click.echo(f"Failed to index {grid_out.filename}: {e}")
+    click.echo(f"Indexed {indexed} PDFs, skipped {skipped}, failed {failed}.")
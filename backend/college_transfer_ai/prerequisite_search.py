@@ -0,0 +1,117 @@
+import logging
+import os
+import re
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+from .response_cache import TieredCache, MemoryLRUCache
+from .latency import LatencyTracker
+from .singleflight import SingleFlight
+from .metrics import observe_upstream, upstream_in_flight
+
+logger = logging.getLogger(__name__)
+
+DAY = 24 * 60 * 60
+CACHE_NAMESPACE = "prerequisites"
+SYSTEM_PROMPT = "You are an AI assistant specialized in finding and extracting course prerequisite information from web searches. Provide only the prerequisite course codes (e.g., MATH 100, ENGL 1A) or state 'None' if no prerequisites are found."
+
+
+def normalize_query(query):
+    query = query.lower().strip()
+    query = re.sub(r"([a-z])(\d)", r"\1 \2", query)
+    query = re.sub(r"[^\w\s&/.-]", " ", query)
+    return re.sub(r"\s+", " ", query).strip(" .")
+
+
+class PrerequisiteSearch:
+    URL = "https://api.perplexity.ai/chat/completions"
+
+    def __init__(self, api_key=None, cache=None):
+        self.api_key = api_key
+        self.url = os.getenv("PERPLEXITY_API_URL", self.URL)
+        self.timeout = float(os.getenv("PERPLEXITY_TIMEOUT", "30"))
+        self.cache_ttl = int(os.getenv("PREREQ_CACHE_TTL", str(7 * DAY)))
+        self.cache = cache or TieredCache(
+            memory=MemoryLRUCache(max_entries=int(os.getenv("PREREQ_CACHE_MAX_ENTRIES", "4096")))
+        )
+        self.in_flight = SingleFlight()
+        self.latency = LatencyTracker()
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=int(os.getenv("PERPLEXITY_POOL_SIZE", "8"))))
+
+    def configure(self, api_key):
+        self.api_key = api_key
+
+    def search(self, query, timeout=None):
+        if not self.api_key:
+            logger.warning("Perplexity API key not configured.")
+            return {"error": "Web search tool not configured."}
+
+        cache_key = f"perplexity:{normalize_query(query)}"
+        cached = self.cache.get(cache_key, namespace=CACHE_NAMESPACE, ttl=self.cache_ttl)
+        if cached is not None:
+            return cached
+
+        result = self.in_flight.do(cache_key, self._call, query, timeout)
+        if "result" in result:
+            self.cache.set(cache_key, result, namespace=CACHE_NAMESPACE, ttl=self.cache_ttl)
+        return result
+
+    def _call(self, query, timeout=None):
+        payload = {
+            "model": "sonar",
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": query}
+            ]
+        }
+        headers = {
+            "accept": "application/json",
+            "content-type": "application/json",
+            "authorization": f"Bearer {self.api_key}"
+        }
+
+        started = time.perf_counter()
+        error = None
+        try:
+            logger.debug("Calling Perplexity API with query: %s", query)
+            with upstream_in_flight.labels("perplexity").track():
+                response = self.session.post(self.url, json=payload, headers=headers, timeout=min(timeout or self.timeout, self.timeout))
+            response.raise_for_status()
+            result = response.json()
+            logger.debug("Perplexity API Response Status: %s", response.status_code)
+
+            if result.get("choices") and len(result["choices"]) > 0:
+                content = result["choices"][0].get("message", {}).get("content")
+                if content:
+                     return {"result": content}
+                else:
+                     logger.warning("Perplexity response missing content.")
+                     return {"result": "No prerequisite information found in search results."}
+            else:
+                logger.warning("Perplexity response format unexpected: %s", list(result) if isinstance(result, dict) else type(result).__name__)
+                error = "bad_response"
+                return {"error": "Unexpected response format from Perplexity."}
+
+        except requests.exceptions.RequestException as e:
+            error = type(e).__name__
+            logger.error("Error calling Perplexity API: %s", e)
+            return {"error": f"Failed to connect to web search service: {e}"}
+        except Exception as e:
+            error = type(e).__name__
+            logger.exception("Unexpected error during Perplexity call: %s", e)
+            return {"error": "An unexpected error occurred during web search."}
+        finally:
+            self.latency.record("search", time.perf_counter() - started)
+            observe_upstream("perplexity", "search", time.perf_counter() - started, error)
+
+    def stats(self):
+        return {
+            "cache": self.cache.stats(),
+            "coalescing": self.in_flight.stats(),
+            "latency": self.latency.percentiles()
+        }
+
+
+prerequisite_search = PrerequisiteSearch()
@@ -0,0 +1,162 @@
+import logging
+import json
+import time
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+import click
+from flask.cli import with_appcontext
+
+from .database import get_db, get_gridfs
+from .pdf_service import PdfService
+from .assist_api_client import assist_client
+from .concurrency import submit_background
+from .rasterizer import rasterizer, find_complete_images, RENDER_PROFILES
+
+logger = logging.getLogger(__name__)
+
+REQUEST_LOG_COLLECTION = 'agreement_request_log'
+
+PrewarmTarget = namedtuple('PrewarmTarget', ['kind', 'year_id', 'sending_id', 'receiving_id', 'major_key'])
+
+
+def record_agreement_request(year_id, sending_id, receiving_id, major_key):
+    try:
+        request_log = get_db()[REQUEST_LOG_COLLECTION]
+    except Exception as e:
+        logger.warning("Request log unavailable, skipping pre-warm bookkeeping: %s", e)
+        return
+
+    def record():
+        try:
+            request_log.update_one(
+                {'year_id': year_id, 'sending_id': sending_id, 'receiving_id': receiving_id, 'major_key': major_key},
+                {'$inc': {'count': 1}, '$set': {'last_requested': datetime.now(timezone.utc)}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.error("Failed to record agreement request for pre-warming: %s", e)
+
+    submit_background(record)
+
+
+def load_targets(path):
+    with open(path, 'r') as f:
+        entries = json.load(f)
+
+    targets = []
+    for entry in entries:
+        kind = entry.get('kind', 'agreement')
+        if kind == 'igetc':
+            targets.append(PrewarmTarget('igetc', int(entry['year_id']), int(entry['sending_id']), None, None))
+        else:
+            targets.append(PrewarmTarget('agreement', int(entry['year_id']), int(entry['sending_id']),
+                                         int(entry['receiving_id']), entry['major_key']))
+    return targets
+
+
+def popular_targets(db, limit=50, include_igetc=True):
+    targets = []
+    seen_igetc = set()
+    for doc in db[REQUEST_LOG_COLLECTION].find().sort('count', -1).limit(limit):
+        targets.append(PrewarmTarget('agreement', doc['year_id'], doc['sending_id'], doc['receiving_id'], doc['major_key']))
+        if include_igetc and (doc['year_id'], doc['sending_id']) not in seen_igetc:
+            seen_igetc.add((doc['year_id'], doc['sending_id']))
+            targets.append(PrewarmTarget('igetc', doc['year_id'], doc['sending_id'], None, None))
+    return targets
+
+
+def prewarm_target(pdf_service, fs, target, profiles, render_timeout=300):
+    if target.kind == 'igetc':
+        pdf_filename = pdf_service.get_igetc_courses(target.year_id, target.sending_id)
+    else:
+        pdf_filename = pdf_service.get_articulation_agreement(
+            target.year_id, target.sending_id, target.receiving_id, target.major_key
+        )
+    if not pdf_filename:
+        raise RuntimeError("PDF could not be fetched from Assist.org.")
+
+    pages = 0
+    for profile_name in profiles:
+        existing_images = find_complete_images(fs, pdf_filename, profile_name)
+        if existing_images:
+            pages += len(existing_images)
+            continue
+
+        job = rasterizer.start(fs, pdf_filename, profile_name)
+        if not job.wait(timeout=render_timeout):
+            raise TimeoutError(f"Rendering '{profile_name}' images timed out.")
+        if job.status == 'failed':
+            raise RuntimeError(f"Rendering '{profile_name}' images failed: {job.error}")
+        pages += job.total_pages or 0
+    return pdf_filename, pages
+
+
+def prewarm(pdf_service, fs, targets, concurrency=4, profiles=('screen',), progress=print):
+    started = time.perf_counter()
+    lock = threading.Lock()
+    report = {'total': len(targets), 'succeeded': 0, 'failed': 0, 'pages': 0, 'failures': []}
+
+    def run(target):
+        target_started = time.perf_counter()
+        pdf_filename, pages = prewarm_target(pdf_service, fs, target, profiles)
+        return pdf_filename, pages, time.perf_counter() - target_started
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="prewarm") as executor:
+        futures = {executor.submit(run, target): target for target in targets}
+        for future in as_completed(futures):
+            target = futures[future]
+            with lock:
+                try:
+                    pdf_filename, pages, duration = future.result()
+                    report['succeeded'] += 1
+                    report['pages'] += pages
+                    outcome = f"{pdf_filename} ({pages} pages, {duration:.1f}s)"
+                except Exception as e:
+                    report['failed'] += 1
+                    report['failures'].append({'target': target._asdict(), 'error': str(e)})
+                    outcome = f"FAILED {target._asdict()}: {e}"
+                done = report['succeeded'] + report['failed']
+                elapsed = time.perf_counter() - started
+                progress(f"[{done}/{report['total']}] {outcome} - {done / elapsed:.2f} agreements/s")
+
+    report['elapsed_seconds'] = time.perf_counter() - started
+    report['agreements_per_second'] = report['total'] / report['elapsed_seconds'] if report['elapsed_seconds'] else 0.0
+    report['pages_per_second'] = report['pages'] / report['elapsed_seconds'] if report['elapsed_seconds'] else 0.0
+    return report
+
+
+@click.command('prewarm')
+@click.option('--targets', 'targets_path', type=click.Path(exists=True, dir_okay=False),
+              help="JSON list of {kind, year_id, sending_id, receiving_id, major_key} objects.")
+@click.option('--popular', type=int, default=0, help="Also pre-warm the N most requested agreements.")
+@click.option('--concurrency', type=int, default=4, show_default=True)
+@click.option('--profiles', default='screen,llm', show_default=True, help="Comma-separated render profiles.")
+@with_appcontext
+def prewarm_command(targets_path, popular, concurrency, profiles):
+    profile_names = [name.strip() for name in profiles.split(',') if name.strip()]
+    unknown = [name for name in profile_names if name not in RENDER_PROFILES]
+    if unknown:
+        raise click.BadParameter(f"Unknown render profiles: {', '.join(unknown)}", param_hint='--profiles')
+
+    targets = load_targets(targets_path) if targets_path else []
+    if popular:
+        targets.extend(popular_targets(get_db(), limit=popular))
+    targets = list(dict.fromkeys(targets))
+    if not targets:
+        raise click.UsageError("Nothing to pre-warm. Pass --targets and/or --popular.")
+
+    click.echo(f"Pre-warming {len(targets)} PDFs with profiles {', '.join(profile_names)} (concurrency {concurrency})...")
+    try:
+        report = prewarm(PdfService(assist_client).bind_storage(), get_gridfs(), targets, concurrency, profile_names, progress=click.echo)
+    except Exception:
+        logger.exception("Pre-warming aborted")
+        raise click.ClickException("Pre-warming aborted.")
+
+    click.echo(
+        f"Done: {report['succeeded']} succeeded, {report['failed']} failed, {report['pages']} pages in "
+        f"{report['elapsed_seconds']:.1f}s ({report['agreements_per_second']:.2f} agreements/s, "
+        f"{report['pages_per_second']:.2f} pages/s)"
+    )
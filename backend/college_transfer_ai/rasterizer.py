@@ -0,0 +1,266 @@
+import logging
+import os
+import time
+import uuid
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import fitz
+
+from .metrics import gridfs_operation_duration
+from . import page_renderer
+from .page_renderer import (
+    IMAGE_FORMATS, DEFAULT_RENDER_PROFILE, RENDER_PROFILES, validate_render_profiles, resolve_format, render_page
+)
+
+logger = logging.getLogger(__name__)
+
+RASTER_WORKERS = int(os.getenv("RASTER_WORKERS", str(min(4, os.cpu_count() or 1))))
+JOB_RETENTION_SECONDS = 600
+
+
+class SourceReplacedError(Exception):
+    pass
+
+
+def page_image_filename(pdf_filename, page_number, profile_name=DEFAULT_RENDER_PROFILE):
+    extension = IMAGE_FORMATS[resolve_format(RENDER_PROFILES[profile_name]["format"])][0]
+    return f"{pdf_filename}_{profile_name}_page_{page_number}.{extension}"
+
+
+def find_complete_images(fs, pdf_filename, profile_name=DEFAULT_RENDER_PROFILE):
+    images = list(fs.find(
+        {"metadata.original_pdf": pdf_filename, "metadata.profile": profile_name},
+        sort=[("metadata.page_number", 1)]
+    ))
+    if not images:
+        return None
+    page_count = images[0].metadata.get("page_count")
+    if page_count is not None and len(images) < page_count:
+        return None
+    return images
+
+
+class RenderJob:
+    def __init__(self, pdf_filename, profile_name=DEFAULT_RENDER_PROFILE):
+        self.id = uuid.uuid4().hex
+        self.pdf_filename = pdf_filename
+        self.profile_name = profile_name
+        self.status = "pending"
+        self.total_pages = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._pages = {}
+        self._condition = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in ("complete", "failed")
+
+    def _update(self, **fields):
+        with self._condition:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            if self.finished and self.finished_at is None:
+                self.finished_at = time.time()
+            self._condition.notify_all()
+
+    def add_page(self, page_number, image_filename):
+        with self._condition:
+            self._pages[page_number] = image_filename
+            self._condition.notify_all()
+
+    def image_filenames(self):
+        with self._condition:
+            return [self._pages[page] for page in sorted(self._pages)]
+
+    def wait(self, min_pages=None, timeout=None):
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._condition:
+            while not self.finished and (min_pages is None or len(self._pages) < min_pages):
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return self.finished
+
+    def to_dict(self):
+        with self._condition:
+            return {
+                "job_id": self.id,
+                "pdf_filename": self.pdf_filename,
+                "profile": self.profile_name,
+                "status": self.status,
+                "total_pages": self.total_pages,
+                "pages_ready": len(self._pages),
+                "image_filenames": [self._pages[page] for page in sorted(self._pages)],
+                "error": self.error
+            }
+
+
+class Rasterizer:
+    def __init__(self, max_workers=RASTER_WORKERS):
+        self.max_workers = max_workers
+        self._pool = None
+        self._jobs_by_id = {}
+        self._active_jobs = {}
+        self._lock = threading.Lock()
+        self.jobs_started = 0
+        self.jobs_coalesced = 0
+        self.pages_rendered = 0
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                # Workers must not inherit the parent's Mongo client or threads, so never fork the app itself.
+                if "forkserver" in multiprocessing.get_all_start_methods():
+                    context = multiprocessing.get_context("forkserver")
+                    context.set_forkserver_preload([page_renderer.__name__])
+                else:
+                    context = multiprocessing.get_context("spawn")
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+            return self._pool
+
+    def _reset_pool(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _prune_jobs(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        for job_id, job in list(self._jobs_by_id.items()):
+            if job.finished and job.finished_at < cutoff:
+                del self._jobs_by_id[job_id]
+
+    def active_job(self, pdf_filename, profile_name=DEFAULT_RENDER_PROFILE):
+        with self._lock:
+            return self._active_jobs.get((pdf_filename, profile_name))
+
+    def get_job(self, job_id):
+        with self._lock:
+            return self._jobs_by_id.get(job_id)
+
+    def invalidate(self, pdf_filename):
+        with self._lock:
+            for key in [key for key in self._active_jobs if key[0] == pdf_filename]:
+                del self._active_jobs[key]
+
+    def start(self, fs, pdf_filename, profile_name=DEFAULT_RENDER_PROFILE):
+        if profile_name not in RENDER_PROFILES:
+            raise ValueError(f"Unknown render profile '{profile_name}'.")
+
+        with self._lock:
+            job = self._active_jobs.get((pdf_filename, profile_name))
+            if job is not None:
+                self.jobs_coalesced += 1
+                return job
+            self._prune_jobs()
+            job = RenderJob(pdf_filename, profile_name)
+            self._active_jobs[(pdf_filename, profile_name)] = job
+            self._jobs_by_id[job.id] = job
+            self.jobs_started += 1
+
+        threading.Thread(target=self._run, args=(fs, job), name=f"render-{job.id[:8]}", daemon=True).start()
+        return job
+
+    def _run(self, fs, job):
+        futures = []
+        pdf_path = None
+        try:
+            grid_out = fs.find_one({"filename": job.pdf_filename})
+            if not grid_out:
+                raise FileNotFoundError(f"PDF file '{job.pdf_filename}' not found in storage.")
+            pdf_id = grid_out._id
+            pdf_bytes = grid_out.read()
+
+            doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+            page_count = doc.page_count
+            doc.close()
+
+            profile = RENDER_PROFILES[job.profile_name]
+            image_format = resolve_format(profile["format"])
+            existing_pages = {
+                image.metadata["page_number"]: image.filename
+                for image in fs.find({"metadata.original_pdf": job.pdf_filename, "metadata.profile": job.profile_name})
+            }
+            job._update(status="rendering", total_pages=page_count)
+            for page_number, image_filename in existing_pages.items():
+                job.add_page(page_number, image_filename)
+
+            # Workers read the PDF from a temp file so it is written once per job
+            # instead of being pickled into every page submission.
+            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as pdf_file:
+                pdf_file.write(pdf_bytes)
+                pdf_path = pdf_file.name
+            del pdf_bytes
+
+            pool = self._get_pool()
+            futures = [
+                pool.submit(render_page, pdf_path, page_number, profile)
+                for page_number in range(page_count) if page_number not in existing_pages
+            ]
+            for future in as_completed(futures):
+                page_number, img_bytes = future.result()
+                image_filename = page_image_filename(job.pdf_filename, page_number, job.profile_name)
+                with gridfs_operation_duration.labels("put_image").time():
+                    image_id = fs.put(
+                        img_bytes,
+                        filename=image_filename,
+                        contentType=IMAGE_FORMATS[image_format][1],
+                        metadata={
+                            "original_pdf": job.pdf_filename,
+                            "page_number": page_number,
+                            "page_count": page_count,
+                            "profile": job.profile_name,
+                            "dpi": profile["dpi"],
+                            "format": image_format,
+                            "quality": profile.get("quality"),
+                            "grayscale": bool(profile.get("grayscale"))
+                        }
+                    )
+                if not fs.exists({"_id": pdf_id}):
+                    fs.delete(image_id)
+                    raise SourceReplacedError(f"PDF '{job.pdf_filename}' was replaced while rendering; request the images again.")
+                job.add_page(page_number, image_filename)
+                with self._lock:
+                    self.pages_rendered += 1
+
+            job._update(status="complete")
+            logger.info("Stored %s '%s' images for %s", page_count, job.profile_name, job.pdf_filename)
+        except SourceReplacedError as e:
+            logger.warning("Discarding render of %s: %s", job.pdf_filename, e)
+            job._update(status="failed", error=str(e))
+        except BrokenProcessPool as e:
+            logger.error("Rasterizer process pool broke while rendering %s: %s", job.pdf_filename, e)
+            self._reset_pool()
+            job._update(status="failed", error="Rendering workers crashed.")
+        except Exception as e:
+            logger.exception("Error rendering images for %s: %s", job.pdf_filename, e)
+            job._update(status="failed", error=str(e))
+        finally:
+            if pdf_path is not None:
+                for future in futures:
+                    future.cancel()
+                wait(futures)
+                os.remove(pdf_path)
+            with self._lock:
+                if self._active_jobs.get((job.pdf_filename, job.profile_name)) is job:
+                    del self._active_jobs[(job.pdf_filename, job.profile_name)]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "active_jobs": len(self._active_jobs),
+                "jobs_started": self.jobs_started,
+                "jobs_coalesced": self.jobs_coalesced,
+                "pages_rendered": self.pages_rendered
+            }
+
+
+rasterizer = Rasterizer()
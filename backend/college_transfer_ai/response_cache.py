@@ -0,0 +1,165 @@
+import logging
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryLRUCache:
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class MongoCacheBackend:
+    def __init__(self, collection, max_entries=50000):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._writes_since_trim = 0
+        self.collection.create_index("expires_at", expireAfterSeconds=0)
+        self.collection.create_index("stored_at")
+
+    def get(self, key):
+        doc = self.collection.find_one({"_id": key}, {"payload": 1, "expires_at": 1})
+        if not doc:
+            return None
+        expires_at = doc.get("expires_at")
+        if expires_at is not None:
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            if expires_at <= datetime.now(timezone.utc):
+                return None
+        return json.loads(doc["payload"]) if doc.get("payload") is not None else None
+
+    def set(self, key, value, ttl):
+        now = datetime.now(timezone.utc)
+        self.collection.replace_one(
+            {"_id": key},
+            {"payload": json.dumps(value), "expires_at": now + timedelta(seconds=ttl), "stored_at": now},
+            upsert=True
+        )
+        self._writes_since_trim += 1
+        if self._writes_since_trim >= 100:
+            self._writes_since_trim = 0
+            self.trim()
+
+    def delete(self, key):
+        self.collection.delete_one({"_id": key})
+
+    def trim(self):
+        excess = self.collection.estimated_document_count() - self.max_entries
+        if excess <= 0:
+            return 0
+        oldest = self.collection.find({}, {"_id": 1}).sort("stored_at", 1).limit(excess)
+        result = self.collection.delete_many({"_id": {"$in": [doc["_id"] for doc in oldest]}})
+        self.evictions += result.deleted_count
+        return result.deleted_count
+
+
+class TieredCache:
+    def __init__(self, memory=None, backend=None, default_ttl=3600):
+        self.memory = memory or MemoryLRUCache()
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def attach_backend(self, backend):
+        self.backend = backend
+
+    def _record(self, namespace, outcome):
+        with self._lock:
+            counters = self._stats.setdefault(namespace, {"memory_hits": 0, "backend_hits": 0, "misses": 0, "backend_errors": 0})
+            counters[outcome] += 1
+
+    def get(self, key, namespace="default", ttl=None):
+        value = self.memory.get(key)
+        if value is not None:
+            self._record(namespace, "memory_hits")
+            return value
+
+        if self.backend is not None:
+            try:
+                value = self.backend.get(key)
+            except Exception as e:
+                logger.error("Cache backend read failed for %s: %s", key, e)
+                self._record(namespace, "backend_errors")
+                value = None
+            if value is not None:
+                self._record(namespace, "backend_hits")
+                self.memory.set(key, value, ttl or self.default_ttl)
+                return value
+
+        self._record(namespace, "misses")
+        return None
+
+    def set(self, key, value, namespace="default", ttl=None):
+        ttl = ttl or self.default_ttl
+        self.memory.set(key, value, ttl)
+        if self.backend is not None:
+            try:
+                self.backend.set(key, value, ttl)
+            except Exception as e:
+                logger.error("Cache backend write failed for %s: %s", key, e)
+                self._record(namespace, "backend_errors")
+
+    def delete(self, key):
+        self.memory.delete(key)
+        if self.backend is not None:
+            try:
+                self.backend.delete(key)
+            except Exception as e:
+                logger.error("Cache backend delete failed for %s: %s", key, e)
+
+    def stats(self):
+        with self._lock:
+            namespaces = {}
+            for namespace, counters in self._stats.items():
+                hits = counters["memory_hits"] + counters["backend_hits"]
+                total = hits + counters["misses"]
+                namespaces[namespace] = dict(counters, hit_ratio=(hits / total) if total else 0.0)
+        return {
+            "memory_entries": len(self.memory),
+            "memory_max_entries": self.memory.max_entries,
+            "memory_evictions": self.memory.evictions,
+            "backend": type(self.backend).__name__ if self.backend is not None else None,
+            "backend_evictions": getattr(self.backend, "evictions", 0),
+            "namespaces": namespaces
+        }
@@ -3,4 +3,6 @@ from .chat_routes import chat_bp
 from .course_map_routes import course_map_bp
 from .user_routes import user_bp
 from .api_info_routes import api_info_bp
-from .igetc_routes import igetc_bp
\ No newline at end of file
+from .igetc_routes import igetc_bp
+from .equivalency_routes import equivalency_bp
+from .metrics_routes import metrics_bp
\ No newline at end of file
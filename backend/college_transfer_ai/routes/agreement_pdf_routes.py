@@ -1,13 +1,24 @@
-import traceback
-import io
-import fitz 
-from flask import Blueprint, jsonify, request, send_file, make_response
-from ..database import get_gridfs 
+import logging
+import os
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from ..database import get_gridfs, get_read_gridfs
 from ..pdf_service import PdfService
 from ..assist_api_client import assist_client
+from ..concurrency import fan_out
+from ..file_cache import file_cache
+from ..metrics import gridfs_operation_duration
+from ..prewarm import record_agreement_request
+from ..rasterizer import rasterizer, find_complete_images, RENDER_PROFILES, DEFAULT_RENDER_PROFILE
+
+logger = logging.getLogger(__name__)
 
 agreement_pdf_bp = Blueprint('agreement_pdf_bp', __name__) 
 
+AGREEMENT_FETCH_TIMEOUT = float(os.getenv("AGREEMENT_FETCH_TIMEOUT", "60"))
+RASTER_FIRST_PAGE_TIMEOUT = float(os.getenv("RASTER_FIRST_PAGE_TIMEOUT", "10"))
+RASTER_JOB_TIMEOUT = float(os.getenv("RASTER_JOB_TIMEOUT", "120"))
+IMAGE_CACHE_MAX_AGE = int(os.getenv("IMAGE_CACHE_MAX_AGE", "300"))
+
 pdf_service_instance = PdfService(assist_client)
 
 @agreement_pdf_bp.route('/articulation-agreements', methods=['POST'])
@@ -23,41 +34,46 @@ def get_articulation_agreements():
 
     results = []
     errors = []
+    pdf_service = pdf_service_instance.bind_storage()
 
-    for sending_id in sending_ids:
+    def fetch_agreement(sending_id):
         sending_name = assist_client.get_institution_name(sending_id) or f"ID {sending_id}"
-        try:
-            key_parts = major_key.split("/")
-            if len(key_parts) > 1:
-                key_parts[1] = str(sending_id)
-                current_major_key = "/".join(key_parts)
-            else:
-                print(f"Warning: Unexpected major_key format '{major_key}'. Using original.")
-                current_major_key = major_key
-
-            pdf_filename = pdf_service_instance.get_articulation_agreement(
-                year_id, sending_id, receiving_id, current_major_key
-            )
-
-            results.append({
-                 "sendingId": sending_id,
-                 "sendingName": sending_name,
-                 "pdfFilename": pdf_filename
-            })
-            if not pdf_filename:
-                 print(f"PDF generation/fetch failed for Sending ID {sending_id} / Major Key {current_major_key}.")
-
-        except Exception as e:
-            error_msg = f"Error processing request for Sending ID {sending_id}: {e}"
-            print(error_msg)
-            traceback.print_exc()
-            errors.append(error_msg)
-            results.append({
-                 "sendingId": sending_id,
-                 "sendingName": sending_name,
-                 "pdfFilename": None,
-                 "error": str(e)
-            })
+        key_parts = major_key.split("/")
+        if len(key_parts) > 1:
+            key_parts[1] = str(sending_id)
+            current_major_key = "/".join(key_parts)
+        else:
+            logger.warning("Unexpected major_key format '%s'. Using original.", major_key)
+            current_major_key = major_key
+
+        pdf_filename = pdf_service.get_articulation_agreement(
+            year_id, sending_id, receiving_id, current_major_key
+        )
+        if not pdf_filename:
+            logger.error("PDF generation/fetch failed for Sending ID %s / Major Key %s.", sending_id, current_major_key)
+        return {
+            "sendingId": sending_id,
+            "sendingName": sending_name,
+            "pdfFilename": pdf_filename
+        }, current_major_key
+
+    for sending_id, result, error in fan_out(fetch_agreement, sending_ids, timeout=AGREEMENT_FETCH_TIMEOUT):
+        if error is None:
+            agreement, current_major_key = result
+            results.append(agreement)
+            if agreement["pdfFilename"]:
+                record_agreement_request(year_id, sending_id, receiving_id, current_major_key)
+            continue
+
+        error_msg = f"Error processing request for Sending ID {sending_id}: {error}"
+        logger.error(error_msg, exc_info=error)
+        errors.append(error_msg)
+        results.append({
+             "sendingId": sending_id,
+             "sendingName": f"ID {sending_id}",
+             "pdfFilename": None,
+             "error": str(error)
+        })
 
     if not results and errors:
          return jsonify({"error": "Failed to process any agreement requests.", "details": errors}), 500
@@ -65,7 +81,7 @@ def get_articulation_agreements():
          has_success = any(item.get('pdfFilename') for item in results if not item.get('error'))
          status_code = 207 if has_success else 500
          message = "Partial success fetching agreements." if has_success else "Failed to fetch any agreements."
-         print(f"{message} Errors: {errors}")
+         logger.warning("%s Errors: %s", message, errors)
          return jsonify({"agreements": results, "warnings": errors}), status_code
     elif not any(item.get('pdfFilename') for item in results):
          return jsonify({"agreements": results, "message": "No articulation agreements found or generated for the selected criteria."}), 200
@@ -77,87 +93,140 @@ def get_articulation_agreements():
 def get_pdf_images(filename):
     fs = get_gridfs() 
     if fs is None:
-        print("Error: GridFS not available when requested in get_pdf_images.") 
+        logger.error("GridFS not available when requested in get_pdf_images.")
         return jsonify({"error": "Storage service not available."}), 503
 
-    try:
-        existing_images_cursor = fs.find(
-            {"metadata.original_pdf": filename, "contentType": "image/png"},
-            sort=[("metadata.page_number", 1)] 
-        )
-        existing_images = list(existing_images_cursor)
-
-        if existing_images:
-            image_filenames = [img.filename for img in existing_images]
-            print(f"Found {len(image_filenames)} existing images for {filename} (sorted)")
-            return jsonify({"image_filenames": image_filenames})
+    incremental = request.args.get('incremental', '').lower() in ('1', 'true')
+    profile_name = request.args.get('profile', DEFAULT_RENDER_PROFILE)
+    if profile_name not in RENDER_PROFILES:
+        return jsonify({"error": f"Unknown render profile '{profile_name}'. Available: {', '.join(RENDER_PROFILES)}"}), 400
 
-        
-        print(f"Generating images for {filename}...")
-        grid_out = fs.find_one({"filename": filename})
-        if not grid_out:
-            return jsonify({"error": f"PDF file '{filename}' not found in storage."}), 404
-
-        pdf_data = grid_out.read()
-        doc = fitz.open(stream=pdf_data, filetype="pdf")
-        image_filenames = []
-        zoom = 2 
-        mat = fitz.Matrix(zoom, zoom)
-        generated_files_metadata = [] 
-
-        for i, page in enumerate(doc):
-            try:
-                pix = page.get_pixmap(matrix=mat)
-                img_bytes = pix.tobytes("png")
-                image_filename = f"{filename}_page_{i}.png"
-                fs.put(
-                    img_bytes,
-                    filename=image_filename,
-                    contentType="image/png",
-                    metadata={"original_pdf": filename, "page_number": i}
-                )
-                generated_files_metadata.append({"filename": image_filename, "page_number": i})
-            except Exception as page_err:
-                 print(f"Error processing page {i} for {filename}: {page_err}")
-
-        doc.close()
-
-        generated_files_metadata.sort(key=lambda x: x["page_number"])
-        image_filenames = [item["filename"] for item in generated_files_metadata]
-
-        print(f"Stored {len(image_filenames)} images for {filename}")
-        return jsonify({"image_filenames": image_filenames})
+    try:
+        job = rasterizer.active_job(filename, profile_name)
+        if job is None:
+            existing_images = find_complete_images(fs, filename, profile_name)
+            if existing_images:
+                image_filenames = [img.filename for img in existing_images]
+                logger.debug("Found %s existing images for %s (sorted)", len(image_filenames), filename, extra={"sample_rate": 100})
+                return jsonify({"image_filenames": image_filenames, "profile": profile_name, "status": "complete"})
+
+            if not fs.exists({"filename": filename}):
+                return jsonify({"error": f"PDF file '{filename}' not found in storage."}), 404
+
+            logger.info("Generating images for %s...", filename)
+            job = rasterizer.start(fs, filename, profile_name)
+
+        if incremental:
+            job.wait(min_pages=1, timeout=RASTER_FIRST_PAGE_TIMEOUT)
+        else:
+            job.wait(timeout=RASTER_JOB_TIMEOUT)
+
+        job_status = job.to_dict()
+        if job_status["status"] == "failed":
+            return jsonify({"error": f"Failed to process PDF '{filename}': {job_status['error']}", "job_id": job.id}), 500
+        return jsonify(job_status), 200 if job_status["status"] == "complete" else 202
 
     except Exception as e:
-        print(f"Error getting/generating images for {filename}: {e}")
-        traceback.print_exc()
+        logger.exception("Error getting/generating images for %s: %s", filename, e)
         return jsonify({"error": f"Failed to process PDF '{filename}': {str(e)}"}), 500
 
 
+@agreement_pdf_bp.route('/render-jobs/<job_id>', methods=['GET'])
+def get_render_job(job_id):
+    job = rasterizer.get_job(job_id)
+    if job is None:
+        return jsonify({"error": "Render job not found or expired."}), 404
+
+    try:
+        wait_seconds = min(float(request.args.get('wait', 0) or 0), RASTER_FIRST_PAGE_TIMEOUT)
+    except ValueError:
+        return jsonify({"error": "'wait' must be a number of seconds."}), 400
+    if wait_seconds > 0:
+        job.wait(min_pages=len(job.image_filenames()) + 1, timeout=wait_seconds)
+
+    job_status = job.to_dict()
+    return jsonify(job_status), 200 if job_status["status"] == "complete" else 202
+
+
+def _grid_out_etag(grid_out):
+    return getattr(grid_out, 'md5', None) or str(grid_out._id)
+
+def _stream_grid_out(grid_out, start, length, on_complete=None):
+    grid_out.seek(start)
+    remaining = length
+    chunks = [] if on_complete else None
+    while remaining > 0:
+        chunk = grid_out.read(min(grid_out.chunk_size, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        if chunks is not None:
+            chunks.append(chunk)
+        yield chunk
+    if chunks is not None and remaining == 0:
+        on_complete(b"".join(chunks))
+
 @agreement_pdf_bp.route('/image/<path:filename>', methods=['GET'])
 def get_image(filename):
-    fs = get_gridfs() 
+    fs = get_read_gridfs()
     if fs is None:
-        print("Error: GridFS not available when requested in get_image.") 
+        logger.error("GridFS not available when requested in get_image.")
         return jsonify({"error": "Storage service not available."}), 503
 
-    grid_out = None
     try:
-        grid_out = fs.find_one({"filename": filename})
+        with gridfs_operation_duration.labels("find_one").time():
+            grid_out = fs.find_one({"filename": filename})
+        if not grid_out:
+            # A page rendered moments ago may not have replicated yet; check the primary before a 404.
+            with gridfs_operation_duration.labels("find_one").time():
+                grid_out = get_gridfs().find_one({"filename": filename})
         if not grid_out:
             return jsonify({"error": "Image not found"}), 404
 
-        image_data_stream = io.BytesIO(grid_out.read())
-        response = make_response(send_file(
-            image_data_stream,
+        etag = _grid_out_etag(grid_out)
+        headers = {
+            'Cache-Control': f'public, max-age={IMAGE_CACHE_MAX_AGE}, must-revalidate',
+            'Accept-Ranges': 'bytes'
+        }
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304, headers=headers)
+            response.set_etag(etag)
+            return response
+
+        total_length = grid_out.length
+        start, stop = 0, total_length
+        status_code = 200
+        if request.range is not None:
+            byte_range = request.range.range_for_length(total_length)
+            if byte_range is None:
+                headers['Content-Range'] = f"bytes */{total_length}"
+                return Response(status=416, headers=headers)
+            start, stop = byte_range
+            status_code = 206
+            headers['Content-Range'] = f"bytes {start}-{stop - 1}/{total_length}"
+
+        headers['Content-Length'] = str(stop - start)
+        cacheable = file_cache.cacheable(grid_out)
+        cached = file_cache.get(grid_out) if cacheable else None
+        if cached is not None:
+            body = cached.data[start:stop]
+        else:
+            # Only a full-body send sees every byte, so only that one fills the cache.
+            on_complete = (lambda data: file_cache.put(grid_out, data)) if cacheable and status_code == 200 else None
+            body = stream_with_context(_stream_grid_out(grid_out, start, stop - start, on_complete))
+        response = Response(
+            body,
+            status=status_code,
             mimetype=grid_out.contentType or 'image/png',
-            as_attachment=False,
-            download_name=grid_out.filename
-        ))
-        response.headers['Cache-Control'] = 'public, immutable, max-age=31536000'
+            headers=headers,
+            direct_passthrough=True
+        )
+        response.set_etag(etag)
+        if grid_out.upload_date:
+            response.last_modified = grid_out.upload_date
         return response
 
     except Exception as e:
-        print(f"Error serving image {filename}: {e}")
-        traceback.print_exc()
+        logger.exception("Error serving image %s: %s", filename, e)
         return jsonify({"error": "Failed to serve image"}), 500
@@ -1,7 +1,10 @@
-import traceback
+import logging
 from flask import Blueprint, jsonify, request, current_app
 from ..assist_api_client import assist_client
 from ..utils import calculate_intersection
+from ..concurrency import fan_out
+
+logger = logging.getLogger(__name__)
 
 api_info_bp = Blueprint('api_info_bp', __name__)
 
@@ -14,10 +17,16 @@ def get_institutions():
         else:
             return jsonify({"error": "Failed to fetch institutions from Assist.org"}), 502
     except Exception as e:
-        print(f"Error fetching institutions: {e}")
-        traceback.print_exc()
+        logger.exception("Error fetching institutions: %s", e)
         return jsonify({"error": "An internal error occurred"}), 500
 
+@api_info_bp.route('/assist-client-stats', methods=['GET'])
+def get_assist_client_stats():
+    return jsonify({
+        "latency": assist_client.get_latency_stats(),
+        "cache": assist_client.get_cache_stats()
+    }), 200
+
 @api_info_bp.route('/academic-years', methods=['GET'])
 def get_academic_years_route():
     sending_id_str = request.args.get('sendingId')
@@ -36,30 +45,16 @@ def get_academic_years_route():
     errors = []
     warnings = []
 
-    for s_id in sending_ids:
-        try:
-            years = assist_client.get_academic_years(s_id)
-            if years:
-                all_results.append(years)
-            else:
-                warnings.append(f"No academic years found for sending institution {s_id}.")
-        except Exception as e:
-            error_msg = f"Error fetching academic years for sending institution {s_id}: {e}"
-            print(error_msg)
-            traceback.print_exc()
+    lookups = [("sending", s_id) for s_id in sending_ids] + [("receiving", receiving_id)]
+    for (role, institution_id), years, error in fan_out(lambda lookup: assist_client.get_academic_years(lookup[1]), lookups):
+        if error is not None:
+            error_msg = f"Error fetching academic years for {role} institution {institution_id}: {error}"
+            logger.error(error_msg, exc_info=error)
             errors.append(error_msg)
-
-    try:
-        receiving_years = assist_client.get_academic_years(receiving_id)
-        if receiving_years:
-            all_results.append(receiving_years)
+        elif years:
+            all_results.append(years)
         else:
-            warnings.append(f"No academic years found for receiving institution {receiving_id}.")
-    except Exception as e:
-        error_msg = f"Error fetching academic years for receiving institution {receiving_id}: {e}"
-        print(error_msg)
-        traceback.print_exc()
-        errors.append(error_msg)
+            warnings.append(f"No academic years found for {role} institution {institution_id}.")
 
     if errors and not all_results:
         return jsonify({"error": "Failed to fetch any academic years.", "details": errors}), 502
@@ -103,18 +98,18 @@ def get_majors_route():
     errors = []
     warnings = []
 
-    for s_id in sending_ids:
-        try:
-            majors = assist_client.get_agreements(receiving_id, s_id, year_id)
-            if majors and majors.get('reports'):
-                all_majors_results.append(majors)
-            else:
-                warnings.append(f"No majors found for sending institution {s_id} with receiving {receiving_id} for year {year_id}.")
-        except Exception as e:
-            error_msg = f"Error fetching majors for sending institution {s_id}: {e}"
-            print(error_msg)
-            traceback.print_exc()
+    def fetch_majors(s_id):
+        return assist_client.get_agreements(receiving_id, s_id, year_id)
+
+    for s_id, majors, error in fan_out(fetch_majors, sending_ids):
+        if error is not None:
+            error_msg = f"Error fetching majors for sending institution {s_id}: {error}"
+            logger.error(error_msg, exc_info=error)
             errors.append(error_msg)
+        elif majors and majors.get('reports'):
+            all_majors_results.append(majors)
+        else:
+            warnings.append(f"No majors found for sending institution {s_id} with receiving {receiving_id} for year {year_id}.")
 
     if errors and not all_majors_results:
         return jsonify({"error": "Failed to fetch any majors.", "details": errors}), 502
@@ -1,20 +1,45 @@
-import traceback
-import requests
+import logging
+import os
+import time
 import json
-from flask import Blueprint, jsonify, request, current_app
-from datetime import datetime, timedelta, time, timezone
+from collections import namedtuple
+from flask import Blueprint, Response, jsonify, request, current_app, stream_with_context
 
 import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold, Tool, FunctionDeclaration
-from google.generativeai.types import content_types 
 
-from ..utils import verify_google_token, get_or_create_user, check_and_update_usage
-from ..database import get_gridfs, get_db 
+from ..utils import verify_google_token, get_or_create_user, check_and_update_usage, format_usage_status, get_usage_status
+from ..database import get_gridfs, get_db, get_read_db
+from ..rasterizer import rasterizer
+from ..agreement_index import format_agreement_context, pdf_filename_for_image
+from ..prerequisite_search import prerequisite_search
+from ..response_cache import MongoCacheBackend
+from ..metrics import track_upstream
+from ..concurrency import fan_out
+from ..file_cache import file_cache
+from ..chat_sessions import (
+    CHAT_SESSIONS_COLLECTION, new_session, get_session, unseen_attachments, push_attachments,
+    append_turn, history_window, delete_session
+)
+from ..chat_response_cache import (
+    chat_response_cache, chat_cache_key, cache_hit_usage_policy,
+    CACHE_NAMESPACE as CHAT_CACHE_NAMESPACE, MAX_STORED_RESPONSES as MAX_STORED_CHAT_RESPONSES
+)
 
-chat_bp = Blueprint('chat_bp', __name__) 
+logger = logging.getLogger(__name__)
+
+LLM_RENDER_PROFILE = "llm"
+CHAT_MAX_TOOL_ROUNDS = int(os.getenv("CHAT_MAX_TOOL_ROUNDS", "5"))
+CHAT_TOOL_BUDGET_SECONDS = float(os.getenv("CHAT_TOOL_BUDGET_SECONDS", "45"))
 
-FREE_TIER_LIMIT = 10
-PREMIUM_TIER_LIMIT = 50
+SAFETY_SETTINGS = {
+    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+}
+
+chat_bp = Blueprint('chat_bp', __name__) 
 
 gemini_model = None
 perplexity_api_key = None
@@ -46,223 +71,484 @@ def init_chat_routes(app):
         with app.app_context(): 
             fs_instance = get_gridfs() 
             if fs_instance:
-                print("--- GridFS accessed successfully in init_chat_routes (within context) ---")
+                logger.info("GridFS accessed successfully in init_chat_routes (within context)")
             else:
-                print("!!! WARNING: get_gridfs() returned None in init_chat_routes.")
+                logger.warning("get_gridfs() returned None in init_chat_routes.")
+            prerequisite_search.cache.attach_backend(MongoCacheBackend(get_db()['prerequisite_search_cache']))
+            if _response_cache_enabled(config):
+                chat_response_cache.attach_backend(MongoCacheBackend(
+                    get_db()['chat_response_cache'], max_entries=MAX_STORED_CHAT_RESPONSES
+                ))
+                logger.info("Chat response cache enabled")
     except Exception as e:
-        print(f"Error during chat routes initialization related to DB/GridFS: {e}")
+        logger.error("Error during chat routes initialization related to DB/GridFS: %s", e)
+
+    prerequisite_search.configure(perplexity_api_key)
 
     if not google_api_key:
-        print("Warning: GOOGLE_API_KEY not set. Gemini features will be disabled.")
+        logger.warning("GOOGLE_API_KEY not set. Gemini features will be disabled.")
         return 
     if not perplexity_api_key:
-        print("Warning: PERPLEXITY_API_KEY not set. Web search tool will be disabled.")
+        logger.warning("PERPLEXITY_API_KEY not set. Web search tool will be disabled.")
 
     try:
-        genai.configure(api_key=google_api_key)
+        gemini_endpoint = config.get('GEMINI_API_ENDPOINT')
+        if gemini_endpoint:
+            genai.configure(api_key=google_api_key, transport="rest", client_options={"api_endpoint": gemini_endpoint})
+            logger.info("Gemini requests routed to %s", gemini_endpoint)
+        else:
+            genai.configure(api_key=google_api_key)
         model_tools = [search_tool] if perplexity_api_key else None
         gemini_model = genai.GenerativeModel(
             'gemini-1.5-flash',
             tools=model_tools
         )
-        print(f"--- Gemini Initialized Successfully {'with Web Search Tool' if model_tools else ''} ---")
+        logger.info("Gemini Initialized Successfully %s", 'with Web Search Tool' if model_tools else '')
     except Exception as e:
-        print(f"!!! Gemini Initialization Error: {e}")
+        logger.warning("Gemini Initialization Error: %s", e)
         gemini_model = None
 
 
-def call_perplexity_api(query: str) -> dict:
-    if not perplexity_api_key:
-        print("Error: Perplexity API key not configured.")
-        return {"error": "Web search tool not configured."}
+def call_perplexity_api(query: str, timeout=None) -> dict:
+    return prerequisite_search.search(query, timeout=timeout)
 
-    url = "https://api.perplexity.ai/chat/completions"
-    payload = {
-        "model": "sonar",
-        "messages": [
-            {"role": "system", "content": "You are an AI assistant specialized in finding and extracting course prerequisite information from web searches. Provide only the prerequisite course codes (e.g., MATH 100, ENGL 1A) or state 'None' if no prerequisites are found."},
-            {"role": "user", "content": query}
-        ]
-    }
-    headers = {
-        "accept": "application/json",
-        "content-type": "application/json",
-        "authorization": f"Bearer {perplexity_api_key}"
-    }
 
-    try:
-        print(f"--- Calling Perplexity API with query: {query} ---")
-        response = requests.post(url, json=payload, headers=headers, timeout=30)
-        response.raise_for_status()
-        result = response.json()
-        print(f"--- Perplexity API Response Status: {response.status_code} ---")
-
-        if result.get("choices") and len(result["choices"]) > 0:
-            content = result["choices"][0].get("message", {}).get("content")
-            if content:
-                 return {"result": content}
-            else:
-                 print("Warning: Perplexity response missing content.")
-                 return {"result": "No prerequisite information found in search results."}
-        else:
-            print("Warning: Perplexity response format unexpected:", result)
-            return {"error": "Unexpected response format from Perplexity."}
+TOOL_BUDGET_EXHAUSTED = {"error": "The web search time budget for this chat is used up. Answer with the information already gathered."}
 
-    except requests.exceptions.RequestException as e:
-        print(f"Error calling Perplexity API: {e}")
-        return {"error": f"Failed to connect to web search service: {e}"}
-    except Exception as e:
-        print(f"Unexpected error during Perplexity call: {e}")
-        traceback.print_exc()
-        return {"error": "An unexpected error occurred during web search."}
 
+class ToolBudget:
+    def __init__(self, seconds):
+        self.deadline = time.monotonic() + seconds
 
-@chat_bp.route('/chat', methods=['POST'])
-def chat_endpoint():
-    fs_request = get_gridfs()
-    if fs_request is None:
-         print("Error: GridFS not available for this request.")
-         return jsonify({"error": "Storage service unavailable"}), 500
+    def remaining(self):
+        return max(self.deadline - time.monotonic(), 0.0)
 
-    config = current_app.config['APP_CONFIG']
-    GOOGLE_CLIENT_ID = config.get('GOOGLE_CLIENT_ID')
 
+def _find_llm_image(fs, img_filename):
+    grid_out = fs.find_one({"filename": img_filename})
+    if not grid_out:
+        return None
+
+    metadata = grid_out.metadata or {}
+    original_pdf = metadata.get("original_pdf")
+    if not original_pdf or metadata.get("profile") == LLM_RENDER_PROFILE:
+        return grid_out
+
+    llm_image = fs.find_one({
+        "metadata.original_pdf": original_pdf,
+        "metadata.page_number": metadata.get("page_number"),
+        "metadata.profile": LLM_RENDER_PROFILE
+    })
+    if llm_image:
+        return llm_image
+
+    rasterizer.start(fs, original_pdf, LLM_RENDER_PROFILE)
+    return grid_out
+
+
+def _agreement_text_attachments(db, image_filenames):
+    attachments = []
+    remaining_images = []
+    contexts = {}
+    for img_filename in image_filenames:
+        pdf_filename = pdf_filename_for_image(img_filename)
+        if pdf_filename and pdf_filename not in contexts:
+            try:
+                contexts[pdf_filename] = format_agreement_context(db, pdf_filename)
+            except Exception as e:
+                logger.error("Error loading indexed text for '%s': %s", pdf_filename, e)
+                contexts[pdf_filename] = None
+            if contexts[pdf_filename]:
+                attachments.append({
+                    "type": "text",
+                    "source": pdf_filename,
+                    "text": f"Articulation agreement ({pdf_filename}), receiving course <- sending course(s):\n{contexts[pdf_filename]}"
+                })
+        if not pdf_filename or not contexts[pdf_filename]:
+            remaining_images.append(img_filename)
+    return attachments, remaining_images
+
+
+def _resolve_attachments(fs_request, config, image_filenames):
+    attachments = []
+    if image_filenames and config.get('CHAT_AGREEMENT_CONTEXT', 'images') == 'text':
+        attachments, image_filenames = _agreement_text_attachments(get_read_db(), image_filenames)
+
+    for img_filename in image_filenames:
+        try:
+            grid_out = _find_llm_image(fs_request, img_filename)
+            if grid_out:
+                attachments.append({
+                    "type": "image",
+                    "source": img_filename,
+                    "filename": grid_out.filename,
+                    "mime_type": grid_out.contentType or "image/png"
+                })
+            else:
+                logger.warning("Image '%s' not found in GridFS.", img_filename)
+        except Exception as img_err:
+            logger.error("Error resolving image '%s' from GridFS: %s", img_filename, img_err)
+    return attachments
+
+
+def _attachment_parts(fs_request, attachments):
+    image_filenames = [attachment["filename"] for attachment in attachments if attachment["type"] == "image"]
+    files = file_cache.read_many(fs_request, image_filenames) if image_filenames else {}
+
+    parts = []
+    for attachment in attachments:
+        if attachment["type"] == "text":
+            parts.append(attachment["text"])
+        elif attachment["filename"] in files:
+            parts.append({"mime_type": attachment["mime_type"], "data": files[attachment["filename"]].data})
+        else:
+            logger.warning("Attached image '%s' no longer exists in GridFS.", attachment['filename'])
+    return parts
+
+
+def _authenticate_chat(config):
+    GOOGLE_CLIENT_ID = config.get('GOOGLE_CLIENT_ID')
     if not GOOGLE_CLIENT_ID:
-         print("Error: GOOGLE_CLIENT_ID not configured.")
-         return jsonify({"error": "Server configuration error"}), 500 
-    if not gemini_model:
-         print("Error: Gemini model not initialized.")
-         return jsonify({"error": "Chat service unavailable"}), 500 
+         logger.error("GOOGLE_CLIENT_ID not configured.")
+         return None, (jsonify({"error": "Server configuration error"}), 500)
 
     try:
         auth_header = request.headers.get('Authorization')
         if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({"error": "Authorization token missing or invalid"}), 401
+            return None, (jsonify({"error": "Authorization token missing or invalid"}), 401)
         token = auth_header.split(' ')[1]
         user_info = verify_google_token(token, GOOGLE_CLIENT_ID)
-        user_data = get_or_create_user(user_info)
-
-        if not check_and_update_usage(user_data):
-            now = datetime.now(timezone.utc)
-            tomorrow = now.date() + timedelta(days=1)
-            tomorrow_midnight_utc = datetime.combine(tomorrow, time(0, 0), tzinfo=timezone.utc)
-            reset_time_str = tomorrow_midnight_utc.strftime('%Y-%m-%d %H:%M:%S %Z')
-            limit = PREMIUM_TIER_LIMIT if user_data.get('tier') == 'premium' else FREE_TIER_LIMIT
-            return jsonify({
-                "error": f"Usage limit ({limit} requests/day) exceeded for your tier ('{user_data.get('tier')}'). Please try again after {reset_time_str}."
-            }), 429
-
+        return get_or_create_user(user_info), None
     except ValueError as auth_err:
-        return jsonify({"error": str(auth_err)}), 401
+        return None, (jsonify({"error": str(auth_err)}), 401)
+    except Exception as user_err:
+        logger.exception("Error during chat authentication: %s", user_err)
+        return None, (jsonify({"error": "Could not verify user."}), 500)
+
+
+def _usage_limit_response(usage_status):
+    reset_time_str = usage_status['reset_time'].strftime('%Y-%m-%d %H:%M:%S %Z')
+    return jsonify({
+        "error": f"Usage limit ({usage_status['limit']} requests/day) exceeded for your tier ('{usage_status['tier']}'). Please try again after {reset_time_str}.",
+        "usage": format_usage_status(usage_status)
+    }), 429
+
+
+def _check_usage(user_data):
+    try:
+        usage_status = check_and_update_usage(user_data)
+        if not usage_status['allowed']:
+            return None, _usage_limit_response(usage_status)
     except Exception as usage_err:
-        print(f"Error during usage check: {usage_err}")
-        traceback.print_exc()
-        return jsonify({"error": "Could not verify usage limits."}), 500
+        logger.exception("Error during usage check: %s", usage_err)
+        return None, (jsonify({"error": "Could not verify usage limits."}), 500)
 
-    data = request.get_json()
-    if not data or 'new_message' not in data:
-        return jsonify({"error": "Missing 'new_message' in request body"}), 400
+    return usage_status, None
 
-    new_message_text = data['new_message']
-    history = data.get('history', [])
-    image_filenames = data.get('image_filenames', [])
 
-    prompt_parts = []
-    if image_filenames:
-        print(f"Processing {len(image_filenames)} images for chat...")
-        image_mime_type = "image/png"
-        for img_filename in image_filenames:
-            try:
-                grid_out = fs_request.find_one({"filename": img_filename})
-                if grid_out:
-                    image_data = grid_out.read()
-                    prompt_parts.append({"mime_type": image_mime_type, "data": image_data})
-                else:
-                    print(f"Warning: Image '{img_filename}' not found in GridFS.")
-            except Exception as img_err:
-                print(f"Error reading image '{img_filename}' from GridFS: {img_err}")
+def _build_prompt(fs_request, session, new_message_text):
+    attachment_parts = _attachment_parts(fs_request, session.get("attachments", []))
+    messages, omitted = history_window(session.get("messages", []))
+
+    api_history = [{'role': msg['role'], 'parts': [msg['content']]} for msg in messages]
+    if omitted:
+        logger.debug("Chat session %s: %s older messages are outside the history token budget.", session['_id'], omitted)
+        attachment_parts.append(f"(Earlier conversation omitted: {omitted} messages.)")
+
+    if api_history:
+        api_history[0]['parts'] = attachment_parts + api_history[0]['parts']
+        return [new_message_text], api_history
+    return attachment_parts + [new_message_text], api_history
+
+
+def _response_parts(response):
+    if not response.candidates or not response.candidates[0].content.parts:
+        return []
+    return list(response.candidates[0].content.parts)
+
+
+def _function_calls(response):
+    return [part.function_call for part in _response_parts(response) if part.function_call.name]
 
-    prompt_parts.append(new_message_text)
 
+def _text_of(response):
+    return "".join(part.text for part in _response_parts(response) if part.text)
+
+
+def _run_function_call(function_call, budget):
+    logger.debug("Gemini requested Function Call: %s", function_call.name)
+    if function_call.name == "search_web":
+        query = function_call.args.get("query")
+        if not query:
+            logger.error("Gemini function call 'search_web' missing 'query' argument.")
+            return {"error": "Missing 'query' argument in function call."}
+        if budget.remaining() <= 0:
+            logger.debug("Tool time budget exhausted, skipping search for: %s", query)
+            return dict(TOOL_BUDGET_EXHAUSTED)
+        return call_perplexity_api(query, timeout=budget.remaining())
+
+    logger.error("Unknown function call requested by Gemini: %s", function_call.name)
+    return {"error": f"Function '{function_call.name}' is not implemented."}
+
+
+def _run_function_calls(function_calls, budget):
+    response_parts = []
+    if budget.remaining() <= 0:
+        logger.debug("Tool time budget exhausted, skipping %s function call(s).", len(function_calls))
+        results = [(function_call, dict(TOOL_BUDGET_EXHAUSTED), None) for function_call in function_calls]
+    else:
+        results = fan_out(lambda call: _run_function_call(call, budget), function_calls, timeout=budget.remaining())
+    for function_call, result, error in results:
+        if error is not None:
+            logger.error("Function call %s failed: %s", function_call.name, error)
+            result = {"error": f"Tool call failed: {error}"}
+        response_parts.append(genai.protos.Part(function_response=genai.protos.FunctionResponse(name=function_call.name, response=result)))
+    logger.debug("Sending %s Function Response(s) back to Gemini (%.1fs of tool budget left)", len(response_parts), budget.remaining())
+    return response_parts
+
+
+def _blocked_details(response):
     try:
-        print("Sending initial request to Gemini...")
-        api_history = []
-        for msg in history:
-             role = 'model' if msg.get('role') == 'assistant' else msg.get('role')
-             if role in ['user', 'model'] and msg.get('content'):
-                 api_history.append({'role': role, 'parts': [msg['content']]})
-
-        chat_session = gemini_model.start_chat(history=api_history)
-        response = chat_session.send_message(
-            prompt_parts,
-            stream=False,
-            safety_settings={
-                HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-                HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-                HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-                HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-            }
-        )
+        return response.prompt_feedback.safety_ratings if hasattr(response, 'prompt_feedback') and hasattr(response.prompt_feedback, 'safety_ratings') else "No feedback available."
+    except Exception as feedback_err:
+        return f"Error accessing feedback: {feedback_err}"
 
-        while response.candidates and response.candidates[0].content.parts and isinstance(response.candidates[0].content.parts[0], genai.types.FunctionCall):
-            function_call = response.candidates[0].content.parts[0].function_call
-            print(f"--- Gemini requested Function Call: {function_call.name} ---")
-
-            if function_call.name == "search_web":
-                query = function_call.args.get("query")
-                if not query:
-                    print("Error: Gemini function call 'search_web' missing 'query' argument.")
-                    function_response_part = content_types.FunctionResponse(
-                        name="search_web",
-                        response={"error": "Missing 'query' argument in function call."}
-                    )
-                else:
-                    search_results = call_perplexity_api(query)
-                    function_response_part = content_types.FunctionResponse(
-                        name="search_web",
-                        response=search_results
-                    )
-
-                print(f"--- Sending Function Response back to Gemini for {function_call.name} ---")
-                response = chat_session.send_message(content_types.to_content(function_response_part), stream=False)
 
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
 
-            else:
-                print(f"Error: Unknown function call requested by Gemini: {function_call.name}")
-                function_response_part = content_types.FunctionResponse(
-                    name=function_call.name,
-                    response={"error": f"Function '{function_call.name}' is not implemented."}
-                )
-                response = chat_session.send_message(content_types.to_content(function_response_part), stream=False)
-
-        if not response.candidates or not response.candidates[0].content.parts:
-             print("Gemini response blocked or empty after processing. Feedback:", response.prompt_feedback if hasattr(response, 'prompt_feedback') else "N/A")
-             try:
-                 safety_feedback = response.prompt_feedback.safety_ratings if hasattr(response, 'prompt_feedback') and hasattr(response.prompt_feedback, 'safety_ratings') else "No feedback available."
-             except Exception as feedback_err:
-                 safety_feedback = f"Error accessing feedback: {feedback_err}"
-             return jsonify({"error": "Response blocked due to safety settings or empty response.", "details": str(safety_feedback)}), 400
-
-        reply_text = ""
-        try:
-            if hasattr(response, 'text'):
-                reply_text = response.text
-            elif response.candidates and response.candidates[0].content.parts:
-                 reply_text = "".join(part.text for part in response.candidates[0].content.parts if hasattr(part, 'text'))
 
-            if not reply_text:
-                 print("Warning: Could not extract text from final Gemini response.")
-                 return jsonify({"error": "AI assistant returned an empty reply."}), 500
+def _stream_tokens(response, reply_chunks):
+    for chunk in response:
+        text = _text_of(chunk)
+        if text:
+            reply_chunks.append(text)
+            yield _sse("token", {"text": text})
+
+
+ChatTurn = namedtuple('ChatTurn', ['usage_status', 'sessions', 'session_id', 'new_message', 'prompt_parts', 'history', 'cache_key', 'cached_reply'])
+
+
+def _response_cache_enabled(config):
+    return str(config.get('CHAT_RESPONSE_CACHE', '')).lower() in ('1', 'true', 'yes', 'on')
+
+
+def _lookup_cached_reply(config, data, prompt_parts, api_history):
+    if not _response_cache_enabled(config) or data.get('use_cache') is False:
+        return None, None
+    try:
+        cache_key = chat_cache_key(gemini_model.model_name, api_history, prompt_parts)
+        return cache_key, chat_response_cache.get(cache_key, namespace=CHAT_CACHE_NAMESPACE)
+    except Exception as e:
+        logger.error("Error checking chat response cache: %s", e)
+        return None, None
+
+
+def _prepare_chat():
+    fs_request = get_gridfs()
+    if fs_request is None:
+         logger.error("GridFS not available for this request.")
+         return None, (jsonify({"error": "Storage service unavailable"}), 500)
+
+    config = current_app.config['APP_CONFIG']
+    data = request.get_json(silent=True)
+    if not data or 'new_message' not in data:
+        return None, (jsonify({"error": "Missing 'new_message' in request body"}), 400)
+    if not gemini_model:
+         logger.error("Gemini model not initialized.")
+         return None, (jsonify({"error": "Chat service unavailable"}), 500)
+
+    user_data, error_response = _authenticate_chat(config)
+    if error_response:
+        return None, error_response
+
+    sessions = get_db()[CHAT_SESSIONS_COLLECTION]
+    session = None
+    if data.get('session_id'):
+        session = get_session(sessions, data['session_id'], user_data['google_user_id'])
+        if session is None:
+            return None, (jsonify({"error": "Chat session not found."}), 404)
+
+    # Quota is enforced before any attachment reads or cache-key hashing. Under the
+    # 'free' cache-hit policy the request is only charged once we know it missed.
+    free_cache_hits = cache_hit_usage_policy(config.get('CHAT_CACHE_HIT_USAGE')) == 'free'
+    if free_cache_hits:
+        usage_status = get_usage_status(user_data)
+        if usage_status['remaining'] <= 0:
+            return None, _usage_limit_response(dict(usage_status, allowed=False))
+    else:
+        usage_status, error_response = _check_usage(user_data)
+        if error_response:
+            return None, error_response
+
+    attachments = _resolve_attachments(fs_request, config, data.get('image_filenames', []))
+    if session is not None:
+        added_attachments = unseen_attachments(session, attachments)
+        session = dict(session, attachments=session.get("attachments", []) + added_attachments)
+        persist_session = (lambda: push_attachments(sessions, session['_id'], added_attachments)) if added_attachments else None
+    else:
+        session = new_session(user_data['google_user_id'], attachments, data.get('history'))
+        persist_session = lambda: sessions.insert_one(session)
+
+    prompt_parts, api_history = _build_prompt(fs_request, session, data['new_message'])
+    cache_key, cached_reply = _lookup_cached_reply(config, data, prompt_parts, api_history)
+
+    if free_cache_hits and cached_reply is None:
+        usage_status, error_response = _check_usage(user_data)
+        if error_response:
+            return None, error_response
+
+    if persist_session:
+        persist_session()
+    return ChatTurn(usage_status, sessions, session['_id'], data['new_message'], prompt_parts, api_history, cache_key, cached_reply), None
+
+
+def _store_reply(turn, reply_text):
+    if turn.cache_key is None:
+        return
+    try:
+        chat_response_cache.set(turn.cache_key, {"reply": reply_text}, namespace=CHAT_CACHE_NAMESPACE)
+    except Exception as e:
+        logger.error("Error storing chat response in cache: %s", e)
+
+
+def _send_message(chat_session, content, stream=False, **kwargs):
+    with track_upstream("gemini", "stream_start" if stream else "send_message"):
+        return chat_session.send_message(content, stream=stream, **kwargs)
+
+
+def _save_turn(turn, reply_text):
+    try:
+        append_turn(turn.sessions, turn.session_id, turn.new_message, reply_text)
+    except Exception as e:
+        logger.exception("Error saving turn to chat session %s: %s", turn.session_id, e)
 
-        except AttributeError as e:
-             print(f"Error accessing final response text: {e}")
-             print("Final Gemini Response Object:", response)
-             return jsonify({"error": "Failed to parse final AI response."}), 500
 
-        print("Received final reply from Gemini.")
-        return jsonify({"reply": reply_text})
+@chat_bp.route('/chat', methods=['POST'])
+def chat_endpoint():
+    turn, error_response = _prepare_chat()
+    if error_response:
+        return error_response
+
+    if turn.cached_reply is not None:
+        logger.debug("Serving chat reply from response cache.")
+        _save_turn(turn, turn.cached_reply["reply"])
+        return jsonify({"reply": turn.cached_reply["reply"], "session_id": turn.session_id, "cached": True, "usage": format_usage_status(turn.usage_status)})
+
+    try:
+        logger.debug("Sending initial request to Gemini...")
+        chat_session = gemini_model.start_chat(history=turn.history)
+        response = _send_message(chat_session, turn.prompt_parts, stream=False, safety_settings=SAFETY_SETTINGS)
+        budget = ToolBudget(CHAT_TOOL_BUDGET_SECONDS)
+
+        for _ in range(CHAT_MAX_TOOL_ROUNDS):
+            function_calls = _function_calls(response)
+            if not function_calls:
+                break
+            response = _send_message(chat_session, _run_function_calls(function_calls, budget), stream=False)
+
+        if not _response_parts(response):
+             logger.warning("Gemini response blocked or empty after processing. Feedback: %s", getattr(response, 'prompt_feedback', "N/A"))
+             return jsonify({"error": "Response blocked due to safety settings or empty response.", "details": str(_blocked_details(response))}), 400
+
+        reply_text = _text_of(response)
+        if not reply_text:
+             logger.warning("Could not extract text from final Gemini response.")
+             return jsonify({"error": "AI assistant returned an empty reply."}), 500
+
+        logger.debug("Received final reply from Gemini.")
+        _save_turn(turn, reply_text)
+        _store_reply(turn, reply_text)
+        return jsonify({"reply": reply_text, "session_id": turn.session_id, "usage": format_usage_status(turn.usage_status)})
 
     except Exception as e:
-        print(f"Error during Gemini interaction: {e}")
-        traceback.print_exc()
+        logger.exception("Error during Gemini interaction: %s", e)
         return jsonify({"error": "Failed to get response from AI assistant."}), 500
+
+
+@chat_bp.route('/chat/stream', methods=['POST'])
+def chat_stream_endpoint():
+    turn, error_response = _prepare_chat()
+    if error_response:
+        return error_response
+    usage = format_usage_status(turn.usage_status)
+
+    def generate():
+        yield _sse("session", {"session_id": turn.session_id})
+        yield _sse("usage", usage)
+        if turn.cached_reply is not None:
+            logger.debug("Serving streamed chat reply from response cache.")
+            _save_turn(turn, turn.cached_reply["reply"])
+            yield _sse("token", {"text": turn.cached_reply["reply"]})
+            yield _sse("done", {"reply": turn.cached_reply["reply"], "session_id": turn.session_id, "cached": True, "usage": usage})
+            return
+
+        reply_chunks = []
+        try:
+            logger.debug("Streaming request to Gemini...")
+            chat_session = gemini_model.start_chat(history=turn.history)
+            response = _send_message(chat_session, turn.prompt_parts, stream=True, safety_settings=SAFETY_SETTINGS)
+            budget = ToolBudget(CHAT_TOOL_BUDGET_SECONDS)
+
+            for _ in range(CHAT_MAX_TOOL_ROUNDS):
+                yield from _stream_tokens(response, reply_chunks)
+                function_calls = _function_calls(response)
+                if not function_calls:
+                    break
+                for function_call in function_calls:
+                    yield _sse("tool", {"name": function_call.name, "args": dict(function_call.args)})
+                response = _send_message(chat_session, _run_function_calls(function_calls, budget), stream=True)
+            else:
+                yield from _stream_tokens(response, reply_chunks)
+
+            reply_text = "".join(reply_chunks)
+            if not reply_text:
+                logger.warning("Gemini stream blocked or empty. Feedback: %s", getattr(response, 'prompt_feedback', "N/A"))
+                yield _sse("error", {"error": "Response blocked due to safety settings or empty response.", "details": str(_blocked_details(response))})
+                return
+
+            logger.debug("Finished streaming reply from Gemini.")
+            _save_turn(turn, reply_text)
+            _store_reply(turn, reply_text)
+            yield _sse("done", {"reply": reply_text, "session_id": turn.session_id, "usage": usage})
+
+        except Exception as e:
+            logger.exception("Error during Gemini streaming: %s", e)
+            yield _sse("error", {"error": "Failed to get response from AI assistant."})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@chat_bp.route('/chat/sessions/<session_id>', methods=['GET'])
+def get_chat_session(session_id):
+    user_data, error_response = _authenticate_chat(current_app.config['APP_CONFIG'])
+    if error_response:
+        return error_response
+
+    session = get_session(get_db()[CHAT_SESSIONS_COLLECTION], session_id, user_data['google_user_id'])
+    if session is None:
+        return jsonify({"error": "Chat session not found."}), 404
+    return jsonify({
+        "session_id": session['_id'],
+        "image_filenames": [attachment['source'] for attachment in session.get('attachments', [])],
+        "messages": [
+            {"role": 'assistant' if msg['role'] == 'model' else msg['role'], "content": msg['content']}
+            for msg in session.get('messages', [])
+        ],
+        "updated_at": session['updated_at'].isoformat()
+    }), 200
+
+
+@chat_bp.route('/chat/sessions/<session_id>', methods=['DELETE'])
+def delete_chat_session(session_id):
+    user_data, error_response = _authenticate_chat(current_app.config['APP_CONFIG'])
+    if error_response:
+        return error_response
+
+    if not delete_session(get_db()[CHAT_SESSIONS_COLLECTION], session_id, user_data['google_user_id']):
+        return jsonify({"error": "Chat session not found."}), 404
+    return jsonify({"message": "Chat session deleted."}), 200
@@ -1,5 +1,5 @@
+import logging
 import uuid
-import traceback
 from flask import Blueprint, jsonify, request, current_app
 from bson.objectid import ObjectId
 from datetime import datetime, timezone
@@ -7,6 +7,8 @@ from datetime import datetime, timezone
 from ..utils import verify_google_token, get_or_create_user
 from ..database import get_course_maps_collection
 
+logger = logging.getLogger(__name__)
+
 course_map_bp = Blueprint('course_map_bp', __name__)
 
 @course_map_bp.route('/course-maps', methods=['POST'])
@@ -30,8 +32,7 @@ def save_course_map():
     except ValueError as auth_err:
         return jsonify({"error": str(auth_err)}), 401
     except Exception as usage_err:
-        print(f"Error during auth/user check for saving map: {usage_err}")
-        traceback.print_exc()
+        logger.exception("Error during auth/user check for saving map: %s", usage_err)
         return jsonify({"error": "Could not verify user or usage limits."}), 500
 
     data = request.get_json()
@@ -54,12 +55,11 @@ def save_course_map():
             "updated_at": datetime.now(timezone.utc)
         }
         course_maps_collection.insert_one(map_document)
-        print(f"Course map '{map_name}' ({map_id}) saved for user {google_user_id}")
+        logger.info("Course map '%s' (%s) saved for user %s", map_name, map_id, google_user_id)
         return jsonify({"message": "Course map saved successfully", "map_id": map_id}), 201
 
     except Exception as e:
-        print(f"Error saving course map for user {google_user_id}: {e}")
-        traceback.print_exc()
+        logger.exception("Error saving course map for user %s: %s", google_user_id, e)
         return jsonify({"error": "Failed to save course map"}), 500
 
 @course_map_bp.route('/course-maps', methods=['GET'])
@@ -81,8 +81,7 @@ def get_user_course_maps():
     except ValueError as auth_err:
         return jsonify({"error": str(auth_err)}), 401
     except Exception as e:
-        print(f"Error during authentication for getting maps: {e}")
-        traceback.print_exc()
+        logger.exception("Error during authentication for getting maps: %s", e)
         return jsonify({"error": "Authentication failed."}), 500
 
     try:
@@ -91,12 +90,11 @@ def get_user_course_maps():
             {"nodes": 0, "edges": 0}
         ).sort("updated_at", -1))
 
-        print(f"Found {len(user_maps)} course maps for user {google_user_id}")
+        logger.debug("Found %s course maps for user %s", len(user_maps), google_user_id)
         return jsonify(user_maps), 200
 
     except Exception as e:
-        print(f"Error fetching course maps for user {google_user_id}: {e}")
-        traceback.print_exc()
+        logger.exception("Error fetching course maps for user %s: %s", google_user_id, e)
         return jsonify({"error": "Failed to fetch course maps"}), 500
 
 @course_map_bp.route('/course-map/<map_id>', methods=['GET'])
@@ -119,8 +117,7 @@ def get_course_map_details(map_id):
     except ValueError as auth_err:
         return jsonify({"error": str(auth_err)}), 401
     except Exception as e:
-        print(f"Error during authentication for getting map details: {e}")
-        traceback.print_exc()
+        logger.exception("Error during authentication for getting map details: %s", e)
         return jsonify({"error": "Authentication failed."}), 500
 
     try:
@@ -130,15 +127,14 @@ def get_course_map_details(map_id):
             return jsonify({"error": "Course map not found"}), 404
 
         if course_map.get("google_user_id") != google_user_id:
-            print(f"Authorization failed: User {google_user_id} tried to access map {map_id} owned by {course_map.get('google_user_id')}")
+            logger.warning("Authorization failed: User %s tried to access map %s owned by %s", google_user_id, map_id, course_map.get('google_user_id'))
             return jsonify({"error": "Not authorized to access this course map"}), 403
 
-        print(f"Fetched details for course map {map_id}")
+        logger.debug("Fetched details for course map %s", map_id)
         return jsonify(course_map), 200
 
     except Exception as e:
-        print(f"Error fetching course map details for map {map_id}: {e}")
-        traceback.print_exc()
+        logger.exception("Error fetching course map details for map %s: %s", map_id, e)
         return jsonify({"error": "Failed to fetch course map details"}), 500
 
 @course_map_bp.route('/course-map/<map_id>', methods=['PUT'])
@@ -161,8 +157,7 @@ def update_course_map(map_id):
     except ValueError as auth_err:
         return jsonify({"error": str(auth_err)}), 401
     except Exception as e:
-        print(f"Error during authentication for updating map: {e}")
-        traceback.print_exc()
+        logger.exception("Error during authentication for updating map: %s", e)
         return jsonify({"error": "Authentication failed."}), 500
 
     data = request.get_json()
@@ -181,8 +176,7 @@ def update_course_map(map_id):
             return jsonify({"error": "Not authorized to update this course map"}), 403
 
     except Exception as e:
-        print(f"Error finding map {map_id} for update: {e}")
-        traceback.print_exc()
+        logger.exception("Error finding map %s for update: %s", map_id, e)
         return jsonify({"error": "Failed to find course map for update"}), 500
 
     try:
@@ -199,12 +193,11 @@ def update_course_map(map_id):
         if result.matched_count == 0:
              return jsonify({"error": "Course map not found during update"}), 404
 
-        print(f"Course map {map_id} updated successfully by user {google_user_id}")
+        logger.info("Course map %s updated successfully by user %s", map_id, google_user_id)
         return jsonify({"message": "Course map updated successfully"}), 200
 
     except Exception as e:
-        print(f"Error updating course map {map_id}: {e}")
-        traceback.print_exc()
+        logger.exception("Error updating course map %s: %s", map_id, e)
         return jsonify({"error": "Failed to update course map"}), 500
 
 @course_map_bp.route('/course-map/<map_id>', methods=['DELETE'])
@@ -227,8 +220,7 @@ def delete_course_map(map_id):
     except ValueError as auth_err:
         return jsonify({"error": str(auth_err)}), 401
     except Exception as e:
-        print(f"Error during authentication for deleting map: {e}")
-        traceback.print_exc()
+        logger.exception("Error during authentication for deleting map: %s", e)
         return jsonify({"error": "Authentication failed."}), 500
 
     try:
@@ -239,8 +231,7 @@ def delete_course_map(map_id):
             return jsonify({"error": "Not authorized to delete this course map"}), 403
 
     except Exception as e:
-        print(f"Error finding map {map_id} for deletion: {e}")
-        traceback.print_exc()
+        logger.exception("Error finding map %s for deletion: %s", map_id, e)
         return jsonify({"error": "Failed to find course map for deletion"}), 500
 
     try:
@@ -249,10 +240,9 @@ def delete_course_map(map_id):
         if result.deleted_count == 0:
             return jsonify({"error": "Course map not found during deletion"}), 404
 
-        print(f"Course map {map_id} deleted successfully by user {google_user_id}")
+        logger.info("Course map %s deleted successfully by user %s", map_id, google_user_id)
         return jsonify({"message": "Course map deleted successfully"}), 200
 
     except Exception as e:
-        print(f"Error deleting course map {map_id}: {e}")
-        traceback.print_exc()
+        logger.exception("Error deleting course map %s: %s", map_id, e)
         return jsonify({"error": "Failed to delete course map"}), 500
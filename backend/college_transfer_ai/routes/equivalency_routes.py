@@ -0,0 +1,80 @@
+import logging
+from flask import Blueprint, jsonify, request
+from ..database import get_read_db
+from ..equivalency_index import find_equivalencies, MAX_BATCH_QUERIES
+
+logger = logging.getLogger(__name__)
+
+equivalency_bp = Blueprint('equivalency_bp', __name__)
+
+@equivalency_bp.route('/equivalencies', methods=['GET'])
+def get_equivalencies():
+    receiving_id = request.args.get('receivingId')
+    course = request.args.get('course')
+    if not receiving_id or not course:
+        return jsonify({"error": "Missing receivingId or course parameter"}), 400
+
+    sending_ids = request.args.get('sendingIds')
+    query = {
+        "receiving_id": receiving_id,
+        "course": course,
+        "sending_ids": sending_ids.split(',') if sending_ids else None,
+        "year_id": request.args.get('academicYearId')
+    }
+
+    try:
+        result = find_equivalencies(get_read_db(), [query])[0]
+        return jsonify(result), 200
+    except ValueError:
+        return jsonify({"error": "Invalid ID format. IDs must be integers."}), 400
+    except Exception as e:
+        logger.exception("Error looking up equivalencies for %s at %s: %s", course, receiving_id, e)
+        return jsonify({"error": "Failed to look up course equivalencies"}), 500
+
+def _is_id(value):
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, int) or (isinstance(value, str) and value.strip().isdigit())
+
+def _batch_query_error(query):
+    if not isinstance(query, dict):
+        return "each query must be an object"
+    if not _is_id(query.get('receivingId')):
+        return "receivingId must be an integer"
+    if not isinstance(query.get('course'), str) or not query['course'].strip():
+        return "course must be a non-empty string"
+    sending_ids = query.get('sendingIds')
+    if sending_ids is not None and (not isinstance(sending_ids, list) or not all(_is_id(s_id) for s_id in sending_ids)):
+        return "sendingIds must be a list of integers"
+    if query.get('academicYearId') is not None and not _is_id(query['academicYearId']):
+        return "academicYearId must be an integer"
+    return None
+
+@equivalency_bp.route('/equivalencies/batch', methods=['POST'])
+def get_equivalencies_batch():
+    data = request.get_json(silent=True) or {}
+    queries = data.get('queries')
+    if not isinstance(queries, list) or not queries:
+        return jsonify({"error": "Request body must contain a non-empty 'queries' list"}), 400
+    if len(queries) > MAX_BATCH_QUERIES:
+        return jsonify({"error": f"At most {MAX_BATCH_QUERIES} queries are allowed per batch"}), 400
+
+    normalized = []
+    for index, query in enumerate(queries):
+        query_error = _batch_query_error(query)
+        if query_error:
+            return jsonify({"error": f"Invalid query at index {index}: {query_error}", "index": index}), 400
+        normalized.append({
+            "receiving_id": query['receivingId'],
+            "course": query['course'],
+            "sending_ids": query.get('sendingIds'),
+            "year_id": query.get('academicYearId')
+        })
+
+    try:
+        return jsonify({"results": find_equivalencies(get_read_db(), normalized)}), 200
+    except ValueError:
+        return jsonify({"error": "Invalid ID format. IDs must be integers."}), 400
+    except Exception as e:
+        logger.exception("Error processing equivalency batch of %s queries: %s", len(queries), e)
+        return jsonify({"error": "Failed to look up course equivalencies"}), 500
@@ -1,9 +1,11 @@
-import traceback
+import logging
 from flask import Blueprint, jsonify, request, current_app
 from ..pdf_service import PdfService
 from ..utils import verify_google_token
 from ..assist_api_client import assist_client 
 
+logger = logging.getLogger(__name__)
+
 igetc_bp = Blueprint('igetc_bp', __name__)
 
 pdf_service = PdfService(assist_client) 
@@ -26,8 +28,7 @@ def get_igetc_agreement():
     except ValueError as auth_err:
         return jsonify({"error": str(auth_err)}), 401
     except Exception as e:
-        print(f"Error during IGETC auth check: {e}")
-        traceback.print_exc()
+        logger.exception("Error during IGETC auth check: %s", e)
         return jsonify({"error": "Authentication failed."}), 500
 
     sending_institution_id = request.args.get('sendingId')
@@ -49,6 +50,5 @@ def get_igetc_agreement():
     except ValueError:
          return jsonify({"error": "Invalid ID format. IDs must be integers."}), 400
     except Exception as e:
-        print(f"Error processing IGETC request for {sending_institution_id} / {academic_year_id}: {e}")
-        traceback.print_exc()
+        logger.exception("Error processing IGETC request for %s / %s: %s", sending_institution_id, academic_year_id, e)
         return jsonify({"error": "Failed to process IGETC agreement request"}), 500
@@ -0,0 +1,71 @@
+from flask import Blueprint, Response
+from ..metrics import registry, snapshot, Counter, Gauge, CONTENT_TYPE
+from ..assist_api_client import assist_client
+from ..prerequisite_search import prerequisite_search
+from ..chat_response_cache import chat_response_cache
+from ..file_cache import file_cache
+from ..pdf_service import pdf_fetches
+from ..database import get_pool_stats
+from ..utils import get_token_cache_stats
+
+metrics_bp = Blueprint('metrics_bp', __name__)
+
+TIERED_CACHES = {
+    "assist": assist_client.response_cache,
+    "prerequisites": prerequisite_search.cache,
+    "chat_responses": chat_response_cache,
+}
+
+
+def collect_cache_metrics():
+    lookups = []
+    ratios = []
+    for cache_name, cache in TIERED_CACHES.items():
+        for namespace, counters in cache.stats()["namespaces"].items():
+            for outcome in ("memory_hits", "backend_hits", "misses", "backend_errors"):
+                lookups.append(((cache_name, namespace, outcome), counters[outcome]))
+            ratios.append(((cache_name, namespace), counters["hit_ratio"]))
+
+    files = file_cache.stats()
+    tokens = get_token_cache_stats()
+    for cache_name, stats in (("gridfs_files", files), ("google_tokens", tokens["tokens"]), ("google_certs", tokens["certs"])):
+        lookups.append(((cache_name, "default", "memory_hits"), stats["hits"]))
+        lookups.append(((cache_name, "default", "misses"), stats["misses"]))
+        total = stats["hits"] + stats["misses"]
+        ratios.append(((cache_name, "default"), stats["hits"] / total if total else 0.0))
+
+    return [
+        snapshot(Counter, "cache_lookups", "Cache lookups by outcome.", ("cache", "namespace", "outcome"), lookups),
+        snapshot(Gauge, "cache_hit_ratio", "Fraction of cache lookups served from cache.", ("cache", "namespace"), ratios),
+        snapshot(Gauge, "gridfs_file_cache_bytes", "Bytes held by the in-memory GridFS file cache.", (), [((), files["bytes"])]),
+    ]
+
+
+def collect_pool_metrics():
+    pool = get_pool_stats()
+    gauges = [(("open_connections",), pool["open_connections"]), (("checked_out",), pool["checked_out"]),
+              (("waiting",), pool["waiting"]), (("max_pool_size",), pool["max_pool_size"] or 0)]
+    return [
+        snapshot(Gauge, "mongo_pool_connections", "MongoDB connection pool state.", ("state",), gauges),
+        snapshot(Counter, "mongo_pool_checkout_failures", "Failed MongoDB connection checkouts.", (), [((), pool["checkout_failures"])]),
+    ]
+
+
+def collect_coalescing_metrics():
+    groups = {"assist": assist_client.in_flight, "pdf_fetches": pdf_fetches, "prerequisites": prerequisite_search.in_flight}
+    calls = []
+    for group, flight in groups.items():
+        stats = flight.stats()
+        calls.append(((group, "executed"), stats["executed"]))
+        calls.append(((group, "coalesced"), stats["coalesced"]))
+    return [snapshot(Counter, "singleflight_calls", "Deduplicated upstream fetches by outcome.", ("group", "outcome"), calls)]
+
+
+registry.add_collector(collect_cache_metrics)
+registry.add_collector(collect_coalescing_metrics)
+registry.add_collector(collect_pool_metrics)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(registry.render(), content_type=CONTENT_TYPE)
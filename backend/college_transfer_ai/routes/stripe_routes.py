@@ -1,5 +1,5 @@
+import logging
 import stripe
-import traceback
 from flask import Blueprint, jsonify, request, current_app
 from bson.objectid import ObjectId
 from datetime import datetime, timezone
@@ -7,6 +7,8 @@ from datetime import datetime, timezone
 from ..utils import verify_google_token, get_or_create_user
 from ..database import get_users_collection 
 
+logger = logging.getLogger(__name__)
+
 stripe_bp = Blueprint('stripe_bp', __name__)
 
 @stripe_bp.route('/create-checkout-session', methods=['POST'])
@@ -38,8 +40,8 @@ def create_checkout_session():
         google_user_id = user_data['google_user_id']
         mongo_user_id = str(user_data['_id']) 
 
-        print(f"Creating checkout session for user: {google_user_id} (Mongo ID: {mongo_user_id})")
-        print(f'Frontend url: {FRONTEND_URL}')
+        logger.info("Creating checkout session for user: %s (Mongo ID: %s)", google_user_id, mongo_user_id)
+        logger.debug("Frontend url: %s", FRONTEND_URL)
 
         checkout_session_params = {
             'line_items': [
@@ -70,19 +72,18 @@ def create_checkout_session():
 
         checkout_session = stripe.checkout.Session.create(**checkout_session_params)
 
-        print(f"Stripe session created: {checkout_session.id}")
+        logger.info("Stripe session created: %s", checkout_session.id)
         return jsonify({'sessionId': checkout_session.id})
 
     except ValueError as auth_err:
-        print(f"[/create-checkout-session] Authentication error: {auth_err}")
+        logger.warning("[/create-checkout-session] Authentication error: %s", auth_err)
         return jsonify({"error": str(auth_err)}), 401
     except stripe.error.StripeError as e:
-        print(f"Stripe error creating checkout session: {e}")
+        logger.error("Stripe error creating checkout session: %s", e)
         user_message = getattr(e, 'user_message', str(e))
         return jsonify({'error': f'Stripe error: {user_message}'}), e.http_status or 500
     except Exception as e:
-        print(f"Error creating checkout session: {e}")
-        traceback.print_exc()
+        logger.exception("Error creating checkout session: %s", e)
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
 @stripe_bp.route('/stripe-webhook', methods=['POST'])
@@ -92,10 +93,10 @@ def stripe_webhook():
     STRIPE_SECRET_KEY = config.get('STRIPE_SECRET_KEY')
 
     if not STRIPE_WEBHOOK_SECRET:
-        print("Webhook Error: STRIPE_WEBHOOK_SECRET not set.")
+        logger.error("Webhook Error: STRIPE_WEBHOOK_SECRET not set.")
         return jsonify({'error': 'Webhook secret not configured'}), 500
     if not STRIPE_SECRET_KEY:
-        print("Webhook Error: STRIPE_SECRET_KEY not set.")
+        logger.error("Webhook Error: STRIPE_SECRET_KEY not set.")
         return jsonify({'error': 'Stripe secret key not configured'}), 500
 
     stripe.api_key = STRIPE_SECRET_KEY
@@ -105,21 +106,21 @@ def stripe_webhook():
     sig_header = request.headers.get('Stripe-Signature')
     event = None
 
-    print("--- Stripe Webhook Received ---")
+    logger.debug("Stripe Webhook Received")
 
     try:
         event = stripe.Webhook.construct_event(
             payload, sig_header, STRIPE_WEBHOOK_SECRET
         )
-        print(f"Webhook Event Type: {event['type']}")
+        logger.debug("Webhook Event Type: %s", event['type'])
     except ValueError as e:
-        print(f"Webhook Error: Invalid payload - {e}")
+        logger.warning("Webhook Error: Invalid payload - %s", e)
         return jsonify({'error': 'Invalid payload'}), 400
     except stripe.error.SignatureVerificationError as e:
-        print(f"Webhook Error: Invalid signature - {e}")
+        logger.warning("Webhook Error: Invalid signature - %s", e)
         return jsonify({'error': 'Invalid signature'}), 400
     except Exception as e:
-        print(f"Webhook Error: Unexpected error constructing event - {e}")
+        logger.error("Webhook Error: Unexpected error constructing event - %s", e)
         return jsonify({'error': 'Webhook construction error'}), 500
 
     try:
@@ -132,12 +133,12 @@ def stripe_webhook():
             stripe_customer_id = session.get('customer')
             stripe_subscription_id = session.get('subscription')
 
-            print(f"Checkout session completed for Mongo User ID: {mongo_user_id}")
-            print(f"  Stripe Customer ID: {stripe_customer_id}")
-            print(f"  Stripe Subscription ID: {stripe_subscription_id}")
+            logger.info("Checkout session completed for Mongo User ID: %s", mongo_user_id)
+            logger.debug("Stripe Customer ID: %s", stripe_customer_id)
+            logger.debug("Stripe Subscription ID: %s", stripe_subscription_id)
 
             if not mongo_user_id or not stripe_customer_id or not stripe_subscription_id:
-                 print("Webhook Error: Missing required data in checkout.session.completed event.")
+                 logger.error("Webhook Error: Missing required data in checkout.session.completed event.")
                  return jsonify({'error': 'Missing data in event'}), 400
 
             try:
@@ -150,12 +151,11 @@ def stripe_webhook():
                     }}
                 )
                 if update_result.matched_count == 0:
-                     print(f"Webhook Error: User not found for Mongo ID: {mongo_user_id} during checkout completion.")
+                     logger.error("Webhook Error: User not found for Mongo ID: %s during checkout completion.", mongo_user_id)
                 else:
-                     print(f"User {mongo_user_id} linked with Stripe IDs (status: processing).")
+                     logger.info("User %s linked with Stripe IDs (status: processing).", mongo_user_id)
             except Exception as e:
-                 print(f"Webhook Error: DB error linking Stripe IDs for user {mongo_user_id}: {e}")
-                 traceback.print_exc()
+                 logger.exception("Webhook Error: DB error linking Stripe IDs for user %s: %s", mongo_user_id, e)
                  return jsonify({'error': 'Internal server error linking user'}), 500
 
         elif event_type in ['customer.subscription.deleted', 'customer.subscription.updated']:
@@ -164,14 +164,14 @@ def stripe_webhook():
             subscription_status = subscription.status
             cancel_at_period_end = subscription.cancel_at_period_end
 
-            print(f"Subscription update/deleted event for Sub ID: {stripe_subscription_id}")
-            print(f"  Status: {subscription_status}, Cancel at Period End: {cancel_at_period_end}")
+            logger.info("Subscription update/deleted event for Sub ID: %s", stripe_subscription_id)
+            logger.info("Status: %s, Cancel at Period End: %s", subscription_status, cancel_at_period_end)
 
             update_data = {
                 "subscription_status": subscription_status,
             }
             if subscription_status == 'canceled' or cancel_at_period_end:
-                print(f"Downgrading user associated with subscription {stripe_subscription_id}")
+                logger.info("Downgrading user associated with subscription %s", stripe_subscription_id)
                 update_data["tier"] = "free"
                 update_data["subscription_expires"] = None
                 if subscription_status != 'canceled': 
@@ -187,23 +187,21 @@ def stripe_webhook():
                 {"$set": update_data}
             )
             if update_result.matched_count == 0:
-                 print(f"Webhook Warning: No user found for subscription ID {stripe_subscription_id} during update/delete.")
+                 logger.warning("Webhook Warning: No user found for subscription ID %s during update/delete.", stripe_subscription_id)
             else:
-                 print(f"User associated with {stripe_subscription_id} status updated.")
+                 logger.info("User associated with %s status updated.", stripe_subscription_id)
 
 
         elif event_type == 'invoice.payment_succeeded':
-            print("Invoice payment succeeded event received.")
+            logger.info("Invoice payment succeeded event received.")
             invoice = event_data
             stripe_customer_id = invoice.get('customer')
             billing_reason = invoice.billing_reason
 
-            print("Invoice details:")
-            print(f"  Customer ID (from invoice): {stripe_customer_id}")
-            print(f"  Billing Reason: {billing_reason}")
+            logger.debug("Invoice details: customer %s, billing reason %s", stripe_customer_id, billing_reason)
 
             if stripe_customer_id:
-                print(f"Attempting to find user by Stripe Customer ID: {stripe_customer_id}")
+                logger.debug("Attempting to find user by Stripe Customer ID: %s", stripe_customer_id)
                 try:
                     user_doc = users_collection.find_one({"stripe_customer_id": stripe_customer_id})
 
@@ -211,11 +209,11 @@ def stripe_webhook():
                         stripe_subscription_id = user_doc.get('stripe_subscription_id')
 
                         if stripe_subscription_id:
-                            print(f"  User found (Mongo ID: {user_doc['_id']}) with linked Sub ID: {stripe_subscription_id}.")
+                            logger.info("User found (Mongo ID: %s) with linked Sub ID: %s.", user_doc['_id'], stripe_subscription_id)
                             try:
-                                print(f"    Retrieving subscription details for {stripe_subscription_id}...")
+                                logger.debug("Retrieving subscription details for %s...", stripe_subscription_id)
                                 subscription = stripe.Subscription.retrieve(stripe_subscription_id)
-                                print(f"    Retrieved subscription object: {subscription}") 
+                                logger.debug("Retrieved subscription %s (status: %s)", subscription.get('id'), subscription.get('status'))
 
                                 subscription_expires_ts = None
                                 subscription_status = subscription.get('status', 'unknown') 
@@ -225,12 +223,12 @@ def stripe_webhook():
                                     subscription_expires_ts = first_item.get('current_period_end')
 
                                 if subscription_expires_ts is None:
-                                     print(f"    Webhook Warning: 'current_period_end' not found on first subscription item for {stripe_subscription_id}. Cannot set expiration.")
+                                     logger.warning("Webhook Warning: 'current_period_end' not found on first subscription item for %s. Cannot set expiration.", stripe_subscription_id)
                                      subscription_expires_dt = None 
                                 else:
                                      subscription_expires_dt = datetime.fromtimestamp(subscription_expires_ts, tz=timezone.utc)
 
-                                print(f"    Subscription Status: {subscription_status}, Expires TS: {subscription_expires_ts}")
+                                logger.info("Subscription Status: %s, Expires TS: %s", subscription_status, subscription_expires_ts)
 
 
 
@@ -241,7 +239,7 @@ def stripe_webhook():
                                 }
 
                                 if billing_reason in ['subscription_create', 'subscription_cycle']:
-                                    print(f"  Subscription payment ({billing_reason}). Resetting usage.")
+                                    logger.info("Subscription payment (%s). Resetting usage.", billing_reason)
                                     update_data["requests_used_this_period"] = 0
                                     update_data["period_start_date"] = datetime.now(timezone.utc)
 
@@ -250,38 +248,36 @@ def stripe_webhook():
                                     {"$set": update_data}
                                 )
                                 if update_result.matched_count > 0:
-                                    print(f"  Successfully updated subscription details/tier for user associated with {stripe_subscription_id}.")
+                                    logger.info("Successfully updated subscription details/tier for user associated with %s.", stripe_subscription_id)
                                 else:
-                                    print(f"Webhook Warning: User update failed for subscription {stripe_subscription_id} during {billing_reason} update, even after finding user.")
+                                    logger.warning("Webhook Warning: User update failed for subscription %s during %s update, even after finding user.", stripe_subscription_id, billing_reason)
                                     return jsonify({'error': 'Internal server error updating user'}), 500
 
                             except stripe.error.StripeError as sub_err:
-                                print(f"Webhook Error: Failed to retrieve Stripe subscription {stripe_subscription_id} during {billing_reason}: {sub_err}")
+                                logger.error("Webhook Error: Failed to retrieve Stripe subscription %s during %s: %s", stripe_subscription_id, billing_reason, sub_err)
                                 return jsonify({'error': 'Stripe API error retrieving subscription'}), 500
                             except Exception as e:
-                                print(f"Webhook Error: Unexpected error updating user after {billing_reason} for sub {stripe_subscription_id}: {e}")
-                                traceback.print_exc()
+                                logger.exception("Webhook Error: Unexpected error updating user after %s for sub %s: %s", billing_reason, stripe_subscription_id, e)
                                 return jsonify({'error': 'Internal server error processing subscription'}), 500
                         else:
-                            print(f"Webhook Info: User found for customer {stripe_customer_id}, but stripe_subscription_id not linked yet. Requesting retry.")
+                            logger.info("Webhook Info: User found for customer %s, but stripe_subscription_id not linked yet. Requesting retry.", stripe_customer_id)
                             return jsonify({'error': 'Subscription data not ready, please retry'}), 503
                     else:
-                        print(f"Webhook Info: No user found in DB for Stripe Customer ID: {stripe_customer_id}. Checkout session likely not processed yet. Requesting retry.")
+                        logger.info("Webhook Info: No user found in DB for Stripe Customer ID: %s. Checkout session likely not processed yet. Requesting retry.", stripe_customer_id)
                         return jsonify({'error': 'User data not ready, please retry'}), 503
 
                 except Exception as db_err:
-                    print(f"Webhook Error: Database error finding user by customer ID {stripe_customer_id}: {db_err}")
-                    traceback.print_exc()
+                    logger.exception("Webhook Error: Database error finding user by customer ID %s: %s", stripe_customer_id, db_err)
                     return jsonify({'error': 'Internal server error finding user'}), 500
             else:
-                print(f"Webhook Error: Skipping invoice.payment_succeeded because 'customer' ID was missing from the invoice object.")
+                logger.error("Webhook Error: Skipping invoice.payment_succeeded because 'customer' ID was missing from the invoice object.")
                 return jsonify({'error': 'Missing customer ID in invoice event'}), 400
 
         elif event_type == 'invoice.payment_failed':
             invoice = event_data
             stripe_subscription_id = invoice.get('subscription')
             if stripe_subscription_id:
-                print(f"Invoice payment failed for subscription {stripe_subscription_id}.")
+                logger.warning("Invoice payment failed for subscription %s.", stripe_subscription_id)
                 try:
                     subscription = stripe.Subscription.retrieve(stripe_subscription_id)
                     subscription_status = subscription.status
@@ -290,25 +286,23 @@ def stripe_webhook():
                         {"$set": {"subscription_status": subscription_status}} 
                     )
                     if update_result.matched_count > 0:
-                        print(f"Updated subscription status to '{subscription_status}' for user associated with {stripe_subscription_id}.")
+                        logger.info("Updated subscription status to '%s' for user associated with %s.", subscription_status, stripe_subscription_id)
                     else:
-                        print(f"Webhook Warning: User not found for subscription {stripe_subscription_id} during payment failure update.")
+                        logger.warning("Webhook Warning: User not found for subscription %s during payment failure update.", stripe_subscription_id)
                 except stripe.error.StripeError as sub_err:
-                     print(f"Webhook Error: Failed to retrieve subscription {stripe_subscription_id} after payment failure: {sub_err}")
+                     logger.error("Webhook Error: Failed to retrieve subscription %s after payment failure: %s", stripe_subscription_id, sub_err)
                 except Exception as e:
-                     print(f"Webhook Error: Unexpected error updating user after payment failure: {e}")
-                     traceback.print_exc()
+                     logger.exception("Webhook Error: Unexpected error updating user after payment failure: %s", e)
 
         else:
             pass 
 
     except KeyError as e:
-        print(f"Webhook Error: Missing expected key in event data - {e}")
+        logger.error("Webhook Error: Missing expected key in event data - %s", e)
         return jsonify({'error': f'Missing key in event data: {e}'}), 400
     except Exception as e:
-        print(f"Webhook Error: Error handling event {event.get('type', 'N/A')} - {e}")
-        traceback.print_exc()
+        logger.exception("Webhook Error: Error handling event %s - %s", event.get('type', 'N/A'), e)
         return jsonify({'error': 'Internal server error handling webhook'}), 500
 
-    print("Webhook processing complete, acknowledging event.")
+    logger.debug("Webhook processing complete, acknowledging event.")
     return jsonify({'success': True}), 200
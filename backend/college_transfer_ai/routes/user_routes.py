@@ -1,14 +1,14 @@
+import logging
 from flask import Blueprint, jsonify, request, current_app
-from datetime import datetime, timedelta, time, timezone
-import traceback
 
-from ..utils import verify_google_token, get_or_create_user, FREE_TIER_LIMIT, PREMIUM_TIER_LIMIT
+from ..utils import verify_google_token, get_or_create_user, get_usage_status, format_usage_status
+
+logger = logging.getLogger(__name__)
 
 user_bp = Blueprint('user_bp', __name__)
 
 @user_bp.route('/user-status', methods=['GET'])
 def get_user_status():
-    print("--- !!! GET /api/user-status endpoint hit !!! ---") 
     config = current_app.config['APP_CONFIG']
     GOOGLE_CLIENT_ID = config.get('GOOGLE_CLIENT_ID')
     if not GOOGLE_CLIENT_ID:
@@ -23,43 +23,15 @@ def get_user_status():
         user_info = verify_google_token(token, GOOGLE_CLIENT_ID)
         user_data = get_or_create_user(user_info)
 
-        tier = user_data.get('tier', 'free')
-        limit = PREMIUM_TIER_LIMIT if tier == 'premium' else FREE_TIER_LIMIT
-        requests_used = user_data.get('requests_used_this_period', 0)
-        period_start = user_data.get('period_start_date')
-
-        now = datetime.now(timezone.utc) 
-        reset_time_iso = None
-
-        try:
-            tomorrow = now.date() + timedelta(days=1)
-            tomorrow_midnight_utc = datetime.combine(tomorrow, time(0, 0), tzinfo=timezone.utc)
-            reset_time_iso = tomorrow_midnight_utc.isoformat(timespec='seconds') 
-        except Exception as time_err:
-            print(f"Error calculating reset time: {time_err}")
-            reset_time_iso = "Error calculating reset time"
-
-
-        display_requests_used = requests_used
-        if period_start and isinstance(period_start, datetime):
-             if period_start.tzinfo is None:
-                 period_start = period_start.replace(tzinfo=timezone.utc)
-             if period_start.date() < now.date():
-                 display_requests_used = 0 
+        usage_status = format_usage_status(get_usage_status(user_data))
 
-        print(f"User status requested for {user_data.get('google_user_id')}: Used={display_requests_used}, Limit={limit}, Tier={tier}, Resets={reset_time_iso}")
+        logger.debug("User status requested for %s: Used=%s, Limit=%s, Tier=%s, Resets=%s", user_data.get('google_user_id'), usage_status['usageCount'], usage_status['usageLimit'], usage_status['tier'], usage_status['resetTime'], extra={"sample_rate": 100})
 
-        return jsonify({
-            "tier": tier,
-            "usageCount": display_requests_used,
-            "usageLimit": limit,
-            "resetTime": reset_time_iso 
-        }), 200
+        return jsonify(usage_status), 200
 
     except ValueError as auth_err:
-        print(f"[/user-status] Authentication error: {auth_err}")
+        logger.warning("[/user-status] Authentication error: %s", auth_err)
         return jsonify({"error": str(auth_err)}), 401
     except Exception as e:
-        print(f"Error getting user status: {e}")
-        traceback.print_exc()
+        logger.exception("Error getting user status: %s", e)
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
\ No newline at end of file
@@ -0,0 +1,122 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from google.auth.transport import requests as google_requests
+
+GOOGLE_CERTS_URLS = (
+    "https://www.googleapis.com/oauth2/v1/certs",
+    "https://www.googleapis.com/oauth2/v3/certs",
+)
+DEFAULT_CERTS_MAX_AGE = 3600
+
+
+class VerifiedTokenCache:
+    def __init__(self, max_entries=1024, clock_skew=10):
+        self.max_entries = max_entries
+        self.clock_skew = clock_skew
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(token, client_id):
+        return hashlib.sha256(f"{client_id}:{token}".encode("utf-8")).hexdigest()
+
+    def get(self, token, client_id):
+        key = self._key(token, client_id)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, idinfo = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(idinfo)
+
+    def put(self, token, client_id, idinfo):
+        try:
+            expires_at = float(idinfo.get("exp")) - self.clock_skew
+        except (TypeError, ValueError):
+            return
+        if expires_at <= time.time():
+            return
+
+        key = self._key(token, client_id)
+        with self._lock:
+            self._entries[key] = (expires_at, dict(idinfo))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+            }
+
+
+class CachingCertsRequest:
+    def __init__(self, session=None, certs_urls=GOOGLE_CERTS_URLS):
+        self.session = session or requests.Session()
+        self._transport = google_requests.Request(session=self.session)
+        self.certs_urls = set(certs_urls)
+        self._certs = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _max_age(headers):
+        cache_control = headers.get("cache-control") or headers.get("Cache-Control") or ""
+        for directive in cache_control.split(","):
+            name, _, value = directive.strip().partition("=")
+            if name.lower() == "max-age":
+                try:
+                    return int(value)
+                except ValueError:
+                    break
+        return DEFAULT_CERTS_MAX_AGE
+
+    def __call__(self, url, method="GET", body=None, headers=None, timeout=None, **kwargs):
+        if method != "GET" or url not in self.certs_urls:
+            return self._transport(url, method=method, body=body, headers=headers, timeout=timeout, **kwargs)
+
+        now = time.time()
+        with self._lock:
+            cached = self._certs.get(url)
+            if cached and cached[0] > now:
+                self.hits += 1
+                return cached[1]
+
+        response = self._transport(url, method=method, body=body, headers=headers, timeout=timeout, **kwargs)
+        with self._lock:
+            self.misses += 1
+            if response.status == 200:
+                self._certs[url] = (now + self._max_age(response.headers), response)
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "cached_urls": len(self._certs)}
@@ -1,29 +1,65 @@
+import logging
 import os
-import traceback
 from datetime import datetime, timedelta, time, timezone
 from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
 from bson.objectid import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from .database import get_users_collection
+from .token_cache import VerifiedTokenCache, CachingCertsRequest
+
+logger = logging.getLogger(__name__)
 
 FREE_TIER_LIMIT = 10
 PREMIUM_TIER_LIMIT = 100
 
+token_cache = VerifiedTokenCache(max_entries=int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "1024")))
+google_certs_request = CachingCertsRequest()
+
 def verify_google_token(token, client_id):
+    cached_idinfo = token_cache.get(token, client_id)
+    if cached_idinfo is not None:
+        return cached_idinfo
+
     try:
-        idinfo = id_token.verify_oauth2_token(token, google_requests.Request(), client_id)
+        idinfo = id_token.verify_oauth2_token(token, google_certs_request, client_id)
         if idinfo['iss'] not in ['accounts.google.com', 'https://accounts.google.com']:
             raise ValueError('Wrong issuer.')
+        token_cache.put(token, client_id, idinfo)
         return idinfo
     except ValueError as ve:
-        print(f"Google token verification failed: {ve}")
-        traceback.print_exc()
+        logger.warning("Google token verification failed: %s", ve)
         raise ValueError(f"Invalid token: {ve}")
     except Exception as e:
-        print(f"An unexpected error occurred during Google token verification: {e}")
-        traceback.print_exc()
+        logger.exception("An unexpected error occurred during Google token verification: %s", e)
         raise Exception(f"Token verification failed due to an unexpected error: {e}")
 
+def get_token_cache_stats():
+    return {
+        "tokens": token_cache.stats(),
+        "certs": google_certs_request.stats()
+    }
+
+USER_DEFAULT_FIELDS = {
+    'tier': 'free',
+    'requests_used_this_period': 0,
+    'stripe_customer_id': None,
+    'stripe_subscription_id': None,
+    'subscription_status': None,
+    'subscription_expires': None
+}
+
+def _build_user_upsert_pipeline(idinfo, now):
+    backfill = {field: {'$ifNull': [f'${field}', {'$literal': default}]} for field, default in USER_DEFAULT_FIELDS.items()}
+    backfill.update({
+        'email': {'$ifNull': ['$email', {'$literal': idinfo.get('email')}]},
+        'name': {'$ifNull': ['$name', {'$literal': idinfo.get('name')}]},
+        'period_start_date': {'$ifNull': ['$period_start_date', now]},
+        'created_at': {'$ifNull': ['$created_at', now]},
+        'last_login': now
+    })
+    return [{'$set': backfill}]
+
 def get_or_create_user(idinfo):
     users_collection = get_users_collection()
 
@@ -31,111 +67,108 @@ def get_or_create_user(idinfo):
     if not google_user_id:
         raise ValueError("Missing 'sub' (user ID) in token info.")
 
-    user = users_collection.find_one({'google_user_id': google_user_id})
+    try:
+        user = users_collection.find_one_and_update(
+            {'google_user_id': google_user_id},
+            _build_user_upsert_pipeline(idinfo, datetime.now(timezone.utc)),
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # Two first logins raced on the upsert. Only raised because of the unique
+        # google_user_id index in indexes.REQUIRED_INDEXES; without it both inserts succeed.
+        user = users_collection.find_one_and_update(
+            {'google_user_id': google_user_id},
+            _build_user_upsert_pipeline(idinfo, datetime.now(timezone.utc)),
+            return_document=ReturnDocument.AFTER
+        )
+    except Exception as e:
+        raise Exception(f"Database error creating user: {e}")
 
     if not user:
-        new_user_data = {
-            'google_user_id': google_user_id,
-            'email': idinfo.get('email'),
-            'name': idinfo.get('name'),
-            'tier': 'free',
-            'requests_used_this_period': 0,
-            'period_start_date': datetime.now(timezone.utc),
-            'created_at': datetime.now(timezone.utc),
-            'last_login': datetime.now(timezone.utc),
-            "stripe_customer_id": None,
-            "stripe_subscription_id": None,
-            "subscription_status": None,
-            "subscription_expires": None
-        }
-        try:
-            insert_result = users_collection.insert_one(new_user_data)
-            user = users_collection.find_one({'_id': insert_result.inserted_id})
-            if not user:
-                raise Exception(f"Failed to retrieve newly created user {google_user_id}")
-        except Exception as e:
-            raise Exception(f"Database error creating user: {e}")
-    else:
-        update_query = {'last_login': datetime.now(timezone.utc)}
-        set_fields = {}
-        if 'tier' not in user: set_fields['tier'] = 'free'
-        if 'requests_used_this_period' not in user: set_fields['requests_used_this_period'] = 0
-        if 'period_start_date' not in user: set_fields['period_start_date'] = datetime.now(timezone.utc)
-        if 'stripe_customer_id' not in user: set_fields['stripe_customer_id'] = None
-        if 'stripe_subscription_id' not in user: set_fields['stripe_subscription_id'] = None
-        if 'subscription_status' not in user: set_fields['subscription_status'] = None
-        if 'subscription_expires' not in user: set_fields['subscription_expires'] = None
-
-        if set_fields:
-            update_query.update(set_fields)
-            users_collection.update_one(
-                {'google_user_id': google_user_id},
-                {'$set': update_query}
-            )
-            user = users_collection.find_one({"google_user_id": google_user_id})
-        else:
-            users_collection.update_one(
-                {'google_user_id': google_user_id},
-                {'$set': {'last_login': update_query['last_login']}}
-            )
-
+        raise Exception(f"Failed to retrieve or create user {google_user_id}")
     return user
 
-def check_and_update_usage(user_data):
-    users_collection = get_users_collection()
+def get_usage_limit(tier):
+    return PREMIUM_TIER_LIMIT if tier == 'premium' else FREE_TIER_LIMIT
+
+def _usage_day_start(now):
+    return datetime.combine(now.date(), time(0, 0), tzinfo=timezone.utc)
+
+def _build_usage_status(tier, requests_used, now, allowed=True):
+    limit = get_usage_limit(tier)
+    return {
+        'allowed': allowed,
+        'tier': tier,
+        'requests_used': requests_used,
+        'limit': limit,
+        'remaining': max(limit - requests_used, 0),
+        'reset_time': _usage_day_start(now) + timedelta(days=1)
+    }
 
+def get_usage_status(user_data):
+    now = datetime.now(timezone.utc)
     tier = user_data.get('tier', 'free')
-    limit = PREMIUM_TIER_LIMIT if tier == 'premium' else FREE_TIER_LIMIT
     requests_used = user_data.get('requests_used_this_period', 0)
     period_start = user_data.get('period_start_date')
-    google_user_id = user_data.get('google_user_id')
 
-    now = datetime.now(timezone.utc)
-    reset_usage = False
-
-    if period_start and isinstance(period_start, datetime):
+    if not isinstance(period_start, datetime):
+        requests_used = 0
+    else:
         if period_start.tzinfo is None:
             period_start = period_start.replace(tzinfo=timezone.utc)
-
         if period_start.date() < now.date():
             requests_used = 0
-            period_start = now
-            reset_usage = True
-    else:
-        requests_used = 0
-        period_start = now
-        reset_usage = True
 
-    if requests_used >= limit:
-        return False
+    return _build_usage_status(tier, requests_used, now)
 
-    try:
-        if reset_usage:
-            update_fields = {
-                '$set': {
-                    'requests_used_this_period': 1,
-                    'period_start_date': period_start,
-                    'last_request_timestamp': now
-                }
-            }
-        else:
-            update_fields = {
-                '$inc': {'requests_used_this_period': 1},
-                '$set': {'last_request_timestamp': now}
-            }
+def format_usage_status(status):
+    return {
+        "tier": status['tier'],
+        "usageCount": status['requests_used'],
+        "usageLimit": status['limit'],
+        "usageRemaining": status['remaining'],
+        "resetTime": status['reset_time'].isoformat(timespec='seconds')
+    }
 
-        result = users_collection.update_one(
-            {'google_user_id': google_user_id},
-            update_fields
-        )
-        if result.matched_count == 0:
-            raise Exception(f"User {google_user_id} not found during usage update.")
+def check_and_update_usage(user_data):
+    users_collection = get_users_collection()
+
+    google_user_id = user_data.get('google_user_id')
+    now = datetime.now(timezone.utc)
 
-        return True
+    period_start = {'$ifNull': ['$period_start_date', datetime.fromtimestamp(0, timezone.utc)]}
+    window_expired = {'$lt': [period_start, _usage_day_start(now)]}
+    requests_used = {'$ifNull': ['$requests_used_this_period', 0]}
+    limit = {'$cond': [{'$eq': ['$tier', 'premium']}, PREMIUM_TIER_LIMIT, FREE_TIER_LIMIT]}
+
+    try:
+        updated_user = users_collection.find_one_and_update(
+            {
+                'google_user_id': google_user_id,
+                '$expr': {'$or': [window_expired, {'$lt': [requests_used, limit]}]}
+            },
+            [{'$set': {
+                'requests_used_this_period': {'$cond': [window_expired, 1, {'$add': [requests_used, 1]}]},
+                'period_start_date': {'$cond': [window_expired, now, '$period_start_date']},
+                'last_request_timestamp': now
+            }}],
+            projection={'tier': 1, 'requests_used_this_period': 1},
+            return_document=ReturnDocument.AFTER
+        )
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Failed to update usage count for user %s", google_user_id)
         raise Exception(f"Failed to update usage count: {e}")
 
+    if updated_user is None:
+        status = get_usage_status(user_data)
+        status['allowed'] = False
+        status['requests_used'] = max(status['requests_used'], status['limit'])
+        status['remaining'] = 0
+        return status
+
+    return _build_usage_status(updated_user.get('tier', 'free'), updated_user.get('requests_used_this_period', 0), now)
+
 def calculate_intersection(results):
     if not results or any(res is None for res in results):
         return {}
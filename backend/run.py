@@ -33,8 +33,9 @@ if __name__ == '__main__':
         else:
             try:
                 from waitress import serve
-                print("Running in production mode using waitress...")
-                serve(app, host=host, port=port)
+                threads = int(os.environ.get('WAITRESS_THREADS', 8))
+                print(f"Running in production mode using waitress ({threads} threads)...")
+                serve(app, host=host, port=port, threads=threads)
             except ImportError:
                 print("Waitress not found. Running with Flask's built-in server (NOT recommended for production).")
                 app.run(debug=False, host=host, port=port)
@@ -0,0 +1,60 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import fitz
+import gridfs
+import mongomock
+import pytest
+from mongomock.gridfs import enable_gridfs_integration
+
+enable_gridfs_integration()
+
+
+def _make_pdf(*page_texts):
+    doc = fitz.open()
+    for text in page_texts:
+        doc.new_page().insert_text((72, 72), text)
+    pdf_bytes = doc.tobytes()
+    doc.close()
+    return pdf_bytes
+
+
+class StubAssistClient:
+    def __init__(self):
+        self.reports = []
+        self.contents = {}
+        self.listing_calls = 0
+        self.downloads = []
+
+    def get_agreements(self, receiving_id, sending_id, year_id, category_code=None, refresh=False):
+        self.listing_calls += 1
+        return {"reports": self.reports}
+
+    def get_agreement_details(self, agreement_key, refresh=False):
+        self.downloads.append(agreement_key)
+        return self.contents.get(agreement_key) or _make_pdf(agreement_key)
+
+
+@pytest.fixture
+def make_pdf():
+    return _make_pdf
+
+@pytest.fixture
+def mongo_db():
+    return mongomock.MongoClient().test_db
+
+@pytest.fixture
+def fs(mongo_db):
+    return gridfs.GridFS(mongo_db)
+
+@pytest.fixture
+def pdf_storage(monkeypatch, mongo_db, fs):
+    from college_transfer_ai import pdf_service as pdf_service_module
+    monkeypatch.setattr(pdf_service_module, 'get_db', lambda: mongo_db)
+    monkeypatch.setattr(pdf_service_module, 'get_gridfs', lambda: fs)
+    return mongo_db, fs
+
+@pytest.fixture
+def assist_stub():
+    return StubAssistClient()
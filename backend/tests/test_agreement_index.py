@@ -0,0 +1,70 @@
+import fitz
+import mongomock
+from college_transfer_ai.agreement_index import (
+    COURSES_COLLECTION,
+    extract_agreement_structure,
+    format_agreement_context,
+    index_agreement_pdf,
+    parse_pdf_filename,
+    pdf_filename_for_image,
+)
+
+
+def make_agreement_pdf():
+    doc = fitz.open()
+    page = doc.new_page()
+    y = 60
+    page.insert_text((40, y), "LOWER DIVISION MAJOR REQUIREMENTS - COMPLETE ALL COURSES LISTED BELOW FOR THE MAJOR", fontsize=10)
+    y += 24
+    page.insert_text((40, y), "COM SCI 31 - Introduction to Computer Science I (4.00)", fontsize=9)
+    page.insert_text((330, y), "CIS 22A - Beginning Programming (4.50)", fontsize=9)
+    y += 20
+    page.insert_text((40, y), "MATH 31A - Differential Calculus (4.00)", fontsize=9)
+    page.insert_text((330, y), "MATH 1A - Calculus (5.00)", fontsize=9)
+    y += 14
+    page.insert_text((330, y), "AND", fontsize=9)
+    y += 14
+    page.insert_text((330, y), "MATH 1B - Calculus (5.00)", fontsize=9)
+    y += 20
+    page.insert_text((40, y), "COM SCI 35L - Software Construction (4.00)", fontsize=9)
+    page.insert_text((330, y), "No Course Articulated", fontsize=9)
+    pdf_bytes = doc.tobytes()
+    doc.close()
+    return pdf_bytes
+
+
+def test_extract_agreement_structure_parses_rows():
+    structure = extract_agreement_structure(make_agreement_pdf())
+    rows = structure["rows"]
+
+    assert len(structure["pages"]) == 1
+    assert [row["receiving_course"]["code"] for row in rows] == ["COM SCI 31", "MATH 31A", "COM SCI 35L"]
+    assert rows[0]["sending_courses"][0] == {"code": "CIS 22A", "title": "Beginning Programming", "units": 4.5}
+    assert [course["code"] for course in rows[1]["sending_courses"]] == ["MATH 1A", "MATH 1B"]
+    assert rows[1]["conjunction"] == "AND"
+    assert rows[2]["articulated"] is False
+    assert rows[0]["requirement_group"].startswith("LOWER DIVISION MAJOR REQUIREMENTS")
+
+
+def test_index_agreement_pdf_stores_rows_and_replaces_on_reindex():
+    db = mongomock.MongoClient().db
+    filename = "agreement_75_113_117_Major-ABC.pdf"
+
+    assert index_agreement_pdf(db, filename, make_agreement_pdf(), {"major_key": "Major/ABC"}) == 3
+    assert index_agreement_pdf(db, filename, make_agreement_pdf()) == 3
+
+    row = db[COURSES_COLLECTION].find_one({"receiving_course.code": "COM SCI 31"})
+    assert db[COURSES_COLLECTION].count_documents({"pdf_filename": filename}) == 3
+    assert (row["year_id"], row["sending_id"], row["receiving_id"]) == (75, 113, 117)
+
+    context = format_agreement_context(db, filename)
+    assert "MATH 31A (Differential Calculus) <- MATH 1A AND MATH 1B" in context
+    assert "COM SCI 35L (Software Construction) <- No Course Articulated" in context
+
+
+def test_filename_helpers():
+    assert parse_pdf_filename("igetc_75_113.pdf") == {"kind": "igetc", "year_id": 75, "sending_id": 113}
+    assert parse_pdf_filename("agreement_75_113_117_Major_With_Underscores.pdf")["receiving_id"] == 117
+    assert parse_pdf_filename("unrelated.pdf") == {}
+    assert pdf_filename_for_image("igetc_75_113.pdf_screen_page_0.webp") == "igetc_75_113.pdf"
+    assert pdf_filename_for_image("upload.png") is None
@@ -0,0 +1,122 @@
+import time
+import gridfs
+import mongomock
+import pytest
+from flask import Flask
+from college_transfer_ai.file_cache import GridFSFileCache
+from college_transfer_ai.rasterizer import RenderJob
+from college_transfer_ai.routes import agreement_pdf_routes
+
+@pytest.fixture
+def fs(fs, monkeypatch):
+    monkeypatch.setattr(agreement_pdf_routes, 'get_gridfs', lambda: fs)
+    monkeypatch.setattr(agreement_pdf_routes, 'get_read_gridfs', lambda: fs)
+    return fs
+
+@pytest.fixture
+def client(fs):
+    app = Flask(__name__)
+    app.register_blueprint(agreement_pdf_routes.agreement_pdf_bp, url_prefix='/api')
+    return app.test_client()
+
+@pytest.fixture
+def render_job(monkeypatch):
+    job = RenderJob("agreement.pdf")
+    monkeypatch.setattr(agreement_pdf_routes.rasterizer, 'get_job', lambda job_id: job if job_id == job.id else None)
+    return job
+
+def test_render_job_rejects_non_numeric_wait(client, render_job):
+    response = client.get(f'/api/render-jobs/{render_job.id}?wait=abc')
+    assert response.status_code == 400
+
+def test_render_job_reports_progress(client, render_job):
+    render_job.add_page(0, "agreement.pdf_screen_page_0.webp")
+    response = client.get(f'/api/render-jobs/{render_job.id}?wait=0')
+    assert response.status_code == 202
+    assert response.get_json()["pages_ready"] == 1
+
+@pytest.fixture
+def image(fs, monkeypatch):
+    monkeypatch.setattr(agreement_pdf_routes, 'file_cache', GridFSFileCache(max_bytes=0))
+    fs.put(bytes(range(200)), filename="agreement.pdf_screen_page_0.webp", contentType="image/webp")
+    return fs.find_one({"filename": "agreement.pdf_screen_page_0.webp"})
+
+def test_image_is_served_with_validators(client, image):
+    response = client.get('/api/image/agreement.pdf_screen_page_0.webp')
+    assert response.status_code == 200
+    assert response.data == bytes(range(200))
+    assert response.headers['Content-Type'] == 'image/webp'
+    assert response.headers['ETag']
+    assert 'must-revalidate' in response.headers['Cache-Control']
+
+def test_matching_etag_returns_304(client, image):
+    etag = client.get('/api/image/agreement.pdf_screen_page_0.webp').headers['ETag']
+    response = client.get('/api/image/agreement.pdf_screen_page_0.webp', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert client.get('/api/image/agreement.pdf_screen_page_0.webp', headers={'If-None-Match': '"stale"'}).status_code == 200
+
+@pytest.mark.parametrize("cache_bytes", [0, 1024])
+def test_range_request_returns_206(client, image, monkeypatch, cache_bytes):
+    cache = GridFSFileCache(max_bytes=cache_bytes)
+    if cache_bytes:
+        cache.put(image, image.read())
+    monkeypatch.setattr(agreement_pdf_routes, 'file_cache', cache)
+
+    response = client.get('/api/image/agreement.pdf_screen_page_0.webp', headers={'Range': 'bytes=10-19'})
+    assert response.status_code == 206
+    assert response.data == bytes(range(10, 20))
+    assert response.headers['Content-Range'] == 'bytes 10-19/200'
+    assert response.headers['Content-Length'] == '10'
+
+def test_unsatisfiable_range_returns_416(client, image):
+    response = client.get('/api/image/agreement.pdf_screen_page_0.webp', headers={'Range': 'bytes=500-600'})
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == 'bytes */200'
+
+def test_missing_image_returns_404(client, fs):
+    assert client.get('/api/image/missing.webp').status_code == 404
+
+def test_full_image_response_fills_cache(client, image, monkeypatch):
+    cache = GridFSFileCache(max_bytes=1024)
+    monkeypatch.setattr(agreement_pdf_routes, 'file_cache', cache)
+
+    client.get('/api/image/agreement.pdf_screen_page_0.webp', headers={'Range': 'bytes=10-19'})
+    assert cache.stats()["entries"] == 0
+
+    assert client.get('/api/image/agreement.pdf_screen_page_0.webp').data == bytes(range(200))
+    assert cache.get(image).data == bytes(range(200))
+
+def test_image_missing_on_read_replica_falls_back_to_primary(client, image, monkeypatch):
+    monkeypatch.setattr(agreement_pdf_routes, 'get_read_gridfs', lambda: gridfs.GridFS(mongomock.MongoClient().replica_db))
+    response = client.get('/api/image/agreement.pdf_screen_page_0.webp')
+    assert response.status_code == 200
+    assert response.data == bytes(range(200))
+
+def test_agreements_keep_request_order_when_one_college_fails(client, monkeypatch):
+    recorded = []
+    def get_agreement(year_id, sending_id, receiving_id, major_key):
+        if sending_id == 113:
+            raise RuntimeError("Assist.org timed out")
+        if sending_id == 110:
+            time.sleep(0.05)
+        return f"agreement_{year_id}_{sending_id}_{receiving_id}.pdf"
+    monkeypatch.setattr(agreement_pdf_routes.assist_client, 'get_institution_name', lambda sending_id: f"College {sending_id}")
+    monkeypatch.setattr(agreement_pdf_routes.pdf_service_instance, 'get_articulation_agreement', get_agreement)
+    monkeypatch.setattr(agreement_pdf_routes.pdf_service_instance, 'bind_storage', lambda: agreement_pdf_routes.pdf_service_instance)
+    monkeypatch.setattr(agreement_pdf_routes, 'record_agreement_request', lambda *args: recorded.append(args))
+
+    response = client.post('/api/articulation-agreements', json={
+        "sending_ids": [110, 113, 120], "receiving_id": 117, "year_id": 75, "major_key": "75/110/to/117/Major/cs"
+    })
+
+    assert response.status_code == 207
+    body = response.get_json()
+    assert [item["sendingId"] for item in body["agreements"]] == [110, 113, 120]
+    assert body["agreements"][1]["pdfFilename"] is None
+    assert "timed out" in body["agreements"][1]["error"]
+    assert body["agreements"][1]["sendingName"] == "ID 113"
+    assert body["agreements"][2]["sendingName"] == "College 120"
+    assert body["agreements"][2]["pdfFilename"] == "agreement_75_120_117.pdf"
+    assert len(body["warnings"]) == 1
+    assert {args[1]: args[3] for args in recorded} == {110: "75/110/to/117/Major/cs", 120: "75/120/to/117/Major/cs"}
@@ -0,0 +1,49 @@
+import pytest
+from college_transfer_ai import pdf_service as pdf_service_module
+from college_transfer_ai.agreement_sync import AgreementSync, SYNC_STATE_COLLECTION
+from college_transfer_ai.rasterizer import Rasterizer
+
+MAJOR_KEY = "75/113/to/117/Major/abc"
+
+@pytest.fixture
+def service(pdf_storage, assist_stub, make_pdf):
+    client = assist_stub
+    client.contents[MAJOR_KEY] = make_pdf("COM SCI 31 - Intro (4.00)")
+    client.reports = [{"key": MAJOR_KEY, "label": "Computer Science"}]
+    service = pdf_service_module.PdfService(client)
+    filename = service._generate_pdf_filename("agreement", 75, 113, 117, MAJOR_KEY)
+    assert service._fetch_and_store_pdf_once(filename, client.get_agreement_details, MAJOR_KEY) == filename
+    service._index_pdf(filename, client.contents[MAJOR_KEY], {"major_key": MAJOR_KEY})
+    return service, client, filename
+
+def test_unchanged_listing_skips_downloads(service):
+    pdf_service, client, filename = service
+    sync = AgreementSync(pdf_service, client)
+
+    first = sync.run(progress=lambda message: None)
+    assert (first["checked"], first["unchanged"], first["downloads"]) == (1, 1, 1)
+
+    client.downloads.clear()
+    second = sync.run(progress=lambda message: None)
+    assert (second["unchanged"], second["downloads"], second["changed"]) == (1, 0, 0)
+    assert client.downloads == []
+
+def test_changed_agreement_replaces_pdf_and_rerenders_images(service, make_pdf):
+    pdf_service, client, filename = service
+    rasterizer = Rasterizer(max_workers=1)
+    job = rasterizer.start(pdf_service.fs, filename, "thumbnail")
+    assert job.wait(timeout=30) and job.status == "complete"
+    old_image_id = pdf_service.fs.find_one({"metadata.original_pdf": filename})._id
+
+    client.contents[MAJOR_KEY] = make_pdf("COM SCI 31 - Intro (5.00)")
+    client.reports = [dict(client.reports[0], publishDate="2025-01-01")]
+    report = AgreementSync(pdf_service, client, rasterizer=rasterizer).run(progress=lambda message: None)
+
+    assert report["changed"] == 1 and report["changed_files"] == [filename]
+    assert report["rerendered"] == 1
+    assert pdf_service.fs.find_one({"filename": filename}).read() == client.contents[MAJOR_KEY]
+    assert len(list(pdf_service.fs.find({"filename": filename}))) == 1
+    images = list(pdf_service.fs.find({"metadata.original_pdf": filename}))
+    assert len(images) == 1 and images[0]._id != old_image_id
+    state = pdf_service.db[SYNC_STATE_COLLECTION].find_one({"_id": filename})
+    assert state["major_key"] == MAJOR_KEY and state["listing_fingerprint"]
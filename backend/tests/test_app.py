@@ -1,36 +1,83 @@
-import sys
 import os
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-
 import pytest
-from college_transfer_ai.app import app
+from benchmarks.fake_upstreams import start_fake_upstreams, stop_fake_upstreams
+from benchmarks.offline_bench import IN_MEMORY_MONGO_URI, bench_environment, install_in_memory_mongo, seed_users
+
+@pytest.fixture(scope='module')
+def offline_app():
+    upstreams = start_fake_upstreams()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        for key, value in bench_environment(upstreams, IN_MEMORY_MONGO_URI).items():
+            monkeypatch.setenv(key, value)
+
+        from college_transfer_ai import create_app, database
+        from college_transfer_ai.assist_api_client import assist_client
+        from college_transfer_ai.prerequisite_search import prerequisite_search
+        monkeypatch.setattr(assist_client, 'base_url', upstreams['assist'].url)
+        monkeypatch.setattr(prerequisite_search, 'url', os.environ['PERPLEXITY_API_URL'])
+        database._reset()
+        install_in_memory_mongo()
+
+        app = create_app()
+        app.config['TESTING'] = True
+        try:
+            yield app, upstreams
+        finally:
+            database._reset()
+            assist_client.response_cache.attach_backend(None)
+            prerequisite_search.cache.attach_backend(None)
+            stop_fake_upstreams(upstreams)
 
 @pytest.fixture
-def client():
-    app.config['TESTING'] = True
+def client(offline_app):
+    app, _ = offline_app
     with app.test_client() as client:
         yield client
 
 def test_home_route(client):
     response = client.get('/')
     assert response.status_code == 200
-    assert b'College Transfer AI' in response.data  
+    assert b'College Transfer AI' in response.data
 
 def test_get_institutions(client):
-    response = client.get('/institutions')
+    response = client.get('/api/institutions')
     assert response.status_code == 200
-    data = response.get_json()
-    assert isinstance(data, (dict))  
+    assert {institution['id'] for institution in response.get_json()} >= {113, 117}
 
 def test_get_all_majors(client):
-    response = client.get('/majors?sendingInstitutionId=61&receivingInstitutionId=79&academicYearId=75&categoryCode=major')
+    response = client.get('/api/majors?sendingId=113&receivingId=117&yearId=75')
     assert response.status_code == 200
-    data = response.get_json()
-    assert isinstance(data, (dict)) 
+    assert response.get_json()['majors']['Computer Science, B.S.'] == 'Major/cs'
 
 def test_get_academic_years(client):
-    response = client.get('/academic-years')
+    response = client.get('/api/academic-years?sendingId=113,110&receivingId=117')
     assert response.status_code == 200
-    data = response.get_json()
-    assert isinstance(data, (dict))
+    assert response.get_json()['years']['2024-2025'] == 75
 
+def test_agreement_pdf_is_stored_and_rendered(client):
+    response = client.post('/api/articulation-agreements', json={
+        "sending_ids": [113], "receiving_id": 117, "year_id": 75, "major_key": "75/113/to/117/Major/cs"
+    })
+    assert response.status_code == 200
+    pdf_filename = response.get_json()['agreements'][0]['pdfFilename']
+    assert pdf_filename == "agreement_75_113_117_75_113_to_117_Major_cs.pdf"
+
+    images = client.get(f'/api/pdf-images/{pdf_filename}').get_json()
+    assert images['status'] == 'complete'
+    image = client.get(f"/api/image/{images['image_filenames'][0]}")
+    assert image.status_code == 200
+    assert image.headers['Content-Type'].startswith('image/')
+    assert len(image.data) > 0
+
+def test_chat_runs_search_tool_through_fake_upstreams(offline_app, client):
+    app, upstreams = offline_app
+    token = seed_users(app, 1)[0]
+    perplexity_calls = upstreams['perplexity'].requests
+
+    response = client.post('/api/chat', json={"new_message": "What are the prerequisites for COM SCI 31?"},
+                           headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['reply'].startswith("Complete CIS 22A")
+    assert body['usage']['usageCount'] == 1
+    assert upstreams['perplexity'].requests == perplexity_calls + 1
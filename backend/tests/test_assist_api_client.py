@@ -0,0 +1,129 @@
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+import requests
+from college_transfer_ai import assist_api_client
+from college_transfer_ai.assist_api_client import AssistApiClient
+
+def make_response(status_code, body=None, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body).encode("utf-8") if body is not None else b""
+    response.headers.update(headers or {})
+    response.url = "https://assist.test/api/institutions"
+    return response
+
+class StubSession:
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append({"url": url, "params": params, "timeout": timeout})
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(assist_api_client.time, 'sleep', sleeps.append)
+    return sleeps
+
+def make_client(monkeypatch, outcomes, **env):
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    client = AssistApiClient(api_key="test-key")
+    client.session = StubSession(outcomes)
+    return client
+
+def test_retries_transient_status_with_bounded_backoff(monkeypatch, sleeps):
+    client = make_client(monkeypatch, [make_response(503), make_response(502), make_response(200, [{"id": 113}])],
+                         ASSIST_BACKOFF_BASE="0.5", ASSIST_BACKOFF_MAX="10")
+
+    assert client.get_institutions() == [{"id": 113}]
+    assert len(client.session.calls) == 3
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 0.5 and 0 <= sleeps[1] <= 1.0
+
+def test_gives_up_after_max_retries(monkeypatch, sleeps):
+    client = make_client(monkeypatch, [make_response(503)] * 3, ASSIST_MAX_RETRIES="3")
+
+    assert client.get_institutions() is None
+    assert len(client.session.calls) == 3
+    assert len(sleeps) == 2
+
+def test_client_errors_are_not_retried(monkeypatch, sleeps):
+    client = make_client(monkeypatch, [make_response(404)])
+
+    assert client.get_institution_name(999) is None
+    assert len(client.session.calls) == 1
+    assert sleeps == []
+
+@pytest.mark.parametrize("retry_after, expected", [("2", 2.0), ("120", 10.0)])
+def test_retry_after_seconds_is_honoured_and_capped(monkeypatch, sleeps, retry_after, expected):
+    client = make_client(monkeypatch, [make_response(429, headers={"Retry-After": retry_after}), make_response(200, [])],
+                         ASSIST_BACKOFF_MAX="10")
+
+    assert client.get_institutions() == []
+    assert sleeps == [expected]
+
+def test_retry_after_http_date_is_honoured(monkeypatch, sleeps):
+    retry_at = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=5), usegmt=True)
+    client = make_client(monkeypatch, [make_response(503, headers={"Retry-After": retry_at}), make_response(200, [])])
+
+    assert client.get_institutions() == []
+    assert 3 <= sleeps[0] <= 5
+
+def test_requests_use_configured_timeouts(monkeypatch, sleeps):
+    client = make_client(monkeypatch, [make_response(200, [])], ASSIST_CONNECT_TIMEOUT="1.5", ASSIST_READ_TIMEOUT="7")
+
+    client.get_institutions()
+    assert client.session.calls[0]["timeout"] == (1.5, 7.0)
+
+def test_connect_timeout_is_retried(monkeypatch, sleeps):
+    client = make_client(monkeypatch, [requests.exceptions.ConnectTimeout("slow handshake"), make_response(200, [])])
+
+    assert client.get_institutions() == []
+    assert len(client.session.calls) == 2
+    assert len(sleeps) == 1
+
+def test_read_timeout_fails_without_retry(monkeypatch, sleeps):
+    client = make_client(monkeypatch, [requests.exceptions.ReadTimeout("no response")])
+
+    assert client.get_institutions() is None
+    assert len(client.session.calls) == 1
+    assert sleeps == []
+
+def test_agreement_content_bypasses_response_cache(monkeypatch, sleeps):
+    client = make_client(monkeypatch, [make_response(200, {"pdf": "first"}), make_response(200, {"pdf": "second"})])
+
+    assert client.get_agreement_details("75/113/to/117/Major/cs") == {"pdf": "first"}
+    assert client.get_agreement_details("75/113/to/117/Major/cs") == {"pdf": "second"}
+    assert client.response_cache.stats()["memory_entries"] == 0
+
+def test_refresh_does_not_join_an_in_flight_read(monkeypatch, sleeps):
+    client = make_client(monkeypatch, [make_response(200, [{"id": "stale"}]), make_response(200, [{"id": "fresh"}])])
+    first_call_started, release_first_call = threading.Event(), threading.Event()
+    stub_get = client.session.get
+    def get(url, params=None, timeout=None):
+        response = stub_get(url, params=params, timeout=timeout)
+        if len(client.session.calls) == 1:
+            first_call_started.set()
+            release_first_call.wait(5)
+        return response
+    monkeypatch.setattr(client.session, 'get', get)
+
+    reader = threading.Thread(target=client.get_agreements, args=(117, 113, 75))
+    reader.start()
+    assert first_call_started.wait(5)
+    try:
+        assert client.get_agreements(117, 113, 75, refresh=True) == [{"id": "fresh"}]
+    finally:
+        release_first_call.set()
+        reader.join()
+    assert len(client.session.calls) == 2
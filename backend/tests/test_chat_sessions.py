@@ -0,0 +1,28 @@
+import mongomock
+from college_transfer_ai.chat_sessions import (
+    append_turn, get_session, history_window, new_session, push_attachments, unseen_attachments
+)
+
+def test_history_window_keeps_newest_messages_within_budget():
+    messages = [{"role": role, "content": "x" * 400, "tokens": 100} for role in ["user", "model"] * 5]
+
+    kept, omitted = history_window(messages, token_budget=350)
+
+    assert len(kept) == 2 and omitted == 8
+    assert kept[0]["role"] == "user"
+
+def test_sessions_are_scoped_to_their_owner_and_append_incrementally():
+    collection = mongomock.MongoClient().test_db.chat_sessions
+    session = new_session("user-1", [{"type": "image", "source": "a.png", "filename": "a.png", "mime_type": "image/png"}],
+                          history=[{"role": "assistant", "content": "Hi"}, {"role": "system", "content": "ignored"}])
+    collection.insert_one(session)
+
+    assert get_session(collection, session["_id"], "user-2") is None
+    added = unseen_attachments(session, [{"type": "image", "source": "a.png"}, {"type": "text", "source": "b.pdf", "text": "B"}])
+    assert [attachment["source"] for attachment in added] == ["b.pdf"]
+    push_attachments(collection, session["_id"], added)
+    append_turn(collection, session["_id"], "Question", "Answer")
+
+    stored = get_session(collection, session["_id"], "user-1")
+    assert [attachment["source"] for attachment in stored["attachments"]] == ["a.png", "b.pdf"]
+    assert [(msg["role"], msg["content"]) for msg in stored["messages"]] == [("model", "Hi"), ("user", "Question"), ("model", "Answer")]
@@ -0,0 +1,225 @@
+import json
+import time
+from datetime import datetime, timezone
+
+import mongomock
+import pytest
+import google.generativeai as genai
+from flask import Flask
+from college_transfer_ai.routes import chat_routes
+from college_transfer_ai.response_cache import TieredCache, MemoryLRUCache
+
+def make_response(*parts):
+    return FakeResponse([genai.protos.Candidate(content=genai.protos.Content(role="model", parts=list(parts)))])
+
+class FakeResponse:
+    def __init__(self, candidates, chunks=None):
+        self.candidates = candidates
+        self.chunks = chunks or []
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+def streamed(*texts):
+    chunks = [make_response(genai.protos.Part(text=text)) for text in texts]
+    return FakeResponse(make_response(genai.protos.Part(text="".join(texts))).candidates, chunks)
+
+def search_call(query):
+    return genai.protos.Part(function_call=genai.protos.FunctionCall(name="search_web", args={"query": query}))
+
+class FakeChatSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    def send_message(self, content, stream=False, **kwargs):
+        self.sent.append((content, stream))
+        return self.responses.pop(0)
+
+class FakeModel:
+    model_name = "models/fake-model"
+
+    def __init__(self, responses):
+        self.session = FakeChatSession(responses)
+
+    def start_chat(self, history=None):
+        return self.session
+
+@pytest.fixture
+def client(monkeypatch):
+    usage_checks = []
+    db = mongomock.MongoClient().test_db
+    monkeypatch.setattr(chat_routes, 'get_gridfs', lambda: object())
+    monkeypatch.setattr(chat_routes, 'get_db', lambda: db)
+    monkeypatch.setattr(chat_routes, 'verify_google_token', lambda token, client_id: {'sub': 'user-1'})
+    monkeypatch.setattr(chat_routes, 'get_or_create_user', lambda user_info: {'google_user_id': 'user-1'})
+    def check_usage(user_data):
+        usage_checks.append(user_data)
+        return {'allowed': True, 'tier': 'free', 'requests_used': 1, 'limit': 10, 'remaining': 9, 'reset_time': None}
+    monkeypatch.setattr(chat_routes, 'check_and_update_usage', check_usage)
+    monkeypatch.setattr(chat_routes, 'format_usage_status', lambda status: {'usageCount': status['requests_used']})
+    monkeypatch.setattr(chat_routes, 'call_perplexity_api', lambda query, timeout=None: {'result': f'prereqs for {query}'})
+
+    app = Flask(__name__)
+    app.config['APP_CONFIG'] = {'GOOGLE_CLIENT_ID': 'client-id'}
+    app.register_blueprint(chat_routes.chat_bp, url_prefix='/api')
+    test_client = app.test_client()
+    test_client.usage_checks = usage_checks
+    test_client.db = db
+    return test_client
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+def post(client, path, **body):
+    return client.post(path, json=dict(new_message='Plan my courses', **body), headers={'Authorization': 'Bearer token'})
+
+def test_stream_forwards_tokens_across_function_calls(client, monkeypatch):
+    model = FakeModel([
+        FakeResponse(make_response(search_call("MATH 31A at UCLA")).candidates, [make_response(search_call("MATH 31A at UCLA"))]),
+        streamed("You need ", "MATH 1A.")
+    ])
+    monkeypatch.setattr(chat_routes, 'gemini_model', model)
+
+    response = post(client, '/api/chat/stream')
+    events = parse_events(response.get_data(as_text=True))
+
+    assert response.mimetype == 'text/event-stream'
+    assert [name for name, _ in events] == ["session", "usage", "tool", "token", "token", "done"]
+    assert events[2][1] == {"name": "search_web", "args": {"query": "MATH 31A at UCLA"}}
+    assert events[-1][1]["session_id"] == events[0][1]["session_id"]
+    assert events[-1][1]["reply"] == "You need MATH 1A."
+    tool_reply, stream = model.session.sent[1]
+    assert stream is True
+    assert tool_reply[0].function_response.response["result"] == "prereqs for MATH 31A at UCLA"
+    assert len(client.usage_checks) == 1
+
+@pytest.mark.parametrize("path", ['/api/chat', '/api/chat/stream'])
+def test_tool_rounds_share_one_limit(client, monkeypatch, path):
+    monkeypatch.setattr(chat_routes, 'CHAT_MAX_TOOL_ROUNDS', 2)
+    def tool_request():
+        return FakeResponse(make_response(genai.protos.Part(text="Searching. "), search_call("CS 31")).candidates,
+                            [make_response(genai.protos.Part(text="Searching. "), search_call("CS 31"))])
+    model = FakeModel([tool_request() for _ in range(3)] + [streamed("never read")])
+    monkeypatch.setattr(chat_routes, 'gemini_model', model)
+
+    body = post(client, path).get_data(as_text=True)
+
+    assert len(model.session.sent) == 3
+    assert "never read" not in body
+    if path.endswith('/stream'):
+        assert [name for name, _ in parse_events(body)].count("tool") == 2
+
+def test_non_streaming_chat_detects_function_calls(client, monkeypatch):
+    model = FakeModel([make_response(search_call("CS 31")), make_response(genai.protos.Part(text="Take CS 31."))])
+    monkeypatch.setattr(chat_routes, 'gemini_model', model)
+
+    response = post(client, '/api/chat')
+
+    assert response.status_code == 200
+    assert response.get_json()["reply"] == "Take CS 31."
+    assert len(model.session.sent) == 2
+    assert len(client.usage_checks) == 1
+
+def test_invalid_body_does_not_consume_usage(client, monkeypatch):
+    monkeypatch.setattr(chat_routes, 'gemini_model', FakeModel([]))
+    response = client.post('/api/chat/stream', json={}, headers={'Authorization': 'Bearer token'})
+    assert response.status_code == 400
+    assert client.usage_checks == []
+
+def test_parallel_function_calls_respect_tool_budget(monkeypatch):
+    calls = []
+    def slow_search(query, timeout=None):
+        calls.append(timeout)
+        time.sleep(0.2)
+        return {'result': query}
+    monkeypatch.setattr(chat_routes, 'call_perplexity_api', slow_search)
+
+    budget = chat_routes.ToolBudget(1.0)
+    started = time.monotonic()
+    parts = chat_routes._run_function_calls([search_call(f"COURSE {i}").function_call for i in range(4)], budget)
+    assert time.monotonic() - started < 0.6
+    assert [part.function_response.response["result"] for part in parts] == [f"COURSE {i}" for i in range(4)]
+    assert all(0 < timeout <= 1.0 for timeout in calls)
+
+    exhausted = chat_routes._run_function_calls([search_call(f"LATE {i}").function_call for i in range(3)], chat_routes.ToolBudget(0))
+    assert all("budget" in part.function_response.response["error"] for part in exhausted)
+    assert len(calls) == 4
+
+def test_session_history_is_stored_server_side(client, monkeypatch):
+    model = FakeModel([make_response(genai.protos.Part(text="First answer.")), make_response(genai.protos.Part(text="Second answer."))])
+    monkeypatch.setattr(chat_routes, 'gemini_model', model)
+    histories = []
+    start_chat = model.start_chat
+    monkeypatch.setattr(model, 'start_chat', lambda history=None: histories.append(history) or start_chat(history))
+
+    session_id = post(client, '/api/chat').get_json()["session_id"]
+    response = client.post('/api/chat', json={'new_message': 'And then?', 'session_id': session_id}, headers={'Authorization': 'Bearer token'})
+
+    assert response.get_json()["reply"] == "Second answer."
+    assert histories[0] == []
+    assert [(msg['role'], msg['parts']) for msg in histories[1]] == [('user', ['Plan my courses']), ('model', ['First answer.'])]
+    session = client.get(f'/api/chat/sessions/{session_id}', headers={'Authorization': 'Bearer token'}).get_json()
+    assert [msg['role'] for msg in session['messages']] == ['user', 'assistant', 'user', 'assistant']
+    assert len(client.usage_checks) == 2
+
+def test_unknown_session_is_rejected_before_usage_is_counted(client, monkeypatch):
+    monkeypatch.setattr(chat_routes, 'gemini_model', FakeModel([]))
+    response = post(client, '/api/chat', session_id='missing')
+    assert response.status_code == 404
+    assert client.usage_checks == []
+
+@pytest.mark.parametrize("policy", ["count", "free"])
+def test_usage_limit_is_checked_before_attachments_are_read(client, monkeypatch, policy):
+    exhausted = {'allowed': False, 'tier': 'free', 'requests_used': 10, 'limit': 10, 'remaining': 0,
+                 'reset_time': datetime(2026, 1, 2, tzinfo=timezone.utc)}
+    monkeypatch.setattr(chat_routes, 'gemini_model', FakeModel([]))
+    monkeypatch.setattr(chat_routes, 'check_and_update_usage', lambda user_data: dict(exhausted))
+    monkeypatch.setattr(chat_routes, 'get_usage_status', lambda user_data: dict(exhausted, allowed=True))
+    monkeypatch.setattr(chat_routes, '_resolve_attachments', lambda *args: pytest.fail("attachments resolved for a rejected request"))
+    monkeypatch.setattr(chat_routes, 'chat_cache_key', lambda *args, **kwargs: pytest.fail("cache key built for a rejected request"))
+    client.application.config['APP_CONFIG'].update(CHAT_RESPONSE_CACHE='true', CHAT_CACHE_HIT_USAGE=policy)
+
+    response = post(client, '/api/chat', image_filenames=['agreement.pdf_page_0.png'])
+
+    assert response.status_code == 429
+    assert client.db[chat_routes.CHAT_SESSIONS_COLLECTION].count_documents({}) == 0
+
+@pytest.mark.parametrize("policy, expected_usage_checks", [("count", 3), ("free", 1)])
+def test_identical_prompts_are_served_from_response_cache(client, monkeypatch, policy, expected_usage_checks):
+    model = FakeModel([make_response(genai.protos.Part(text="Take CS 31."))])
+    monkeypatch.setattr(chat_routes, 'gemini_model', model)
+    monkeypatch.setattr(chat_routes, 'chat_response_cache', TieredCache(memory=MemoryLRUCache(max_entries=8)))
+    monkeypatch.setattr(chat_routes, 'get_usage_status', lambda user_data: {'requests_used': 1, 'remaining': 9})
+    client.application.config['APP_CONFIG'].update(CHAT_RESPONSE_CACHE='true', CHAT_CACHE_HIT_USAGE=policy)
+
+    first = post(client, '/api/chat').get_json()
+    second = client.post(
+        '/api/chat', json={'new_message': '  plan my COURSES? '}, headers={'Authorization': 'Bearer token'}
+    ).get_json()
+    events = parse_events(post(client, '/api/chat/stream').get_data(as_text=True))
+
+    assert "cached" not in first
+    assert second["reply"] == "Take CS 31." and second["cached"] is True
+    assert [name for name, _ in events] == ["session", "usage", "token", "done"]
+    assert events[-1][1]["cached"] is True
+    assert len(model.session.sent) == 1
+    assert len(client.usage_checks) == expected_usage_checks
+    stored = client.db[chat_routes.CHAT_SESSIONS_COLLECTION].find_one({"_id": second["session_id"]})
+    assert [msg["content"] for msg in stored["messages"]] == ['  plan my COURSES? ', "Take CS 31."]
+
+def test_response_cache_can_be_bypassed_per_request(client, monkeypatch):
+    model = FakeModel([make_response(genai.protos.Part(text="One.")), make_response(genai.protos.Part(text="Two."))])
+    monkeypatch.setattr(chat_routes, 'gemini_model', model)
+    monkeypatch.setattr(chat_routes, 'chat_response_cache', TieredCache(memory=MemoryLRUCache(max_entries=8)))
+    client.application.config['APP_CONFIG'].update(CHAT_RESPONSE_CACHE='true')
+
+    post(client, '/api/chat')
+    response = post(client, '/api/chat', use_cache=False).get_json()
+
+    assert response["reply"] == "Two."
+    assert len(model.session.sent) == 2
@@ -0,0 +1,44 @@
+import time
+import threading
+from college_transfer_ai import concurrency
+from college_transfer_ai.concurrency import fan_out, submit_background
+
+def test_fan_out_preserves_order_and_runs_concurrently():
+    def slow_double(value):
+        time.sleep(0.2)
+        return value * 2
+
+    started = time.monotonic()
+    results = fan_out(slow_double, [1, 2, 3, 4])
+    assert time.monotonic() - started < 0.6
+    assert [(item, result) for item, result, _ in results] == [(1, 2), (2, 4), (3, 6), (4, 8)]
+
+def test_fan_out_collects_errors_per_item():
+    def fail_on_two(value):
+        if value == 2:
+            raise RuntimeError("boom")
+        return value
+
+    results = fan_out(fail_on_two, [1, 2, 3])
+    assert results[0][1] == 1
+    assert isinstance(results[1][2], RuntimeError)
+    assert results[2][1] == 3
+
+def test_fan_out_times_out_slow_items():
+    def maybe_slow(value):
+        if value == "slow":
+            time.sleep(0.5)
+        return value
+
+    results = fan_out(maybe_slow, ["fast", "slow"], timeout=0.1)
+    assert results[0][1] == "fast"
+    assert isinstance(results[1][2], TimeoutError)
+
+def test_background_work_runs_outside_the_fan_out_pool():
+    assert submit_background(lambda: threading.current_thread().name).result(timeout=5).startswith("background")
+
+def test_background_work_is_dropped_when_queue_is_full(monkeypatch):
+    monkeypatch.setattr(concurrency, '_background_slots', threading.BoundedSemaphore(1))
+    concurrency._background_slots.acquire()
+
+    assert submit_background(lambda: None) is None
@@ -0,0 +1,110 @@
+import mongomock
+import pytest
+from college_transfer_ai.agreement_index import store_agreement_index
+from college_transfer_ai.equivalency_index import (
+    EQUIVALENCIES_COLLECTION,
+    ensure_equivalency_indexes,
+    find_equivalencies,
+    index_agreement_equivalencies,
+    rebuild_equivalencies,
+)
+
+def course(code, title=None):
+    return {"code": code, "title": title, "units": 4.0}
+
+def row(receiving, sending, conjunction=None):
+    return {
+        "requirement_group": None,
+        "receiving_course": course(receiving),
+        "sending_courses": [course(code) for code in sending],
+        "conjunction": conjunction,
+        "articulated": bool(sending),
+        "page": 0
+    }
+
+def store(db, year_id, sending_id, receiving_id, major_key, rows):
+    filename = f"agreement_{year_id}_{sending_id}_{receiving_id}_{major_key}.pdf"
+    context = {"kind": "agreement", "year_id": year_id, "sending_id": sending_id, "receiving_id": receiving_id, "major_key": major_key}
+    store_agreement_index(db, filename, {"pages": [""], "rows": rows}, context, on_indexed=index_agreement_equivalencies)
+
+@pytest.fixture
+def db():
+    db = mongomock.MongoClient().db
+    ensure_equivalency_indexes(db[EQUIVALENCIES_COLLECTION])
+    store(db, 74, 113, 117, "CS", [row("COM SCI 31", ["CIS 22A"]), row("MATH 31A", ["MATH 1A", "MATH 1B"], "AND")])
+    store(db, 75, 113, 117, "CS", [row("COM SCI 31", ["CIS 22B"])])
+    store(db, 75, 113, 117, "MATH", [row("COM SCI 31", ["CIS 22B"])])
+    store(db, 75, 110, 117, "CS", [row("COM SCI 31", [])])
+    store(db, 75, 120, 79, "CS", [row("COM SCI 31", ["CS 1"])])
+    return db
+
+def test_point_query_returns_latest_year_per_sending_college(db):
+    result = find_equivalencies(db, [{"receiving_id": 117, "course": "com sci  31"}])[0]
+    matches = result["equivalencies"]
+
+    assert result["course"] == "COM SCI 31"
+    assert [(m["sending_id"], m["year_id"]) for m in matches] == [(110, 75), (113, 75)]
+    assert matches[0]["articulated"] is False
+    assert matches[1]["sending_courses"][0]["code"] == "CIS 22B"
+    assert sorted(matches[1]["major_keys"]) == ["CS", "MATH"]
+
+def test_batch_queries_filter_by_year_and_sending_colleges(db):
+    results = find_equivalencies(db, [
+        {"receiving_id": 117, "course": "MATH 31A", "year_id": 74, "sending_ids": ["113"]},
+        {"receiving_id": 117, "course": "COM SCI 31", "year_id": 74},
+        {"receiving_id": 79, "course": "COM SCI 31", "sending_ids": [113]}
+    ])
+
+    assert [course["code"] for course in results[0]["equivalencies"][0]["sending_courses"]] == ["MATH 1A", "MATH 1B"]
+    assert results[0]["equivalencies"][0]["conjunction"] == "AND"
+    assert [m["sending_courses"][0]["code"] for m in results[1]["equivalencies"]] == ["CIS 22A"]
+    assert results[2]["equivalencies"] == []
+
+def test_rebuild_matches_incremental_index(db):
+    before = find_equivalencies(db, [{"receiving_id": 117, "course": "COM SCI 31"}])
+    assert rebuild_equivalencies(db) == db[EQUIVALENCIES_COLLECTION].count_documents({})
+    assert find_equivalencies(db, [{"receiving_id": 117, "course": "COM SCI 31"}]) == before
+
+@pytest.fixture
+def client(db, monkeypatch):
+    from flask import Flask
+    from college_transfer_ai.routes import equivalency_routes
+    monkeypatch.setattr(equivalency_routes, 'get_read_db', lambda: db)
+    app = Flask(__name__)
+    app.register_blueprint(equivalency_routes.equivalency_bp, url_prefix='/api')
+    return app.test_client()
+
+def test_batch_route_returns_results_in_query_order(client):
+    response = client.post('/api/equivalencies/batch', json={"queries": [
+        {"receivingId": 117, "course": "COM SCI 31", "sendingIds": ["113"], "academicYearId": "74"},
+        {"receivingId": "79", "course": "COM SCI 31"},
+    ]})
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [result["receiving_id"] for result in results] == [117, 79]
+
+@pytest.mark.parametrize("bad_query", [
+    {"receivingId": 117, "course": 31},
+    {"receivingId": None, "course": "COM SCI 31"},
+    {"course": "COM SCI 31"},
+    {"receivingId": 117, "course": "  "},
+    {"receivingId": 117, "course": "COM SCI 31", "sendingIds": "113"},
+    {"receivingId": 117, "course": "COM SCI 31", "academicYearId": "latest"},
+    "COM SCI 31",
+])
+def test_batch_route_rejects_invalid_query_with_its_index(client, bad_query):
+    response = client.post('/api/equivalencies/batch', json={"queries": [
+        {"receivingId": 117, "course": "COM SCI 31"}, bad_query
+    ]})
+    assert response.status_code == 400
+    assert response.get_json()["index"] == 1
+
+def test_only_agreement_rows_feed_the_equivalency_index():
+    db = mongomock.MongoClient().db
+    store_agreement_index(db, "igetc_75_113.pdf", {"pages": [""], "rows": [row("COM SCI 31", ["CIS 22A"])]},
+                          {"kind": "igetc", "year_id": 75, "sending_id": 113}, on_indexed=index_agreement_equivalencies)
+    store(db, 75, 113, 117, "CS", [row("COM SCI 31", ["CIS 22A"])])
+    store_agreement_index(db, "agreement_75_110_117_CS.pdf", {"pages": [""], "rows": [row("COM SCI 31", ["CS 1"])]},
+                          {"kind": "agreement", "year_id": 75, "sending_id": 110, "receiving_id": 117})
+
+    assert [doc["pdf_filename"] for doc in db[EQUIVALENCIES_COLLECTION].find()] == ["agreement_75_113_117_CS.pdf"]
@@ -0,0 +1,33 @@
+from college_transfer_ai.file_cache import GridFSFileCache
+
+def test_read_many_caches_by_filename_and_upload_id(fs):
+    for i in range(3):
+        fs.put(bytes([i]) * 100, filename=f"page_{i}.png", contentType="image/png")
+    cache = GridFSFileCache(max_bytes=1000)
+
+    first = cache.read_many(fs, ["page_0.png", "page_1.png", "page_2.png", "missing.png"])
+    second = cache.read_many(fs, ["page_0.png", "page_1.png"])
+
+    assert sorted(first) == ["page_0.png", "page_1.png", "page_2.png"]
+    assert second["page_1.png"].data == bytes([1]) * 100
+    assert second["page_1.png"].content_type == "image/png"
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (2, 3)
+
+    old_id = fs.find_one({"filename": "page_0.png"})._id
+    fs.delete(old_id)
+    fs.put(b"new" * 10, filename="page_0.png")
+    assert cache.read_many(fs, ["page_0.png"])["page_0.png"].data == b"new" * 10
+
+def test_eviction_is_bounded_by_bytes(fs):
+    cache = GridFSFileCache(max_bytes=250, max_file_bytes=200)
+    for i in range(3):
+        fs.put(b"x" * 100, filename=f"page_{i}.png")
+    fs.put(b"x" * 201, filename="huge.png")
+
+    cache.read_many(fs, ["page_0.png", "page_1.png", "page_2.png", "huge.png"])
+    stats = cache.stats()
+
+    assert stats["bytes"] == 200 and stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["uncacheable"] == 1
+    assert not cache.cacheable(fs.find_one({"filename": "huge.png"}))
@@ -0,0 +1,72 @@
+import os
+import uuid
+import mongomock
+import pytest
+from college_transfer_ai.indexes import REQUIRED_INDEXES, HotQuery, ensure_indexes, index_covers, plan_stages, uncovered_hot_queries, verify_query_plans
+
+def test_ensure_indexes_is_idempotent():
+    db = mongomock.MongoClient().db
+    first, failures = ensure_indexes(db)
+    second, _ = ensure_indexes(db)
+
+    assert failures == []
+    assert first == second
+    for spec in REQUIRED_INDEXES:
+        assert spec.options["name"] in db[spec.collection].index_information()
+    assert db.users.index_information()["google_user_id"]["unique"] is True
+
+def test_stripe_indexes_skip_users_without_stripe_ids():
+    db = mongomock.MongoClient().db
+    ensure_indexes(db)
+    for field in ("stripe_customer_id", "stripe_subscription_id"):
+        index = db.users.index_information()[field]
+        assert index["partialFilterExpression"] == {field: {"$type": "string"}}
+        assert "sparse" not in index
+
+def test_every_hot_query_is_covered_by_a_declared_index():
+    db = mongomock.MongoClient().db
+    ensure_indexes(db)
+    assert uncovered_hot_queries(db) == []
+
+@pytest.mark.parametrize("hot_query, covered", [
+    (HotQuery("prefix", "c", {"a": 1}, None), True),
+    (HotQuery("full", "c", {"a": 1, "b": 2}, None), True),
+    (HotQuery("unindexed field", "c", {"a": 1, "z": 2}, None), False),
+    (HotQuery("non-leading field", "c", {"b": 1}, None), False),
+    (HotQuery("sort follows prefix", "c", {"a": 1}, [("b", -1)]), True),
+    (HotQuery("sort not indexed", "c", {"a": 1}, [("z", 1)]), False),
+    (HotQuery("sort only", "c", {}, [("a", 1)]), True),
+])
+def test_index_covers(hot_query, covered):
+    assert bool(index_covers({"key": [("a", 1), ("b", 1)]}, hot_query)) is covered
+
+def test_unique_index_covers_extra_filter_fields():
+    hot_query = HotQuery("by id and owner", "c", {"_id": 1, "owner": 2}, None)
+    assert index_covers({"key": [("_id", 1)], "unique": True}, hot_query)
+    assert not index_covers({"key": [("_id", 1)]}, hot_query)
+
+def test_plan_stages_walks_nested_plans():
+    plan = {"stage": "SORT", "inputStage": {"stage": "FETCH", "inputStage": {"stage": "OR", "inputStages": [
+        {"stage": "IXSCAN"}, {"stage": "COLLSCAN"}
+    ]}}}
+    assert plan_stages(plan) == ["SORT", "FETCH", "OR", "IXSCAN", "COLLSCAN"]
+    assert plan_stages({"queryPlan": {"stage": "EXPRESS_IXSCAN"}}) == ["EXPRESS_IXSCAN"]
+
+@pytest.fixture
+def live_db():
+    mongo_uri = os.getenv("MONGO_TEST_URI")
+    if not mongo_uri:
+        pytest.skip("MONGO_TEST_URI not set; query plans need a real MongoDB server.")
+    from pymongo import MongoClient
+    client = MongoClient(mongo_uri, serverSelectionTimeoutMS=2000)
+    db = client[f"index_check_{uuid.uuid4().hex[:8]}"]
+    yield db
+    client.drop_database(db.name)
+    client.close()
+
+def test_hot_path_queries_do_not_collscan(live_db):
+    _, failures = ensure_indexes(live_db)
+    assert failures == []
+
+    scans = [plan for plan in verify_query_plans(live_db) if plan["collscan"]]
+    assert scans == [], f"Hot-path queries without a usable index: {scans}"
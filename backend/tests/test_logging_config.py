@@ -0,0 +1,77 @@
+import io
+import json
+import queue
+import logging
+from logging.handlers import QueueListener
+from flask import Flask
+from college_transfer_ai.concurrency import fan_out
+from college_transfer_ai.logging_config import (
+    JsonFormatter, RequestIdFilter, SamplingFilter, StructuredQueueHandler,
+    init_request_logging, request_id_var, REQUEST_ID_HEADER
+)
+
+def capture(name, fmt=JsonFormatter()):
+    stream = io.StringIO()
+    stream_handler = logging.StreamHandler(stream)
+    stream_handler.setFormatter(fmt)
+    handler = StructuredQueueHandler(queue.SimpleQueue())
+    handler.addFilter(RequestIdFilter())
+    handler.addFilter(SamplingFilter())
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    listener = QueueListener(handler.queue, stream_handler)
+    listener.start()
+    return logger, listener, stream
+
+def records(listener, stream):
+    listener.stop()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+def test_json_records_carry_request_id_extras_and_exceptions():
+    logger, listener, stream = capture("tests.logging.json")
+    token = request_id_var.set("req-123")
+    try:
+        logger.info("Fetched %s rows", 3, extra={"collection": "users"})
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            logger.exception("Lookup failed")
+    finally:
+        request_id_var.reset(token)
+
+    info, error = records(listener, stream)
+    assert info["message"] == "Fetched 3 rows"
+    assert info["request_id"] == "req-123"
+    assert info["collection"] == "users"
+    assert error["level"] == "ERROR"
+    assert "RuntimeError: boom" in error["exception"]
+
+def test_sampling_keeps_one_in_n_and_never_drops_warnings():
+    logger, listener, stream = capture("tests.logging.sampling")
+    for i in range(250):
+        logger.debug("Cache hit for %s", i, extra={"sample_rate": 100})
+    logger.warning("Slow lookup", extra={"sample_rate": 100})
+
+    logged = records(listener, stream)
+    hits = [entry for entry in logged if entry["message"].startswith("Cache hit")]
+    assert [entry["message"] for entry in hits] == ["Cache hit for 0", "Cache hit for 100", "Cache hit for 200"]
+    assert all(entry["sampled"] == "1/100" for entry in hits)
+    assert logged[-1]["message"] == "Slow lookup"
+
+def test_request_ids_are_echoed_and_propagate_to_fan_out_workers():
+    app = Flask(__name__)
+    init_request_logging(app)
+
+    @app.route('/ids')
+    def ids():
+        return {"ids": [request_id for _, request_id, _ in fan_out(lambda _: request_id_var.get(), range(4))]}
+
+    client = app.test_client()
+    response = client.get('/ids', headers={REQUEST_ID_HEADER: "abc"})
+    assert response.headers[REQUEST_ID_HEADER] == "abc"
+    assert response.get_json()["ids"] == ["abc"] * 4
+
+    generated = client.get('/ids')
+    assert len(generated.headers[REQUEST_ID_HEADER]) == 32
@@ -0,0 +1,65 @@
+import pytest
+from flask import Flask
+from college_transfer_ai import metrics
+from college_transfer_ai.metrics import Registry, init_request_metrics, observe_upstream
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    latency = registry.histogram("op_seconds", "Op latency.", ("name",), buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.5, 0.5, 3.0):
+        latency.labels('say "hi"').observe(seconds)
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP op_seconds Op latency.", "# TYPE op_seconds histogram"]
+    assert 'op_seconds_bucket{name="say \\"hi\\"",le="0.1"} 1' in lines
+    assert 'op_seconds_bucket{name="say \\"hi\\"",le="1.0"} 3' in lines
+    assert 'op_seconds_bucket{name="say \\"hi\\"",le="+Inf"} 4' in lines
+    assert 'op_seconds_count{name="say \\"hi\\""} 4' in lines
+    assert 'op_seconds_sum{name="say \\"hi\\""} 4.05' in lines
+
+@pytest.mark.parametrize("name", ["jobs", "jobs_total"])
+def test_counter_metadata_uses_total_name(name):
+    registry = Registry()
+    registry.counter(name, "Jobs run.", ("kind",)).labels("render").inc(2)
+
+    assert registry.render().splitlines() == [
+        "# HELP jobs_total Jobs run.", "# TYPE jobs_total counter", 'jobs_total{kind="render"} 2'
+    ]
+
+def test_requests_are_recorded_by_route_template():
+    app = Flask(__name__)
+    init_request_metrics(app)
+
+    @app.route('/items/<item_id>')
+    def item(item_id):
+        if item_id == "bad":
+            raise RuntimeError("boom")
+        return {"id": item_id}
+
+    client = app.test_client()
+    client.get('/items/1')
+    client.get('/items/2')
+    app.config['PROPAGATE_EXCEPTIONS'] = False
+    client.get('/items/bad')
+
+    ok = metrics.http_request_duration.labels("GET", "/items/<item_id>", 200)
+    failed = metrics.http_request_duration.labels("GET", "/items/<item_id>", 500)
+    assert ok.samples()[-1][2] >= 2
+    assert failed.samples()[-1][2] >= 1
+    assert metrics.http_requests_in_flight.labels("GET", "/items/<item_id>").value == 0
+
+def test_metrics_endpoint_exposes_upstream_and_cache_metrics():
+    from college_transfer_ai.routes.metrics_routes import metrics_bp
+    observe_upstream("perplexity", "search", 0.2, "Timeout")
+
+    app = Flask(__name__)
+    app.register_blueprint(metrics_bp)
+    response = app.test_client().get('/metrics')
+    body = response.get_data(as_text=True)
+
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert 'upstream_errors_total{upstream="perplexity",reason="Timeout"}' in body
+    assert 'upstream_request_duration_seconds_count{upstream="perplexity",operation="search"}' in body
+    assert '# TYPE cache_hit_ratio gauge' in body
+    assert 'mongo_pool_connections{state="checked_out"}' in body
+    assert 'singleflight_calls_total{group="pdf_fetches",outcome="coalesced"}' in body
@@ -0,0 +1,35 @@
+import threading
+import time
+from college_transfer_ai.prerequisite_search import PrerequisiteSearch, normalize_query
+
+def test_normalize_query_collapses_equivalent_phrasings():
+    assert normalize_query("Prerequisites for MATH101 at  UCLA?") == "prerequisites for math 101 at ucla"
+    assert normalize_query("prerequisites for math 101 at UCLA") == "prerequisites for math 101 at ucla"
+
+def test_search_caches_successes_and_coalesces_concurrent_queries(monkeypatch):
+    search = PrerequisiteSearch(api_key="key")
+    calls = []
+    def fake_call(query, timeout=None):
+        calls.append(query)
+        time.sleep(0.3)
+        return {"result": "MATH 100"}
+    monkeypatch.setattr(search, '_call', fake_call)
+
+    threads = [threading.Thread(target=search.search, args=("Prereqs for MATH 101 at UCLA",)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert search.search("prereqs for math101 at ucla") == {"result": "MATH 100"}
+
+    assert len(calls) == 1
+    assert search.stats()["coalescing"]["coalesced"] == 4
+
+def test_search_does_not_cache_errors(monkeypatch):
+    search = PrerequisiteSearch(api_key="key")
+    results = [{"error": "timeout"}, {"result": "None"}]
+    monkeypatch.setattr(search, '_call', lambda query, timeout=None: results.pop(0))
+
+    assert search.search("CS 31") == {"error": "timeout"}
+    assert search.search("CS 31") == {"result": "None"}
+    assert search.search("cs31") == {"result": "None"}
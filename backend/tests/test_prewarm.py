@@ -0,0 +1,46 @@
+import time
+import pytest
+from college_transfer_ai import pdf_service as pdf_service_module
+from college_transfer_ai import prewarm as prewarm_module
+from college_transfer_ai.prewarm import REQUEST_LOG_COLLECTION, popular_targets, prewarm, record_agreement_request
+from college_transfer_ai.rasterizer import Rasterizer, find_complete_images
+
+@pytest.fixture
+def storage(monkeypatch, pdf_storage):
+    db, fs = pdf_storage
+    monkeypatch.setattr(prewarm_module, 'get_db', lambda: db)
+    monkeypatch.setattr(prewarm_module, 'rasterizer', Rasterizer(max_workers=1))
+    return db, fs
+
+def record_requests(db, counts):
+    for major_key, count in counts.items():
+        for _ in range(count):
+            record_agreement_request(75, int(major_key.split("/")[1]), 117, major_key)
+
+    expected = sum(counts.values())
+    deadline = time.monotonic() + 10
+    while sum(doc["count"] for doc in db[REQUEST_LOG_COLLECTION].find()) < expected:
+        assert time.monotonic() < deadline, "request log writes did not finish"
+        time.sleep(0.01)
+
+def test_prewarm_fetches_most_requested_agreements(storage, assist_stub):
+    db, fs = storage
+    record_requests(db, {"75/113/to/117/Major/cs": 3, "75/110/to/117/Major/cs": 2, "75/120/to/117/Major/cs": 1})
+    client = assist_stub
+    service = pdf_service_module.PdfService(client)
+
+    targets = popular_targets(db, limit=2, include_igetc=False)
+    report = prewarm(service, fs, targets, concurrency=2, profiles=('llm',), progress=lambda message: None)
+
+    assert [target.major_key for target in targets] == ["75/113/to/117/Major/cs", "75/110/to/117/Major/cs"]
+    assert (report['succeeded'], report['failed'], report['pages']) == (2, 0, 2)
+    assert sorted(client.downloads) == ["75/110/to/117/Major/cs", "75/113/to/117/Major/cs"]
+    for target in targets:
+        pdf_filename = service._generate_pdf_filename("agreement", 75, target.sending_id, 117, target.major_key)
+        assert fs.exists({"filename": pdf_filename})
+        assert find_complete_images(fs, pdf_filename, 'llm')
+    assert not fs.exists({"filename": service._generate_pdf_filename("agreement", 75, 120, 117, "75/120/to/117/Major/cs")})
+
+    client.downloads.clear()
+    assert prewarm(service, fs, targets, profiles=('llm',), progress=lambda message: None)['succeeded'] == 2
+    assert client.downloads == []
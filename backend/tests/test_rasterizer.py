@@ -0,0 +1,99 @@
+import sys
+import os
+import subprocess
+import pytest
+from college_transfer_ai.rasterizer import Rasterizer, validate_render_profiles
+
+@pytest.fixture
+def store_pdf(fs, make_pdf):
+    def store(filename, pages):
+        fs.put(make_pdf(*[f"Page {i}" for i in range(pages)]), filename=filename)
+    return store
+
+def test_renders_every_page_in_order(fs, store_pdf):
+    store_pdf("agreement.pdf", 4)
+    rasterizer = Rasterizer(max_workers=2)
+    job = rasterizer.start(fs, "agreement.pdf")
+    assert job.wait(timeout=30)
+    assert job.status == "complete"
+    assert job.image_filenames() == [f"agreement.pdf_screen_page_{i}.webp" for i in range(4)]
+    assert fs.find_one({"filename": "agreement.pdf_screen_page_3.webp"}).metadata["page_count"] == 4
+
+def test_concurrent_starts_share_one_job(fs, store_pdf):
+    store_pdf("agreement.pdf", 2)
+    rasterizer = Rasterizer(max_workers=1)
+    first = rasterizer.start(fs, "agreement.pdf")
+    second = rasterizer.start(fs, "agreement.pdf")
+    assert first is second
+    first.wait(timeout=30)
+    assert rasterizer.stats()["jobs_coalesced"] == 1
+
+def test_missing_pdf_fails_job(fs):
+    job = Rasterizer(max_workers=1).start(fs, "missing.pdf")
+    assert job.wait(timeout=10)
+    assert job.status == "failed"
+
+def test_profiles_are_stored_separately(fs, store_pdf):
+    store_pdf("agreement.pdf", 1)
+    rasterizer = Rasterizer(max_workers=1)
+    for profile_name in ("screen", "llm"):
+        rasterizer.start(fs, "agreement.pdf", profile_name).wait(timeout=30)
+
+    llm_image = fs.find_one({"metadata.original_pdf": "agreement.pdf", "metadata.profile": "llm"})
+    assert llm_image.contentType == "image/png"
+    assert llm_image.metadata["grayscale"] is True
+    assert fs.find_one({"metadata.original_pdf": "agreement.pdf", "metadata.profile": "screen"}).filename != llm_image.filename
+
+def test_unknown_profile_is_rejected(fs):
+    with pytest.raises(ValueError):
+        Rasterizer(max_workers=1).start(fs, "agreement.pdf", "poster")
+
+class ReplacingFS:
+    def __init__(self, fs, pdf_filename, store_pdf):
+        self._fs = fs
+        self.pdf_filename = pdf_filename
+        self.store_pdf = store_pdf
+
+    def __getattr__(self, name):
+        return getattr(self._fs, name)
+
+    def put(self, data, **kwargs):
+        file_id = self._fs.put(data, **kwargs)
+        if kwargs.get("metadata", {}).get("original_pdf") == self.pdf_filename:
+            old_pdf = self._fs.find_one({"filename": self.pdf_filename})
+            self.store_pdf(self.pdf_filename, 1)
+            self._fs.delete(old_pdf._id)
+        return file_id
+
+def test_job_discards_pages_when_pdf_is_replaced_mid_render(fs, store_pdf):
+    store_pdf("agreement.pdf", 3)
+    rasterizer = Rasterizer(max_workers=1)
+    job = rasterizer.start(ReplacingFS(fs, "agreement.pdf", store_pdf), "agreement.pdf")
+
+    assert job.wait(timeout=30)
+    assert job.status == "failed"
+    assert "replaced" in job.error
+    assert fs.find_one({"metadata.original_pdf": "agreement.pdf"}) is None
+
+@pytest.mark.parametrize("profiles", [
+    {"poster": {"format": "png"}},
+    {"poster": {"dpi": 300, "format": "tiff"}},
+    {"poster": {"dpi": "300", "format": "png"}},
+    {"poster": {"dpi": 300, "format": "jpeg", "quality": 0}},
+    ["poster"],
+])
+def test_invalid_render_profiles_are_rejected(profiles):
+    with pytest.raises(ValueError):
+        validate_render_profiles(profiles)
+
+def test_valid_render_profiles_pass_through():
+    profiles = {"poster": {"dpi": 300, "format": "jpeg", "quality": 90}}
+    assert validate_render_profiles(profiles) is profiles
+
+def test_page_renderer_imports_without_the_web_stack():
+    env = {key: value for key, value in os.environ.items() if key != "ASSIST_API_KEY"}
+    code = "import sys, college_transfer_ai.page_renderer; print('flask' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=os.path.join(os.path.dirname(__file__), '..'),
+                            env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines()[-1] == "False"
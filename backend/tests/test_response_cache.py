@@ -0,0 +1,40 @@
+import time
+import mongomock
+from college_transfer_ai.response_cache import MemoryLRUCache, MongoCacheBackend, TieredCache
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryLRUCache(max_entries=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    cache.get("a")
+    cache.set("c", 3, ttl=60)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.evictions == 1
+
+def test_memory_cache_honours_ttl():
+    cache = MemoryLRUCache()
+    cache.set("a", 1, ttl=0.05)
+    time.sleep(0.1)
+    assert cache.get("a") is None
+
+def test_tiered_cache_falls_back_to_backend_and_promotes():
+    backend = MongoCacheBackend(mongomock.MongoClient().test_db.cache)
+    writer = TieredCache(backend=backend)
+    writer.set("institutions", [{"id": 1}], namespace="institutions", ttl=60)
+
+    reader = TieredCache(backend=backend)
+    assert reader.get("institutions", namespace="institutions") == [{"id": 1}]
+    assert reader.get("institutions", namespace="institutions") == [{"id": 1}]
+    stats = reader.stats()["namespaces"]["institutions"]
+    assert stats["backend_hits"] == 1
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 0
+
+def test_mongo_backend_trims_oldest_entries():
+    backend = MongoCacheBackend(mongomock.MongoClient().test_db.cache, max_entries=2)
+    for key in ("a", "b", "c"):
+        backend.set(key, key, ttl=60)
+    assert backend.trim() == 1
+    assert backend.get("a") is None
+    assert backend.get("c") == "c"
@@ -0,0 +1,45 @@
+import threading
+import time
+from college_transfer_ai.singleflight import SingleFlight
+
+def run_concurrently(count, target):
+    results = [None] * count
+    def worker(index):
+        try:
+            results[index] = target()
+        except Exception as e:
+            results[index] = e
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return "pdf-bytes"
+
+    results = run_concurrently(5, lambda: flight.do("agreement.pdf", fetch))
+    assert results == ["pdf-bytes"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"executed": 1, "coalesced": 4, "in_flight": 0}
+
+def test_errors_are_shared_with_waiters():
+    flight = SingleFlight()
+    def fail():
+        time.sleep(0.1)
+        raise RuntimeError("upstream down")
+
+    results = run_concurrently(3, lambda: flight.do("key", fail))
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+def test_sequential_calls_are_not_coalesced():
+    flight = SingleFlight()
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.do("key", lambda: 2) == 2
+    assert flight.stats()["coalesced"] == 0
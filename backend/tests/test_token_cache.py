@@ -0,0 +1,78 @@
+import time
+from college_transfer_ai.token_cache import VerifiedTokenCache, CachingCertsRequest
+
+CLIENT_ID = "test-client-id"
+
+def make_idinfo(sub="user-1", ttl=600):
+    return {"sub": sub, "iss": "accounts.google.com", "exp": int(time.time()) + ttl}
+
+def test_cache_hit_after_put():
+    cache = VerifiedTokenCache(max_entries=4)
+    assert cache.get("token-a", CLIENT_ID) is None
+    cache.put("token-a", CLIENT_ID, make_idinfo())
+    assert cache.get("token-a", CLIENT_ID)["sub"] == "user-1"
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+def test_cache_key_includes_client_id():
+    cache = VerifiedTokenCache()
+    cache.put("token-a", CLIENT_ID, make_idinfo())
+    assert cache.get("token-a", "other-client") is None
+
+def test_expired_tokens_are_not_cached():
+    cache = VerifiedTokenCache(clock_skew=0)
+    cache.put("token-a", CLIENT_ID, make_idinfo(ttl=-5))
+    assert cache.get("token-a", CLIENT_ID) is None
+    assert cache.stats()["size"] == 0
+
+def test_entries_expire_at_token_exp():
+    cache = VerifiedTokenCache(clock_skew=0)
+    cache.put("token-a", CLIENT_ID, make_idinfo(ttl=1))
+    assert cache.get("token-a", CLIENT_ID) is not None
+    time.sleep(1.1)
+    assert cache.get("token-a", CLIENT_ID) is None
+
+def test_lru_eviction():
+    cache = VerifiedTokenCache(max_entries=2)
+    cache.put("token-a", CLIENT_ID, make_idinfo("a"))
+    cache.put("token-b", CLIENT_ID, make_idinfo("b"))
+    cache.get("token-a", CLIENT_ID)
+    cache.put("token-c", CLIENT_ID, make_idinfo("c"))
+    assert cache.get("token-b", CLIENT_ID) is None
+    assert cache.get("token-a", CLIENT_ID)["sub"] == "a"
+    assert cache.stats()["evictions"] == 1
+
+class FakeResponse:
+    def __init__(self, status=200, headers=None):
+        self.status = status
+        self.headers = headers or {}
+        self.data = b"{}"
+
+class FakeTransport:
+    def __init__(self, response):
+        self.response = response
+        self.calls = 0
+
+    def __call__(self, url, **kwargs):
+        self.calls += 1
+        return self.response
+
+def test_certs_are_reused_until_max_age():
+    certs_request = CachingCertsRequest()
+    transport = FakeTransport(FakeResponse(headers={"cache-control": "public, max-age=60"}))
+    certs_request._transport = transport
+    url = "https://www.googleapis.com/oauth2/v1/certs"
+    certs_request(url)
+    certs_request(url)
+    assert transport.calls == 1
+    assert certs_request.stats()["hits"] == 1
+
+def test_failed_certs_fetch_is_not_cached():
+    certs_request = CachingCertsRequest()
+    transport = FakeTransport(FakeResponse(status=500))
+    certs_request._transport = transport
+    url = "https://www.googleapis.com/oauth2/v1/certs"
+    certs_request(url)
+    certs_request(url)
+    assert transport.calls == 2
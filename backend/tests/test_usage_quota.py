@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+
+import mongomock
+import pytest
+from pymongo.errors import DuplicateKeyError
+from college_transfer_ai import utils
+
+@pytest.fixture
+def users_collection(monkeypatch):
+    collection = mongomock.MongoClient().test_db.users
+    monkeypatch.setattr(utils, 'get_users_collection', lambda: collection)
+    return collection
+
+def test_get_or_create_user_inserts_defaults(users_collection):
+    user = utils.get_or_create_user({'sub': 'user-1', 'email': 'a@example.com', 'name': 'A'})
+    assert user['tier'] == 'free'
+    assert user['requests_used_this_period'] == 0
+    assert user['stripe_customer_id'] is None
+    assert users_collection.count_documents({}) == 1
+
+def test_get_or_create_user_backfills_existing_user(users_collection):
+    users_collection.insert_one({'google_user_id': 'user-1', 'tier': 'premium', 'requests_used_this_period': 4})
+    user = utils.get_or_create_user({'sub': 'user-1', 'email': 'a@example.com'})
+    assert user['tier'] == 'premium'
+    assert user['requests_used_this_period'] == 4
+    assert 'subscription_status' in user
+    assert users_collection.count_documents({}) == 1
+
+def test_get_or_create_user_stores_profile_values_literally(users_collection):
+    user = utils.get_or_create_user({'sub': 'user-1', 'email': '$email', 'name': '$teve'})
+    assert (user['email'], user['name']) == ('$email', '$teve')
+
+def test_get_or_create_user_retries_after_losing_insert_race(users_collection, monkeypatch):
+    users_collection.create_index('google_user_id', unique=True)
+    find_one_and_update = users_collection.find_one_and_update
+    def racing_upsert(*args, **kwargs):
+        if kwargs.get('upsert'):
+            find_one_and_update(*args, **kwargs)
+            raise DuplicateKeyError("E11000 duplicate key error")
+        return find_one_and_update(*args, **kwargs)
+    monkeypatch.setattr(users_collection, 'find_one_and_update', racing_upsert)
+
+    user = utils.get_or_create_user({'sub': 'user-1', 'email': 'a@example.com'})
+    assert user['google_user_id'] == 'user-1'
+    assert users_collection.count_documents({}) == 1
+
+def test_usage_is_denied_at_free_tier_limit(users_collection):
+    user = utils.get_or_create_user({'sub': 'user-1'})
+    for expected_used in range(1, utils.FREE_TIER_LIMIT + 1):
+        status = utils.check_and_update_usage(user)
+        assert status['allowed']
+        assert status['requests_used'] == expected_used
+        assert status['remaining'] == utils.FREE_TIER_LIMIT - expected_used
+
+    status = utils.check_and_update_usage(user)
+    assert not status['allowed']
+    assert status['remaining'] == 0
+    assert users_collection.find_one()['requests_used_this_period'] == utils.FREE_TIER_LIMIT
+
+def test_usage_window_resets_on_new_day(users_collection):
+    user = utils.get_or_create_user({'sub': 'user-1'})
+    users_collection.update_one(
+        {'google_user_id': 'user-1'},
+        {'$set': {'requests_used_this_period': utils.FREE_TIER_LIMIT,
+                  'period_start_date': datetime.now(timezone.utc) - timedelta(days=2)}}
+    )
+    status = utils.check_and_update_usage(user)
+    assert status['allowed']
+    assert status['requests_used'] == 1
+
+def test_get_usage_status_ignores_stale_period():
+    status = utils.get_usage_status({
+        'tier': 'premium',
+        'requests_used_this_period': 7,
+        'period_start_date': datetime.now(timezone.utc) - timedelta(days=1)
+    })
+    assert status['requests_used'] == 0
+    assert status['limit'] == utils.PREMIUM_TIER_LIMIT
@@ -15,6 +15,7 @@ export function useChat(
     const [isLoading, setIsLoading] = useState(false);
     const [chatError, setChatError] = useState(null);
     const initialAnalysisSentRef = useRef(false);
+    const sessionIdRef = useRef(null);
 
     useEffect(() => {
         console.log("Current message history:", messages);
@@ -25,6 +26,7 @@ export function useChat(
         setUserInput('');
         setChatError(null);
         initialAnalysisSentRef.current = false;
+        sessionIdRef.current = null;
         console.log("DEBUG: Chat cleared and initialAnalysisSentRef reset due to context/user change.");
     }, [imageFilenames, selectedMajorName, user, sendingInstitutionId, receivingInstitutionId, academicYearId]);
 
@@ -110,6 +112,7 @@ Analyze the provided agreement images thoroughly. Perform the following steps:
                     console.log("DEBUG: Received response from /chat:", response);
 
                     if (response && response.reply) {
+                        sessionIdRef.current = response.session_id || null;
                         setMessages([{ type: 'bot', text: response.reply }]);
                     } else {
                         if (response?.error?.includes("Authorization")) {
@@ -167,24 +170,37 @@ Analyze the provided agreement images thoroughly. Perform the following steps:
                 role: msg.type === 'bot' ? 'assistant' : msg.type,
                 content: msg.text
             }));
-        const payload = {
-            new_message: currentInput,
-            history: apiHistory,
-            image_filenames: imageFilenames
-        };
-
-        try {
-            console.log("Sending to /chat:", JSON.stringify(payload));
-            const response = await fetchData('chat', {
+        const fullPayload = { new_message: currentInput, history: apiHistory, image_filenames: imageFilenames };
+        const payload = sessionIdRef.current
+            ? { new_message: currentInput, session_id: sessionIdRef.current }
+            : fullPayload;
+        const postChat = (body) => {
+            console.log("Sending to /chat:", JSON.stringify(body));
+            return fetchData('chat', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                     'Authorization': `Bearer ${user.idToken}`
                 },
-                body: JSON.stringify(payload)
+                body: JSON.stringify(body)
             });
+        };
+
+        try {
+            let response;
+            try {
+                response = await postChat(payload);
+            } catch (err) {
+                if (err.status !== 404 || !payload.session_id) {
+                    throw err;
+                }
+                console.warn("Chat session expired or was deleted; starting a new session from the local history.");
+                sessionIdRef.current = null;
+                response = await postChat(fullPayload);
+            }
 
             if (response && response.reply) {
+                sessionIdRef.current = response.session_id || sessionIdRef.current;
                 setMessages(prev => [...prev, { type: 'bot', text: response.reply }]);
             } else {
                 if (response?.error?.includes("Authorization")) {
@@ -35,7 +35,9 @@ export async function fetchData(endpoint, options = {}) {
         }
         if (!response.ok) {
             const errorData = await response.json().catch(() => ({ message: response.statusText }));
-            throw new Error(errorData.error || errorData.message || `HTTP error! status: ${response.status}`);
+            const error = new Error(errorData.error || errorData.message || `HTTP error! status: ${response.status}`);
+            error.status = response.status;
+            throw error;
         }
         const contentType = response.headers.get("content-type");
         if (response.status === 204 || !contentType) {